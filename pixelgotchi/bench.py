@@ -0,0 +1,844 @@
+"""Micro-benchmarks for Pixelgotchi hot paths.
+
+Run with ``python -m pixelgotchi.bench <name>``; see ``--help`` for the list.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+import pygame as pg
+
+from . import pet
+from .appearance import random_appearance
+from .sentiment import NEG_WORDS, POS_WORDS
+
+
+def _best_of(fn, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def bench_raster(n: int = 50, seed: int = 0, repeat: int = 20) -> dict:
+    """Loop vs NumPy body/belly/spot fill (pixel parity is checked in tests/test_raster.py)."""
+    if pet.np is None:
+        raise SystemExit("raster benchmark needs NumPy")
+    random.seed(seed)
+    rows = []
+    for i in range(n):
+        app = random_appearance()
+        w, h = app["w"], app["h"]
+        size = (w + pet.SPRITE_PAD*2, h + pet.SPRITE_PAD*2)
+        col = tuple(app["base_color"])
+
+        def run(fill):
+            surf = pg.Surface(size, 0, 32)
+            surf.fill(pet.SPRITE_COLORKEY)
+            fill(surf, pet.SPRITE_PAD, pet.SPRITE_PAD, app, col)
+            return surf
+
+        t_loop = _best_of(lambda: run(pet.fill_shapes_loops), repeat)
+        t_np = _best_of(lambda: run(pet.fill_shapes_numpy), repeat)
+        rows.append({
+            "w": w, "h": h, "belly": bool(app["belly_color"]), "spots": len(app["spots"]),
+            "loop_us": t_loop * 1e6, "numpy_us": t_np * 1e6, "speedup": t_loop / t_np,
+        })
+    return {"appearances": rows}
+
+
+def _print_raster(res: dict):
+    print(f"{'#':>3} {'size':>7} {'belly':>5} {'spots':>5} {'loop us':>9} {'numpy us':>9} {'x':>6}")
+    for i, r in enumerate(res["appearances"]):
+        size = f"{r['w']}x{r['h']}"
+        print(f"{i:>3} {size:>7} {str(r['belly']):>5} {r['spots']:>5} "
+              f"{r['loop_us']:>9.1f} {r['numpy_us']:>9.1f} {r['speedup']:>6.1f}")
+    speedups = sorted(r["speedup"] for r in res["appearances"])
+    print(f"median speed-up {speedups[len(speedups)//2]:.1f}x, "
+          f"min {speedups[0]:.1f}x, max {speedups[-1]:.1f}x")
+
+
+class AllocCounter:
+    """Counts calls that hand back a newly allocated Surface while active.
+
+    Patches pg.Surface and the pg.transform scalers; a scaler call that
+    writes into the destination it was given does not count.
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def __enter__(self):
+        counter = self
+        self._saved = {"Surface": pg.Surface}
+        orig_surface = pg.Surface
+
+        class CountedSurface(orig_surface):
+            def __init__(self, *a, **k):
+                counter.count += 1
+                super().__init__(*a, **k)
+
+        pg.Surface = CountedSurface
+        for name in ("scale", "smoothscale", "scale_by"):
+            fn = getattr(pg.transform, name, None)
+            if fn is None:
+                continue
+            self._saved[name] = fn
+
+            def wrapped(surface, size, dest_surface=None, _fn=fn):
+                if dest_surface is None:
+                    out = _fn(surface, size)
+                else:
+                    out = _fn(surface, size, dest_surface)
+                if out is not dest_surface:
+                    counter.count += 1
+                return out
+            setattr(pg.transform, name, wrapped)
+        return self
+
+    def __exit__(self, *exc):
+        pg.Surface = self._saved.pop("Surface")
+        for name, fn in self._saved.items():
+            setattr(pg.transform, name, fn)
+        return False
+
+
+def _legacy_end_blit(canvas, screen, rects=None):
+    # PixelCanvas.end_blit before the preallocated target, for comparison.
+    scaled = pg.transform.scale(canvas.surface, (canvas.vw * canvas.scale, canvas.vh * canvas.scale))
+    screen.blit(scaled, (0, 0))
+
+
+def bench_present(frames: int = 600) -> dict:
+    """Per-frame cost and surface allocations of PixelCanvas.end_blit."""
+    from .config import VIRTUAL_W, VIRTUAL_H, SCALE
+    from .game import PixelCanvas
+
+    canvas = PixelCanvas(VIRTUAL_W, VIRTUAL_H, SCALE)
+    screen = canvas.open_window()
+    canvas.begin()
+    partial = [pg.Rect(40, 28, 56, 48), pg.Rect(0, 0, 48, 42)]
+    # An off-screen target of a different size forces the preallocated destination path.
+    offscreen = pg.Surface((screen.get_width() + 8, screen.get_height() + 8), 0, screen)
+    modes = {
+        "legacy": lambda: _legacy_end_blit(canvas, screen),
+        "screen_full": lambda: canvas.end_blit(screen),
+        "screen_partial": lambda: canvas.end_blit(screen, partial),
+        "offscreen_full": lambda: canvas.end_blit(offscreen),
+        "offscreen_partial": lambda: canvas.end_blit(offscreen, partial),
+    }
+    out = {}
+    for name, fn in modes.items():
+        fn()  # first call may allocate the destination
+        with AllocCounter() as allocs:
+            t0 = time.perf_counter()
+            for _ in range(frames):
+                fn()
+            elapsed = time.perf_counter() - t0
+        out[name] = {"us_per_frame": elapsed / frames * 1e6, "allocs_per_frame": allocs.count / frames}
+
+    # Changing SCALE back and forth reallocates only when the size really changes.
+    with AllocCounter() as allocs:
+        for scale in (SCALE, SCALE, SCALE + 1, SCALE + 1, SCALE):
+            if canvas.set_scale(scale):
+                screen = canvas.open_window()
+            canvas.end_blit(offscreen)
+    out["rescale_allocs"] = allocs.count
+    return out
+
+
+def _print_present(res: dict):
+    print(f"{'mode':<18} {'us/frame':>9} {'allocs/frame':>13}")
+    for name, r in res.items():
+        if isinstance(r, dict):
+            print(f"{name:<18} {r['us_per_frame']:>9.1f} {r['allocs_per_frame']:>13.2f}")
+    print(f"surface allocations over 5 scale changes (2 distinct sizes): {res['rescale_allocs']}")
+
+
+def bench_particles(frames: int = 300, presses: int = 4) -> dict:
+    """Frame cost of the particle pool while Play is mashed `presses` times per frame."""
+    from .config import VIRTUAL_W, VIRTUAL_H
+    from .game import spawn_particles_confetti
+    from .particles import ParticleSystem
+
+    random.seed(0)
+    surf = pg.Surface((VIRTUAL_W, VIRTUAL_H), 0, 32)
+    ps = ParticleSystem()
+    times, live = [], []
+    for _ in range(frames):
+        t0 = time.perf_counter()
+        for _ in range(presses):
+            spawn_particles_confetti(ps, VIRTUAL_W//2, VIRTUAL_H//2)
+        ps.update(1/60)
+        ps.draw(surf)
+        times.append(time.perf_counter() - t0)
+        live.append(len(ps))
+    times.sort()
+    return {
+        "capacity": ps.capacity, "overflow": ps.overflow, "max_live": max(live), "dropped": ps.dropped,
+        "p50_us": times[len(times)//2] * 1e6, "p99_us": times[int(len(times)*0.99)] * 1e6,
+    }
+
+
+def _key(name: str) -> dict:
+    return {"type": "KEYDOWN", "key": name}
+
+
+def frame_scenarios(frames: int) -> dict:
+    """name -> (initial state, input trace) for the frame-time suite."""
+    from .loop import type_text
+    from .state import PetState
+
+    storm = []
+    for f in range(1, frames + 1):
+        storm += [(f, _key("f")), (f, _key("c"))]   # bursts + bubbles every frame
+        if f % 120 == 0:
+            storm.append((f, _key("p")))             # confetti, rarely enough to stay alive
+    chat = [(1, _key("t"))]
+    for i, f in enumerate(range(5, frames, 5)):
+        chat += type_text(f, f"message {i}: how are you feeling today little one?", every=0)
+    return {
+        "idle": (PetState(), []),
+        "sleeping": (PetState(asleep=True), []),
+        "particle_storm": (PetState(), storm),
+        "long_chat": (PetState(), chat),
+        "death": (PetState(hunger=1.0), []),
+    }
+
+
+def _meta() -> dict:
+    import platform
+    import subprocess
+    meta = {"python": platform.python_version(), "pygame": pg.version.ver, "numpy": pet.np is not None}
+    try:
+        meta["commit"] = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                        cwd=os.path.dirname(__file__), timeout=5).stdout.strip() or None
+    except Exception:
+        meta["commit"] = None
+    return meta
+
+
+def bench_frames(frames: int = 600, seed: int = 0, warmup: int = 10, only=None) -> dict:
+    """Drive the real game loop headless through each scenario and time every frame."""
+    from .headless import run
+    from .perf import stats
+
+    out = {"meta": dict(_meta(), frames=frames, seed=seed, warmup=warmup), "scenarios": {}}
+    for name, (state, trace) in frame_scenarios(frames).items():
+        if only and name not in only:
+            continue
+        stats.start()
+        try:
+            run(trace, frames, seed=seed, state=state)
+        finally:
+            stats.stop()
+        out["scenarios"][name] = stats.summary(warmup)
+    return out
+
+
+def _print_frames(res: dict, baseline: dict = None):
+    base = (baseline or {}).get("scenarios", {})
+    print(f"{'scenario':<15} {'p50 ms':>7} {'p95 ms':>7} {'p99 ms':>7}  subsystem means (ms)")
+    for name, r in res["scenarios"].items():
+        f = r["frame_ms"]
+        subs = " ".join(f"{k}={v['mean']:.3f}" for k, v in r["subsystems_ms"].items())
+        print(f"{name:<15} {f['p50']:>7.3f} {f['p95']:>7.3f} {f['p99']:>7.3f}  {subs}")
+        if name in base:
+            b = base[name]["frame_ms"]
+            ratios = " ".join(f"{q}={f[q] / b[q]:.2f}x" for q in ("p50", "p95", "p99") if b[q])
+            print(f"{'':<15} vs baseline {baseline['meta'].get('commit')}: {ratios}")
+
+
+def bench_load(seconds: float = 3.0) -> dict:
+    """CPU use and wakeups per second of the live loop, fixed vs adaptive frame rate."""
+    from .chat import ChatEngine
+    from .game import main as game_main
+    from .loop import LiveDriver
+    from .state import PetState
+
+    class TimedDriver(LiveDriver):
+        def __init__(self, adaptive: bool, focused: bool = True):
+            super().__init__(adaptive=adaptive)
+            self.focused = focused
+            self.deadline = time.perf_counter() + seconds
+            self.t0, self.cpu0 = time.perf_counter(), time.process_time()
+            self.total = 0
+
+        @property
+        def done(self) -> bool:
+            return time.perf_counter() >= self.deadline
+
+        def tick(self) -> float:
+            if not self.total:  # leave start-up (pg.init, fonts, tones) out of the numbers
+                self.t0, self.cpu0 = time.perf_counter(), time.process_time()
+            self.total += 1
+            return super().tick()
+
+    cases = {
+        "fixed": dict(adaptive=False),
+        "adaptive_idle": dict(adaptive=True),
+        "adaptive_unfocused": dict(adaptive=True, focused=False),
+    }
+    out = {}
+    for name, kw in cases.items():
+        random.seed(0)
+        drv = TimedDriver(**kw)
+        game_main(drv, state=PetState(), chat=ChatEngine(enabled=False), persist=False)
+        wall = time.perf_counter() - drv.t0
+        out[name] = {"cpu_pct": (time.process_time() - drv.cpu0) / wall * 100, "wakeups_per_s": drv.total / wall}
+    return out
+
+
+def bench_sim(seconds: float = 600.0, seed: int = 0) -> dict:
+    """Needs after `seconds` of play under different frame pacings: fixed-step vs raw-dt ticking.
+
+    Pacings use whole-millisecond deltas like the live clock; the fixed-step
+    results must be identical across all of them.
+    """
+    from .sim import FixedStep
+    from .state import PetState
+
+    rng = random.Random(seed)
+    total_ms = int(seconds * 1000)
+
+    def pacing(kind):
+        left = total_ms
+        while left > 0:
+            ms = {"60fps": 16 + (left % 3 == 0), "10fps": 100, "jittery": rng.randint(1, 60),
+                  "stalls": 1000 if rng.random() < 0.01 else 16}[kind]
+            ms = min(ms, left)
+            left -= ms
+            yield ms / 1000.0
+
+    out = {}
+    for kind in ("60fps", "10fps", "jittery", "stalls"):
+        fixed, raw = PetState(last_timestamp=0.0), PetState(last_timestamp=0.0)
+        stepper = FixedStep()
+        frames = 0
+        for dt in pacing(kind):
+            frames += 1
+            for _ in range(stepper.advance(dt)):
+                fixed.tick(stepper.step)
+            raw.tick(dt)
+        out[kind] = {"frames": frames, "steps": stepper.steps,
+                     "fixed": (fixed.hunger, fixed.energy, fixed.fun, fixed.hygiene),
+                     "raw": (raw.hunger, raw.energy, raw.fun, raw.hygiene)}
+    fixed_results = {tuple(r["fixed"]) for r in out.values()}
+    return {"pacings": out, "fixed_identical": len(fixed_results) == 1}
+
+
+def bench_needs(n: int = 20, horizon: float = 3000.0, probe: float = 0.05, seed: int = 0) -> dict:
+    """Scheduled need events vs polling the thresholds every `probe` seconds.
+
+    Each scheduled event must land within one probe step of the first
+    polled frame that sees the condition; also checks the death time after
+    a long offline gap against its closed form.
+    """
+    import copy
+    from .config import EMOTION_THRESHOLDS
+    from .needs import NeedsScheduler, THRESHOLD_EVENTS
+    from .state import PetState, STARVED_AT
+
+    rng = random.Random(seed)
+    worst, missing, checked = 0.0, 0, 0
+    for _ in range(n):
+        st = PetState(hunger=rng.uniform(0, 0.8), energy=rng.uniform(0.05, 1), fun=rng.uniform(0, 1),
+                      hygiene=rng.uniform(0, 1), asleep=rng.random() < 0.3, last_timestamp=0.0)
+        a, b = copy.deepcopy(st), copy.deepcopy(st)
+        sched = NeedsScheduler(a)
+        events = {}
+        steps = int(horizon / probe)
+        for i in range(1, steps + 1):
+            for ev in sched.advance(a, i * probe):
+                events.setdefault(ev.kind, ev.at)
+        polled = {}
+        was = {}
+        for key, (need, direction, kind) in THRESHOLD_EVENTS.items():
+            was[key] = (getattr(b, need) - EMOTION_THRESHOLDS[key]) * direction > 0
+        for i in range(1, steps + 1):
+            b.tick(probe)
+            for key, (need, direction, kind) in THRESHOLD_EVENTS.items():
+                now = (getattr(b, need) - EMOTION_THRESHOLDS[key]) * direction > 0
+                if now and not was[key] and b.alive:
+                    polled.setdefault(kind, i * probe)
+                was[key] = now
+            if not b.alive:
+                polled.setdefault("died", i * probe)
+                break
+        for kind, at in polled.items():
+            checked += 1
+            if kind not in events:
+                missing += 1
+                continue
+            worst = max(worst, abs(at - events[kind]))
+
+    gap = PetState(hunger=0.2, last_timestamp=0.0)
+    gap.apply_offline(36000.0)
+    expected = (STARVED_AT - 0.2) * 600.0
+    return {"states": n, "events_checked": checked, "missing": missing, "worst_lag_s": worst, "probe_s": probe,
+            "offline_death_at": gap.died_at, "offline_death_expected": expected}
+
+
+def bench_fleet(n: int = 20000, steps: int = 360, step: float = 10.0) -> dict:
+    """Fleet vs a PetState loop: parity on random cases, then pet-steps per second of each."""
+    from . import fleet
+    from .state import PetState
+
+    if fleet.np is None:
+        raise SystemExit("fleet benchmark needs NumPy")
+    mismatches = fleet.verify()
+    states = [PetState(last_timestamp=0.0) for _ in range(min(n, 2000))]
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        for s in states:
+            s.tick(step)
+    loop = len(states) * steps / (time.perf_counter() - t0)
+    f = fleet.Fleet(n)
+    t0 = time.perf_counter()
+    for _ in range(steps):
+        f.tick(step)
+    vec = n * steps / (time.perf_counter() - t0)
+    return {"mismatches": mismatches, "loop_pet_steps_per_s": loop, "fleet_pet_steps_per_s": vec}
+
+
+def bench_save(saves: int = 600) -> dict:
+    """Cost of one autosave on the frame thread: full JSON rewrite (old save_state), atomic
+    snapshot, journal append, and the snapshot hand-off to the background writer."""
+    import tempfile
+    from dataclasses import asdict
+    from pathlib import Path
+    from .journal import SaveJournal, SaveWriter, write_atomic
+    from .perf import distribution
+    from .state import PetState, save_record
+
+    random.seed(0)
+    out = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        def run(name, save, close=None, pause=0.0):
+            st = PetState(last_timestamp=0.0, appearance=random_appearance())
+            times, sizes = [], []
+            for i in range(saves):
+                st.tick(5.0)
+                if i % 7 == 0:
+                    st.feed()
+                t0 = time.perf_counter()
+                sizes.append(save(save_record(st)))
+                times.append(time.perf_counter() - t0)
+                if pause:
+                    time.sleep(pause)
+            if close:
+                close()
+            out[name] = dict(distribution(times), bytes_per_save=sum(sizes) / len(sizes))
+
+        path = Path(tmp) / "rewrite.json"
+        run("rewrite", lambda rec: path.write_text(json.dumps(dict(rec))))
+        path = Path(tmp) / "atomic.json"
+        run("atomic_snapshot", lambda rec: write_atomic(path, json.dumps(dict(rec)).encode()) or len(json.dumps(dict(rec))))
+        j = SaveJournal(Path(tmp) / "journal.json")
+        run("journal", j.save, j.close)
+        out["journal"].update(fsyncs=j.fsyncs, compactions=j.compactions)
+        j = SaveJournal(Path(tmp) / "journal_sync.json", fsync_interval=0.0)
+        run("journal_fsync_each", j.save, j.close)
+        out["journal_fsync_each"].update(fsyncs=j.fsyncs, compactions=j.compactions)
+        # What the frame loop pays with the writer thread: snapshot + hand-off, one save per 5 ms "frame"
+        w = SaveWriter(SaveJournal(Path(tmp) / "writer.json"))
+        depth = []
+
+        def handoff(rec):
+            w.submit(rec)
+            depth.append(w.depth)
+            return 0
+        run("writer_handoff", handoff, w.close, pause=0.005)
+        out["writer_handoff"].update(writes=w.writes, coalesced=w.coalesced, max_depth=max(depth),
+                                     write_ms=distribution(list(w.latency)))
+    return out
+
+
+def _legacy_sentiment(text: str, pos_words=POS_WORDS, neg_words=NEG_WORDS):
+    # the substring scan sentiment_score used before the compiled lexicon
+    t = text.lower()
+    pos = sum(1 for w in pos_words if w in t)
+    neg = sum(1 for w in neg_words if w in t)
+    if pos == 0 and neg == 0:
+        return 0.0, "neutral"
+    score = (pos - neg) / max(1, pos + neg)
+    return score, "positive" if score > 0 else ("negative" if score < 0 else "neutral")
+
+
+def bench_sentiment(lines: int = 100000, seed: int = 0) -> dict:
+    """Substring scan vs compiled lexicon per message and per transcript (built-in, weighted and
+    a 2000-term lexicon), then score_many on a corpus, serial and over the process pool."""
+    from .sentiment import LEXICON, WEIGHTED_LEXICON, Lexicon, score_many
+
+    rng = random.Random(seed)
+    words = ("hi there you are so cute and I love you but the badge is bad and I am tired of this boring "
+             "game thank you for the yummy food what a wonderful day ugh eww grr wow cool awesome").split()
+    msgs = [" ".join(rng.choice(words) for _ in range(rng.randint(2, 14))) for _ in range(lines)]
+    transcripts = ["\n".join(msgs[i:i + 200]) for i in range(0, 200 * 50, 200)]
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    big = dict(LEXICON)
+    while len(big) < 2000:
+        big["".join(rng.choice(letters) for _ in range(rng.randint(4, 9)))] = rng.choice((-1.0, 1.0))
+    big_pos = {w for w, v in big.items() if v > 0}
+    big_neg = {w for w, v in big.items() if v < 0}
+    small_lex, big_lex = Lexicon(LEXICON), Lexicon(big)
+    cases = {
+        "legacy": _legacy_sentiment,
+        "lexicon": small_lex.score,
+        "weighted": Lexicon(WEIGHTED_LEXICON).score,
+        "legacy_2000": lambda t: _legacy_sentiment(t, big_pos, big_neg),
+        "lexicon_2000": big_lex.score,
+    }
+    out = {}
+    for name, fn in cases.items():
+        n = 20000 if "2000" not in name else 2000
+        t0 = time.perf_counter()
+        for m in msgs[:n]:
+            fn(m)
+        per_msg = (time.perf_counter() - t0) / n
+        t0 = time.perf_counter()
+        for tr in transcripts[:10 if "2000" in name else None]:
+            fn(tr)
+        per_tr = (time.perf_counter() - t0) / len(transcripts[:10 if "2000" in name else None])
+        out[name] = {"msg_us": per_msg * 1e6, "transcript_us": per_tr * 1e6}
+    out["label_changes"] = sum(_legacy_sentiment(m)[1] != small_lex.score(m)[1] for m in msgs[:20000])
+    t0 = time.perf_counter()
+    serial = score_many(msgs, workers=1)
+    out["serial_s"] = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    pooled = score_many(msgs)
+    out["pool_s"] = time.perf_counter() - t0
+    out["pool_matches"] = pooled == serial
+    out["lines"] = lines
+    out["workers"] = os.cpu_count()
+    return out
+
+
+def bench_chat_cache(messages: int = 60, delay: float = 0.05, seed: int = 0) -> dict:
+    """Reply latency against the local devserver with and without the reply cache, for
+    players who repeat a handful of messages (Zipf-ish mix)."""
+    import threading
+    from .devserver import serve
+
+    srv = serve(port=0, delay=delay)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    from . import chat
+    from .chatcache import ResponseCache
+    chat.OPENAI_BASE_URL = f"http://127.0.0.1:{srv.server_port}/v1"
+    rng = random.Random(seed)
+    pool = ["hi", "good pet", "I'm hungry", "wanna play?", "good night", "you're cute", "what's up", "bye"]
+    weights = [1 / (i + 1) for i in range(len(pool))]
+    msgs = [rng.choices(pool, weights)[0] for _ in range(messages)]
+    out = {}
+    try:
+        for name, cache in (("no_cache", None), ("cache", ResponseCache(path=None))):
+            eng = chat.ChatEngine(enabled=True, backends=[chat.RemoteBackend("dummy", chat.OPENAI_BASE_URL, cache)])
+            lat = []
+            for m in msgs:
+                t0 = time.perf_counter()
+                eng.push_user(m)
+                eng.reply()
+                lat.append(time.perf_counter() - t0)
+            out[name] = {"mean_ms": sum(lat) / len(lat) * 1000, "total_s": sum(lat),
+                         "hit_rate": cache.hit_rate() if cache else 0.0}
+    finally:
+        srv.shutdown()
+    return out
+
+
+def bench_history(turns: int = 400, seed: int = 0) -> dict:
+    """Prompt size over a long chat: the last CHAT_MAX_HISTORY messages vs the token-budgeted
+    history, with players who sometimes paste whole paragraphs."""
+    from .config import CHAT_MAX_HISTORY
+    from .history import ChatHistory, SYSTEM_PROMPT, message_tokens
+    rng = random.Random(seed)
+    words = "pet food play sleep happy hungry ball park tomorrow remember name blue friend story".split()
+
+    def say():
+        n = rng.choice([3, 8, 15]) if rng.random() < 0.9 else rng.randint(200, 1500)
+        return " ".join(rng.choice(words) for _ in range(n)) + "."
+
+    legacy, hist = [], ChatHistory()
+    sizes = {"legacy": [], "budgeted": []}
+    build_s = 0.0
+    for _ in range(turns):
+        for role in ("user", "assistant"):
+            text = say()
+            legacy = (legacy + [(role, text)])[-CHAT_MAX_HISTORY:]
+            t0 = time.perf_counter()
+            hist.append(role, text)
+            msgs = hist.messages()
+            build_s += time.perf_counter() - t0
+            if role == "user":
+                sizes["legacy"].append(message_tokens([("system", SYSTEM_PROMPT)] + legacy))
+                sizes["budgeted"].append(message_tokens([(m["role"], m["content"]) for m in msgs]))
+    out = {name: {"mean": sum(v) / len(v), "p99": sorted(v)[int(len(v) * 0.99)], "max": max(v)}
+           for name, v in sizes.items()}
+    out["bound"] = message_tokens([("system", SYSTEM_PROMPT + "\nEarlier in this chat: ")]) + hist.summary_tokens + 1 + hist.budget
+    out["folded"] = hist.folded
+    out["append_us"] = build_s / (turns * 2) * 1e6
+    return out
+
+
+def bench_transport(requests: int = 100, seed: int = 0) -> dict:
+    """Replies from a devserver that fails, drops and stalls requests: a bare client (one attempt,
+    long timeout) vs ChatTransport with retries, a short deadline and the breaker; then a dead
+    server with and without the breaker."""
+    import threading
+    from .devserver import serve
+    from . import chat
+    from .perf import distribution
+    from .transport import ChatTransport, CircuitBreaker, OFFLINE_REPLIES
+
+    def run(srv_kwargs, n, **transport_kwargs):
+        srv = serve(port=0, seed=seed, **srv_kwargs)
+        conns = [0]
+        setup = srv.RequestHandlerClass.setup
+
+        def counting_setup(handler):
+            conns[0] += 1
+            setup(handler)
+        srv.RequestHandlerClass.setup = counting_setup
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        chat.OPENAI_BASE_URL = f"http://127.0.0.1:{srv.server_port}/v1"
+        transport = ChatTransport("dummy", chat.OPENAI_BASE_URL, **transport_kwargs)
+        eng = chat.ChatEngine(enabled=True, backends=[chat.RemoteBackend("dummy", chat.OPENAI_BASE_URL, None, transport)])
+        lat, ok, offline, errors = [], 0, 0, 0
+        try:
+            for i in range(n):
+                eng.push_user(f"hello {i}")
+                t0 = time.perf_counter()
+                try:
+                    text = eng.reply()
+                except Exception:
+                    errors += 1
+                else:
+                    if text in OFFLINE_REPLIES:
+                        offline += 1
+                    else:
+                        ok += 1
+                lat.append(time.perf_counter() - t0)
+        finally:
+            eng.transport.close()
+            srv.shutdown()
+        tr = eng.transport
+        return {"ok": ok, "offline": offline, "errors": errors, "latency_ms": distribution(lat),
+                "retries": tr.retried, "refused": tr.refused, "trips": tr.breaker.trips, "connections": conns[0],
+                "hist_ms": tr.latency.summary()}
+
+    flaky = {"delay": 0.01, "jitter": 0.01, "fail_rate": 0.15, "drop_rate": 0.05, "stall_rate": 0.03, "stall": 3.0}
+    no_breaker = CircuitBreaker(failures=0)
+    return {
+        "flaky_bare": run(flaky, requests, deadline=10.0, retries=0, breaker=no_breaker),
+        "flaky_transport": run(flaky, requests, deadline=0.5, retries=3, backoff=0.05),
+        "down_bare": run({"fail_rate": 1.0}, requests // 4, retries=2, backoff=0.05,
+                         breaker=CircuitBreaker(failures=0)),
+        "down_breaker": run({"fail_rate": 1.0}, requests // 4, retries=2, backoff=0.05,
+                            breaker=CircuitBreaker(failures=3, cooldown=60)),
+    }
+
+
+def bench_local(replies: int = 20000, delay: float = 0.3, seed: int = 0) -> dict:
+    """Local template replies: cost per reply, and how soon the player sees an answer with
+    CHAT_LOCAL_FILL on and off while a remote reply takes `delay` seconds (devserver)."""
+    import threading
+    from . import chat
+    from .devserver import serve
+    from .localchat import LocalBackend
+    from .sim import Needs
+    rng = random.Random(seed)
+    lines = ["hi!", "wanna play?", "I love you", "are you hungry?", "this is boring", "good night",
+             "what did you do today?", "ugh, bath time", "thanks buddy", "you smell a bit"]
+    cases = [(rng.choice(lines), Needs(rng.random(), rng.random(), rng.random(), rng.random(), rng.random() < 0.2))
+             for _ in range(1000)]
+    local = LocalBackend(seed)
+    t0 = time.perf_counter()
+    for i in range(replies):
+        local.compose(*cases[i % len(cases)])
+    out = {"reply_us": (time.perf_counter() - t0) / replies * 1e6}
+
+    srv = serve(port=0, delay=delay)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    chat.OPENAI_BASE_URL = f"http://127.0.0.1:{srv.server_port}/v1"
+    fill_setting = chat.CHAT_LOCAL_FILL
+    try:
+        for name, fill in (("remote", False), ("remote_fill", True)):
+            chat.CHAT_LOCAL_FILL = fill
+            eng = chat.ChatEngine(enabled=True, backends=[chat.RemoteBackend("dummy", chat.OPENAI_BASE_URL),
+                                                          LocalBackend(seed)])
+            worker = chat.ChatWorker(eng, stream=True)
+            first, done = [], []
+            for text, needs in cases[:10]:
+                t0 = time.perf_counter()
+                worker.submit(text, needs)
+                seen = None
+                while True:
+                    res = worker.poll()
+                    if res and seen is None:
+                        seen = time.perf_counter() - t0
+                    if any(r.done for r in res):
+                        break
+                    time.sleep(0.001)
+                first.append(seen)
+                done.append(time.perf_counter() - t0)
+            worker.close()
+            out[name] = {"first_ms": sum(first) / len(first) * 1000, "done_ms": sum(done) / len(done) * 1000}
+    finally:
+        chat.CHAT_LOCAL_FILL = fill_setting
+        srv.shutdown()
+    return out
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pixelgotchi.bench")
+    sub = ap.add_subparsers(dest="name", required=True)
+    p = sub.add_parser("raster", help="loop vs NumPy pet rasterizer speed")
+    p.add_argument("-n", type=int, default=50, help="number of random appearances")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--repeat", type=int, default=20)
+    p = sub.add_parser("present", help="PixelCanvas.end_blit cost and surface allocations per frame")
+    p.add_argument("--frames", type=int, default=600)
+    p = sub.add_parser("particles", help="particle pool frame cost under a Play-mashing storm")
+    p.add_argument("--frames", type=int, default=300)
+    p.add_argument("--presses", type=int, default=4, help="Play presses per frame")
+    p = sub.add_parser("load", help="CPU use and wakeups/s of the live loop with and without frame-rate throttling")
+    p.add_argument("--seconds", type=float, default=3.0, help="duration of each case")
+    p = sub.add_parser("sim", help="fixed-step needs simulation: same result under every frame pacing")
+    p.add_argument("--seconds", type=float, default=600.0)
+    p = sub.add_parser("needs", help="scheduled need events vs per-frame threshold polling")
+    p.add_argument("-n", type=int, default=20, help="random starting states")
+    p = sub.add_parser("fleet", help="vectorized fleet vs PetState: parity and throughput")
+    p.add_argument("-n", type=int, default=20000, help="pets in the fleet")
+    p = sub.add_parser("save", help="autosave cost: full rewrite vs atomic snapshot vs journal append")
+    p.add_argument("--saves", type=int, default=600)
+    p = sub.add_parser("sentiment", help="substring sentiment scan vs compiled lexicon, and score_many")
+    p.add_argument("--lines", type=int, default=100000, help="corpus size for score_many")
+    p = sub.add_parser("chatcache", help="chat reply latency with and without the reply cache (local devserver)")
+    p.add_argument("--messages", type=int, default=60)
+    p.add_argument("--delay", type=float, default=0.05, help="devserver delay per reply, seconds")
+    p = sub.add_parser("history", help="prompt size per request: count-limited vs token-budgeted chat history")
+    p.add_argument("--turns", type=int, default=400)
+    p = sub.add_parser("transport", help="chat replies from a faulty devserver: bare client vs retries/deadline/breaker")
+    p.add_argument("--requests", type=int, default=100)
+    p = sub.add_parser("local", help="local template replies: cost, and time to first answer with/without filling")
+    p.add_argument("--replies", type=int, default=20000)
+    p.add_argument("--delay", type=float, default=0.3, help="devserver delay per remote reply, seconds")
+    p = sub.add_parser("frames", help="headless game loop frame times per scenario (JSON output)")
+    p.add_argument("--frames", type=int, default=600)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--warmup", type=int, default=10, help="frames left out of the statistics")
+    p.add_argument("--scenario", action="append", help="run only this scenario (repeatable)")
+    p.add_argument("--out", help="write the results to this JSON file")
+    p.add_argument("--baseline", help="earlier --out file to compare against")
+    args = ap.parse_args(argv)
+
+    pg.init()
+    if args.name == "raster":
+        res = bench_raster(args.n, args.seed, args.repeat)
+        _print_raster(res)
+    if args.name == "present":
+        res = bench_present(args.frames)
+        _print_present(res)
+        return 1 if any(r["allocs_per_frame"] for k, r in res.items() if k.startswith(("screen", "offscreen"))) else 0
+    if args.name == "particles":
+        res = bench_particles(args.frames, args.presses)
+        print(f"capacity {res['capacity']} ({res['overflow']}), max live {res['max_live']}, dropped {res['dropped']}")
+        print(f"frame cost p50 {res['p50_us']:.1f} us, p99 {res['p99_us']:.1f} us")
+    if args.name == "load":
+        res = bench_load(args.seconds)
+        print(f"{'case':<20} {'cpu %':>6} {'wakeups/s':>10}")
+        for name, r in res.items():
+            print(f"{name:<20} {r['cpu_pct']:>6.1f} {r['wakeups_per_s']:>10.1f}")
+    if args.name == "sim":
+        res = bench_sim(args.seconds)
+        print(f"{'pacing':<9} {'frames':>7} {'steps':>6}  fixed-step hunger/energy/fun/hygiene  |  raw dt")
+        for name, r in res["pacings"].items():
+            fx = " ".join(f"{v:.12f}" for v in r["fixed"])
+            rw = " ".join(f"{v:.12f}" for v in r["raw"])
+            print(f"{name:<9} {r['frames']:>7} {r['steps']:>6}  {fx}  |  {rw}")
+        print("fixed-step results identical across pacings:", res["fixed_identical"])
+        return 0 if res["fixed_identical"] else 1
+    if args.name == "needs":
+        res = bench_needs(args.n)
+        print(f"{res['events_checked']} polled crossings over {res['states']} states, {res['missing']} not scheduled, "
+              f"worst lag {res['worst_lag_s']:.3f}s (probe {res['probe_s']}s)")
+        print(f"death after a 10 h offline gap at {res['offline_death_at']:.6f}s "
+              f"(closed form {res['offline_death_expected']:.6f}s)")
+        ok = not res["missing"] and res["worst_lag_s"] <= res["probe_s"] + 1e-9
+        return 0 if ok else 1
+    if args.name == "fleet":
+        res = bench_fleet(args.n)
+        print(f"parity with PetState: {res['mismatches']} mismatching pets")
+        print(f"PetState loop {res['loop_pet_steps_per_s']:,.0f} pet-steps/s, "
+              f"Fleet {res['fleet_pet_steps_per_s']:,.0f} pet-steps/s "
+              f"({res['fleet_pet_steps_per_s'] / res['loop_pet_steps_per_s']:.0f}x)")
+        return 1 if res["mismatches"] else 0
+    if args.name == "save":
+        res = bench_save(args.saves)
+        print(f"{'method':<20} {'mean ms':>8} {'p99 ms':>8} {'max ms':>8} {'bytes':>7}")
+        for name, r in res.items():
+            extra = f"  fsyncs {r['fsyncs']}, compactions {r['compactions']}" if "fsyncs" in r else ""
+            if "writes" in r:
+                extra = (f"  {r['writes']} writes ({r['coalesced']} coalesced, max queue {r['max_depth']}), "
+                         f"write p99 {r['write_ms']['p99']:.3f} ms")
+            print(f"{name:<20} {r['mean']:>8.3f} {r['p99']:>8.3f} {r['max']:>8.3f} {r['bytes_per_save']:>7.0f}{extra}")
+    if args.name == "sentiment":
+        res = bench_sentiment(args.lines)
+        for name in ("legacy", "lexicon", "weighted", "legacy_2000", "lexicon_2000"):
+            r = res[name]
+            print(f"{name:<13} {r['msg_us']:9.2f} us/message  {r['transcript_us']:10.1f} us/transcript (200 lines)")
+        print(f"labels changed on {res['label_changes']} of 20000 messages (whole-word matching)")
+        print(f"score_many {res['lines']} lines: serial {res['serial_s']:.2f}s, "
+              f"{res['workers']} processes {res['pool_s']:.2f}s, same result: {res['pool_matches']}")
+        return 0 if res["pool_matches"] else 1
+    if args.name == "chatcache":
+        res = bench_chat_cache(args.messages, args.delay)
+        for name, r in res.items():
+            print(f"{name:<9} mean {r['mean_ms']:7.1f} ms/reply, total {r['total_s']:.2f}s, hit rate {r['hit_rate']*100:.0f}%")
+    if args.name == "history":
+        res = bench_history(args.turns)
+        for name in ("legacy", "budgeted"):
+            r = res[name]
+            print(f"{name:<9} prompt tokens mean {r['mean']:7.0f}  p99 {r['p99']:6.0f}  max {r['max']:6.0f}")
+        print(f"bound {res['bound']} tokens, {res['folded']} turns folded into the summary, "
+              f"{res['append_us']:.1f} us per message")
+        return 0 if res["budgeted"]["max"] <= res["bound"] else 1
+    if args.name == "transport":
+        res = bench_transport(args.requests)
+        print(f"{'case':<16} {'ok':>4} {'offline':>7} {'errors':>6} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} "
+              f"{'retries':>7} {'refused':>7} {'conns':>5}")
+        for name, r in res.items():
+            d = r["latency_ms"]
+            print(f"{name:<16} {r['ok']:>4} {r['offline']:>7} {r['errors']:>6} {d['p50']:>8.1f} {d['p99']:>8.1f} "
+                  f"{d['max']:>8.1f} {r['retries']:>7} {r['refused']:>7} {r['connections']:>5}")
+        h = res["flaky_transport"]["hist_ms"]
+        print(f"transport latency histogram (ok requests): p50 {h['p50']:.1f} p95 {h['p95']:.1f} p99 {h['p99']:.1f} ms")
+        return 0 if not res["flaky_transport"]["errors"] else 1
+    if args.name == "local":
+        res = bench_local(args.replies, args.delay)
+        print(f"local reply {res['reply_us']:.1f} us")
+        for name in ("remote", "remote_fill"):
+            r = res[name]
+            print(f"{name:<12} first text after {r['first_ms']:7.1f} ms, full reply after {r['done_ms']:7.1f} ms")
+    if args.name == "frames":
+        res = bench_frames(args.frames, args.seed, args.warmup, args.scenario)
+        baseline = None
+        if args.baseline:
+            with open(args.baseline) as f:
+                baseline = json.load(f)
+        _print_frames(res, baseline)
+        if args.out:
+            with open(args.out, "w") as f:
+                json.dump(res, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
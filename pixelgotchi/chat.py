@@ -1,43 +1,354 @@
 import os
-from typing import List, Tuple
+import queue
+import threading
+import time
+from dataclasses import dataclass
+from collections import OrderedDict, deque
+from typing import Iterator, List, Optional, Sequence, Set, Tuple
 
 try:
     from openai import OpenAI
 except Exception:  # optional
     OpenAI = None
 
-from .config import ENABLE_CHAT, OPENAI_MODEL, CHAT_MAX_HISTORY, OPENAI_BASE_URL
+from .config import (ENABLE_CHAT, OPENAI_MODEL, OPENAI_BASE_URL, CHAT_TIMEOUT, CHAT_STREAM, CHAT_SUMMARY,
+                     CHAT_SUMMARY_TOKENS, CHAT_BACKEND, CHAT_LOCAL_FALLBACK, CHAT_LOCAL_FILL)
+from .perf import timed
+from .chatcache import ResponseCache, make_cache
+from .history import ChatHistory, SPEAKERS
+from .localchat import LocalBackend
+from .sim import Needs
+from .transport import ChatTransport, CircuitOpen, offline_reply, transient
+
+MAX_RETRACTABLE = 32  # answered requests whose turns can still be taken back
+
+SUMMARY_PROMPT = ("Summarize this chat between a user and their pet in a few short sentences. "
+                  "Keep names, facts and promises; drop small talk.")
+
+
+class RemoteBackend:
+    """Replies from an OpenAI-compatible server through ChatTransport, with the reply cache in front.
+
+    Raises CircuitOpen or the transport's error when the server can't be
+    reached; ChatEngine decides what to answer instead.
+    """
+
+    name = "remote"
+
+    def __init__(self, api_key: str, base_url: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 transport: Optional[ChatTransport] = None):
+        self.base_url = base_url
+        self.transport = transport or ChatTransport(api_key, base_url)
+        self.cache = cache
+
+    def _cached(self, history: ChatHistory) -> Tuple[Optional[str], Optional[str]]:
+        # (cache key, cached reply) for the current history; (None, None) without a cache
+        if self.cache is None:
+            return None, None
+        key = self.cache.key(OPENAI_MODEL, self.base_url, history.turns)
+        return key, self.cache.get(key)
+
+    def _store(self, key: Optional[str], text: str):
+        if key is not None and text:
+            self.cache.put(key, text)
+
+    def reply(self, history: ChatHistory, needs: Optional[Needs] = None) -> str:
+        key, text = self._cached(history)
+        if text is None:
+            resp = self.transport.create(model=OPENAI_MODEL, messages=history.messages())
+            text = resp.choices[0].message.content.strip()
+            self._store(key, text)
+        return text
+
+    def reply_stream(self, history: ChatHistory, needs: Optional[Needs] = None) -> Iterator[str]:
+        key, text = self._cached(history)
+        if text is not None:
+            yield text
+            return
+        stream = self.transport.create(model=OPENAI_MODEL, messages=history.messages(), stream=True)
+        parts = []
+        try:
+            for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    parts.append(delta)
+                    yield delta
+        except Exception as e:
+            if transient(e):
+                self.transport.stream_failed()
+            raise
+        finally:
+            stream.close()
+        self._store(key, "".join(parts).strip())
+
+    def summarize(self, summary: str, turns: Sequence[Tuple[str, str]]) -> str:
+        # runs on the history's summarizer thread
+        lines = "\n".join(f"{SPEAKERS.get(r, r)}: {c}" for r, c in turns)
+        resp = self.transport.create(
+            model=OPENAI_MODEL, max_tokens=CHAT_SUMMARY_TOKENS,
+            messages=[{"role": "system", "content": SUMMARY_PROMPT},
+                      {"role": "user", "content": f"Summary so far: {summary or '(none)'}\n\nNew lines:\n{lines}"}])
+        return resp.choices[0].message.content.strip()
+
+
+def unreachable(exc: BaseException) -> bool:
+    """The backend could not be reached (as opposed to rejecting the request)."""
+    return isinstance(exc, CircuitOpen) or transient(exc)
 
 
 class ChatEngine:
-    def __init__(self):
-        self.enabled = ENABLE_CHAT and (OpenAI is not None) and (os.getenv("OPENAI_API_KEY") is not None)
-        self.history: List[Tuple[str,str]] = []  # (role, content)
-        if self.enabled:
-            kwargs = {"api_key": os.getenv("OPENAI_API_KEY")}
-            if OPENAI_BASE_URL:
-                kwargs["base_url"] = OPENAI_BASE_URL
-            self.client = OpenAI(**kwargs)
-        else:
-            self.client = None
+    """The conversation plus the backends that answer it.
+
+    `backends` are tried in order until one replies without an unreachable
+    error: [remote, local] by default, [local] with CHAT_BACKEND=local or no
+    API key, [remote] with CHAT_BACKEND=remote and CHAT_LOCAL_FALLBACK off.
+    Any object with reply(history, needs) and reply_stream(history, needs)
+    can be passed in instead. `needs` is what the pet felt when the player
+    spoke, for backends that care.
+    """
+
+    def __init__(self, enabled: Optional[bool] = None, cache: Optional[ResponseCache] = None,
+                 backend: str = CHAT_BACKEND, backends: Optional[list] = None):
+        # enabled=False forces the engine offline (headless runs, benchmarks)
+        self.enabled = ENABLE_CHAT if enabled is None else ENABLE_CHAT and enabled
+        self.history = ChatHistory()
+        self.needs: Optional[Needs] = None
+        self.local = LocalBackend()
+        self.filled: Optional[str] = None  # filler() answer to the current turn
+        if backends is None and self.enabled:
+            backends = []
+            key = os.getenv("OPENAI_API_KEY")
+            if backend != "local" and OpenAI is not None and key is not None:
+                backends.append(RemoteBackend(key, OPENAI_BASE_URL, cache if cache is not None else make_cache()))
+            if backend == "local" or not backends or CHAT_LOCAL_FALLBACK:
+                backends.append(self.local)
+        self.backends = backends or []
+        self.enabled = bool(self.enabled and self.backends)
+        if self.remote is not None and CHAT_SUMMARY == "model":
+            self.history.summarizer = self.remote.summarize
+
+    @property
+    def remote(self) -> Optional[RemoteBackend]:
+        return next((b for b in self.backends if isinstance(b, RemoteBackend)), None)
+
+    @property
+    def cache(self) -> Optional[ResponseCache]:
+        return self.remote.cache if self.remote else None
+
+    @property
+    def transport(self) -> Optional[ChatTransport]:
+        return self.remote.transport if self.remote else None
 
     def is_ready(self) -> bool:
         return bool(self.enabled)
 
-    def push_user(self, content: str):
-        self.history.append(("user", content))
-        if len(self.history) > CHAT_MAX_HISTORY:
-            self.history = self.history[-CHAT_MAX_HISTORY:]
+    def push_user(self, content: str) -> Tuple[str, str]:
+        self.filled = None
+        return self.history.append("user", content)
 
+    def _remember(self, text: str):
+        self.history.append("assistant", text)
+
+    def filler(self, user_text: str) -> Optional[str]:
+        """Local answer to show while a remote reply is on its way (CHAT_LOCAL_FILL)."""
+        if not CHAT_LOCAL_FILL or not self.backends or self.backends[0] is self.local:
+            return None
+        self.filled = self.local.compose(user_text, self.needs)
+        return self.filled
+
+    def _backend_reply(self, backend) -> Iterator[str]:
+        if backend is self.local and self.filled:
+            yield self.filled  # falling back: keep the answer already shown
+            return
+        yield from backend.reply_stream(self.history, self.needs)
+
+    @timed("chat_reply")
     def reply(self) -> str:
         if not self.enabled:
-            return "(Chat disabled. Set OPENAI_API_KEY to enable.)"
-        messages = [{"role": r, "content": c} for r,c in self.history]
-        if not any(r == "system" for r,_ in self.history):
-            messages = [{"role": "system", "content": "You are a friendly, concise pet character. Keep responses short."}] + messages
-        resp = self.client.chat.completions.create(model=OPENAI_MODEL, messages=messages)
-        text = resp.choices[0].message.content.strip()
-        self.history.append(("assistant", text))
-        if len(self.history) > CHAT_MAX_HISTORY:
-            self.history = self.history[-CHAT_MAX_HISTORY:]
-        return text
+            return "(Chat disabled. Set ENABLE_CHAT=true to enable.)"
+        for backend in self.backends:
+            try:
+                text = self.filled if backend is self.local and self.filled else backend.reply(self.history, self.needs)
+            except Exception as e:
+                if unreachable(e):
+                    continue
+                raise
+            self._remember(text)
+            return text
+        return offline_reply()  # not remembered: no backend saw this turn
+
+    def reply_stream(self) -> Iterator[str]:
+        """Yield the reply in pieces as the backend streams it.
+
+        The full reply joins the history only if the stream runs to the end;
+        closing the generator early (cancellation) leaves the history as is.
+        A backend that can't be reached before its first piece hands over to
+        the next one; one that breaks off midway ends the reply there.
+        """
+        if not self.enabled:
+            yield "(Chat disabled. Set ENABLE_CHAT=true to enable.)"
+            return
+        for backend in self.backends:
+            parts = []
+            pieces = self._backend_reply(backend)
+            try:
+                for piece in pieces:
+                    parts.append(piece)
+                    yield piece
+            except Exception as e:
+                if not unreachable(e):
+                    raise
+                if parts:
+                    return  # a broken-off reply is neither cached nor remembered
+                continue
+            finally:
+                pieces.close()
+            self._remember("".join(parts).strip())
+            return
+        yield offline_reply()
+
+
+@dataclass
+class ChatResult:
+    req_id: int
+    user_text: str
+    text: str
+    error: bool = False
+    latency: float = 0.0
+    done: bool = True                # False for a partial (streamed) update
+    ttft: Optional[float] = None     # seconds to the first streamed piece
+
+
+class ChatWorker:
+    """Runs ChatEngine.reply on a background thread so the game loop never blocks.
+
+    submit() queues a user message and returns its request id; poll() is
+    called once per frame and returns the replies that finished since. A
+    request that has not made progress for `timeout` seconds is answered
+    with a timeout notice, and cancel() abandons everything pending; late
+    replies to abandoned requests are dropped when they arrive, and the
+    worker then takes the message and its reply back out of the history.
+    A request that fails with an error is taken back out the same way.
+
+    With `stream` on, poll() also returns partial results (done=False)
+    carrying the reply text received so far. The engine's filler() answer,
+    if any, comes first as such a partial result.
+    """
+
+    def __init__(self, engine: ChatEngine, timeout: float = CHAT_TIMEOUT, stream: bool = CHAT_STREAM):
+        self.engine = engine
+        self.timeout = timeout
+        self.stream = stream
+        # (req_id, user_text, needs); user_text None retracts that request from the history
+        self.requests: "queue.Queue[Optional[Tuple[int, Optional[str], Optional[Needs]]]]" = queue.Queue()
+        self.responses: "queue.Queue[ChatResult]" = queue.Queue()
+        self.pending: dict = {}        # req_id -> (user_text, submitted_at)
+        self.abandoned: Set[int] = set()
+        self.last_latency: Optional[float] = None
+        self.last_ttft: Optional[float] = None
+        self.ttfts: deque = deque(maxlen=50)  # recent time-to-first-token samples
+        self._turns: "OrderedDict[int, Tuple[str, str]]" = OrderedDict()  # req_id -> user turn (worker thread)
+        self._next_id = 0
+        self._thread: Optional[threading.Thread] = None
+
+    def busy(self) -> bool:
+        return bool(self.pending)
+
+    def submit(self, user_text: str, needs: Optional[Needs] = None) -> int:
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="pixelgotchi-chat", daemon=True)
+            self._thread.start()
+        self._next_id += 1
+        self.pending[self._next_id] = (user_text, time.monotonic())
+        self.requests.put((self._next_id, user_text, needs))
+        return self._next_id
+
+    def cancel(self) -> List[int]:
+        ids = list(self.pending)
+        self.abandoned.update(ids)
+        self.pending.clear()
+        return ids
+
+    def poll(self) -> List[ChatResult]:
+        out = []
+        while True:
+            try:
+                res = self.responses.get_nowait()
+            except queue.Empty:
+                break
+            if res.req_id in self.abandoned:
+                if res.done:
+                    self.abandoned.discard(res.req_id)
+                    self.requests.put((res.req_id, None, None))
+                continue
+            if not res.done:
+                if res.req_id in self.pending:
+                    # progress resets the timeout clock
+                    self.pending[res.req_id] = (res.user_text, time.monotonic())
+                out.append(res)
+                continue
+            self.pending.pop(res.req_id, None)
+            self.last_latency = res.latency
+            if res.ttft is not None:
+                self.last_ttft = res.ttft
+                self.ttfts.append(res.ttft)
+            out.append(res)
+        now = time.monotonic()
+        for req_id, (user_text, t0) in list(self.pending.items()):
+            if now - t0 > self.timeout:
+                del self.pending[req_id]
+                self.abandoned.add(req_id)
+                out.append(ChatResult(req_id, user_text, "(no reply, timed out)", error=True, latency=now - t0))
+        return out
+
+    def close(self):
+        self.cancel()
+        if self._thread is not None:
+            self.requests.put(None)
+
+    def _run(self):
+        while True:
+            item = self.requests.get()
+            if item is None:
+                return
+            req_id, user_text, needs = item
+            if user_text is None:
+                turn = self._turns.pop(req_id, None)
+                if turn is not None:
+                    self.engine.history.retract(turn)
+                continue
+            if req_id in self.abandoned:
+                self.abandoned.discard(req_id)
+                continue
+            t0 = time.monotonic()
+            ttft = None
+            try:
+                self.engine.needs = needs
+                self._turns[req_id] = self.engine.push_user(user_text)
+                while len(self._turns) > MAX_RETRACTABLE:
+                    self._turns.popitem(last=False)
+                quick = self.engine.filler(user_text)
+                if quick:
+                    self.responses.put(ChatResult(req_id, user_text, quick, done=False))
+                if self.stream:
+                    text = ""
+                    pieces = self.engine.reply_stream()
+                    for piece in pieces:
+                        if ttft is None:
+                            ttft = time.monotonic() - t0
+                        if req_id in self.abandoned:
+                            pieces.close()  # stop reading; the HTTP stream is closed too
+                            break
+                        text += piece
+                        self.responses.put(ChatResult(req_id, user_text, text, done=False, ttft=ttft))
+                    text, error = text.strip(), False
+                else:
+                    text, error = self.engine.reply(), False
+            except Exception as e:
+                text, error = f"(chat error: {type(e).__name__})", True
+                turn = self._turns.pop(req_id, None)
+                if turn is not None:
+                    self.engine.history.retract(turn)  # unanswered; don't send it again next time
+            self.responses.put(ChatResult(req_id, user_text, text, error, time.monotonic() - t0, ttft=ttft))
@@ -0,0 +1,109 @@
+"""Reply cache for ChatEngine: LRU + TTL in memory, optionally backed by SQLite.
+
+Players repeat themselves ("hi", "good pet", "I'm hungry"); a repeated
+message with the same recent context is answered from the cache instead of
+another round-trip to the model. The key covers the model, the base URL and
+the last CHAT_CACHE_WINDOW messages, lowercased with punctuation and extra
+spaces dropped. Entries expire CHAT_CACHE_TTL seconds after they were
+stored; with CHAT_CACHE_PATH set they are also kept in an SQLite file and
+survive restarts. The cache is off unless CHAT_CACHE=true: with a short
+window every repeated "hi" gets the same reply until it expires.
+"""
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Sequence, Tuple
+
+from .config import CHAT_CACHE, CHAT_CACHE_SIZE, CHAT_CACHE_TTL, CHAT_CACHE_PATH, CHAT_CACHE_WINDOW
+
+_PUNCT = re.compile(r"[^\w\s']+")
+
+
+def normalize(text: str) -> str:
+    return " ".join(_PUNCT.sub(" ", text.lower()).split())
+
+
+def cache_key(model: str, base_url: Optional[str], history: Sequence[Tuple[str, str]], window: int) -> str:
+    """Key for the reply to `history` (oldest first, system prompt excluded)."""
+    recent = [(role, normalize(text)) for role, text in history if role != "system"][-window:]
+    return hashlib.sha1(json.dumps([model, base_url or "", recent]).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """Thread-safe; ChatWorker calls it from its own thread."""
+
+    def __init__(self, capacity: int = CHAT_CACHE_SIZE, ttl: float = CHAT_CACHE_TTL,
+                 path: Optional[str] = CHAT_CACHE_PATH or None, window: int = CHAT_CACHE_WINDOW):
+        self.capacity = capacity
+        self.ttl = ttl
+        self.window = window
+        self.entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()  # key -> (reply, stored_at)
+        self.lock = threading.Lock()
+        self.hits = self.misses = 0
+        self.db: Optional[sqlite3.Connection] = None
+        if path:
+            self.db = sqlite3.connect(path, check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS replies (key TEXT PRIMARY KEY, reply TEXT, stored_at REAL)")
+            self.db.execute("DELETE FROM replies WHERE stored_at < ?", (time.time() - ttl,))
+            self.db.commit()
+
+    def key(self, model: str, base_url: Optional[str], history: Sequence[Tuple[str, str]]) -> str:
+        return cache_key(model, base_url, history, self.window)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None and self.db is not None:
+                row = self.db.execute("SELECT reply, stored_at FROM replies WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    entry = (row[0], row[1])
+                    self._put_memory(key, entry)
+            if entry is not None and now - entry[1] > self.ttl:
+                self.entries.pop(key, None)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            if key in self.entries:  # a capacity-0 cache serves SQLite hits without keeping them
+                self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, reply: str):
+        entry = (reply, time.time())
+        with self.lock:
+            self._put_memory(key, entry)
+            if self.db is not None:
+                self.db.execute("INSERT OR REPLACE INTO replies VALUES (?, ?, ?)", (key, *entry))
+                self.db.commit()
+
+    def _put_memory(self, key: str, entry: Tuple[str, float]):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.capacity:
+            self.entries.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            if self.db is not None:
+                self.db.execute("DELETE FROM replies")
+                self.db.commit()
+
+    def close(self):
+        if self.db is not None:
+            self.db.close()
+            self.db = None
+
+
+def make_cache() -> Optional[ResponseCache]:
+    return ResponseCache() if CHAT_CACHE else None
@@ -37,25 +37,91 @@ WINDOW_W, WINDOW_H = VIRTUAL_W * SCALE, VIRTUAL_H * SCALE
 # Load .env if present
 load_dotenv()
 
+# Let SDL do the integer upscale (pygame SCALED window) instead of PixelCanvas
+DISPLAY_SCALED = os.getenv("DISPLAY_SCALED", "false").lower() in ("1","true","yes","on")
+
+# Rendering caches
+SPRITE_CACHE_SIZE = int(os.getenv("SPRITE_CACHE_SIZE", "64"))  # pre-rendered pet frames kept (LRU)
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "256"))     # rendered text surfaces kept (LRU)
+
+# Particles: fixed pool size and what to do when a burst does not fit
+# ("replace_oldest" overwrites the oldest live particles, "drop_new" ignores the excess)
+PARTICLE_CAPACITY = int(os.getenv("PARTICLE_CAPACITY", "4096"))
+PARTICLE_OVERFLOW = os.getenv("PARTICLE_OVERFLOW", "replace_oldest")
+
 # Chat feature config (can be overridden by .env)
 ENABLE_CHAT = os.getenv("ENABLE_CHAT", "true").lower() in ("1","true","yes","on")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+CHAT_BACKEND = os.getenv("CHAT_BACKEND", "auto")  # "remote", "local" (templates, no network) or "auto" (remote if configured)
+CHAT_LOCAL_FALLBACK = os.getenv("CHAT_LOCAL_FALLBACK", "true").lower() in ("1","true","yes","on")  # answer locally when the server can't be reached
+CHAT_LOCAL_FILL = os.getenv("CHAT_LOCAL_FILL", "true").lower() in ("1","true","yes","on")  # show a local answer until the remote reply arrives
 CHAT_MAX_HISTORY = int(os.getenv("CHAT_MAX_HISTORY", "6"))
+CHAT_HISTORY_TOKENS = int(os.getenv("CHAT_HISTORY_TOKENS", "600"))  # estimated tokens of recent turns sent verbatim
+CHAT_SUMMARY_TOKENS = int(os.getenv("CHAT_SUMMARY_TOKENS", "120"))  # size of the rolling summary of older turns
+CHAT_SUMMARY = os.getenv("CHAT_SUMMARY", "local")  # "local" heuristic, or "model" to have the model rewrite it in the background
+CHAT_TIMEOUT = float(os.getenv("CHAT_TIMEOUT", "20"))  # seconds without progress before a reply is given up
+CHAT_REQUEST_TIMEOUT = float(os.getenv("CHAT_REQUEST_TIMEOUT", "15"))  # deadline for one request, retries included
+CHAT_CONNECT_TIMEOUT = float(os.getenv("CHAT_CONNECT_TIMEOUT", "3"))  # seconds to open a connection
+CHAT_RETRIES = int(os.getenv("CHAT_RETRIES", "2"))  # retries of a request after a transient error
+CHAT_RETRY_BACKOFF = float(os.getenv("CHAT_RETRY_BACKOFF", "0.25"))  # first backoff in seconds (doubles, full jitter)
+CHAT_POOL_SIZE = int(os.getenv("CHAT_POOL_SIZE", "4"))  # keep-alive connections to the chat server
+CHAT_KEEPALIVE = float(os.getenv("CHAT_KEEPALIVE", "30"))  # seconds an idle connection is kept open
+CHAT_BREAKER_FAILURES = int(os.getenv("CHAT_BREAKER_FAILURES", "3"))  # failed requests in a row that open the breaker (0 = never)
+CHAT_BREAKER_COOLDOWN = float(os.getenv("CHAT_BREAKER_COOLDOWN", "30"))  # seconds of offline replies before trying again
+CHAT_SCROLLBACK = int(os.getenv("CHAT_SCROLLBACK", "500"))  # wrapped chat lines kept for scrolling back
+CHAT_STREAM = os.getenv("CHAT_STREAM", "true").lower() in ("1","true","yes","on")  # show replies token by token
+CHAT_CACHE = os.getenv("CHAT_CACHE", "false").lower() in ("1","true","yes","on")  # answer repeated messages from a reply cache
+CHAT_CACHE_SIZE = int(os.getenv("CHAT_CACHE_SIZE", "256"))  # replies kept in memory (LRU)
+CHAT_CACHE_TTL = float(os.getenv("CHAT_CACHE_TTL", "3600"))  # seconds a cached reply stays valid
+CHAT_CACHE_PATH = os.getenv("CHAT_CACHE_PATH", "")  # SQLite file to keep replies across restarts ("" = memory only)
+CHAT_CACHE_WINDOW = int(os.getenv("CHAT_CACHE_WINDOW", "1"))  # recent messages that must match for a hit
+ADAPTIVE_FPS = os.getenv("ADAPTIVE_FPS", "true").lower() in ("1","true","yes","on")  # slow the loop down when nothing moves
+IDLE_FPS = int(os.getenv("IDLE_FPS", "10"))  # frame rate while nothing animates
+BACKGROUND_FPS = int(os.getenv("BACKGROUND_FPS", "2"))  # frame rate while unfocused or minimised
+PERF_OVERLAY = os.getenv("PERF_OVERLAY", "false").lower() in ("1","true","yes","on")  # start with the F3 overlay shown
+PERF_HISTORY = int(os.getenv("PERF_HISTORY", "68"))  # frames shown in the overlay sparkline
+PROFILE_FRAMES = int(os.getenv("PROFILE_FRAMES", "300"))  # frames captured by the F4 profiler
+PROFILE_DIR = os.getenv("PROFILE_DIR", ".")  # where F4 writes .prof files
 CHAT_SENTIMENT_FUN_GAIN = float(os.getenv("CHAT_SENTIMENT_FUN_GAIN", "0.25"))
 CHAT_SENTIMENT_FUN_LOSS = float(os.getenv("CHAT_SENTIMENT_FUN_LOSS", "0.25"))
 CHAT_SENTIMENT_ENERGY_GAIN = float(os.getenv("CHAT_SENTIMENT_ENERGY_GAIN", "0.05"))
 CHAT_SENTIMENT_ENERGY_LOSS = float(os.getenv("CHAT_SENTIMENT_ENERGY_LOSS", "0.05"))
 CHAT_SENTIMENT_HYGIENE_GAIN = float(os.getenv("CHAT_SENTIMENT_HYGIENE_GAIN", "0.00"))
 CHAT_SENTIMENT_HYGIENE_LOSS = float(os.getenv("CHAT_SENTIMENT_HYGIENE_LOSS", "0.00"))
+CHAT_SENTIMENT_GAINS = {
+    "fun_gain": CHAT_SENTIMENT_FUN_GAIN, "fun_loss": CHAT_SENTIMENT_FUN_LOSS,
+    "energy_gain": CHAT_SENTIMENT_ENERGY_GAIN, "energy_loss": CHAT_SENTIMENT_ENERGY_LOSS,
+    "hygiene_gain": CHAT_SENTIMENT_HYGIENE_GAIN, "hygiene_loss": CHAT_SENTIMENT_HYGIENE_LOSS,
+}
+SENTIMENT_LEXICON = os.getenv("SENTIMENT_LEXICON")  # "weighted", or a file of `term weight` lines; unset: unit weights
+
+# Need decay per second; the sleep factors scale hunger and fun decay while asleep
+DECAY_RATES = {
+    "hunger_up": float(os.getenv("HUNGER_UP", str(1/600.0))),
+    "energy_down_awake": float(os.getenv("ENERGY_DOWN_AWAKE", str(1/1200.0))),
+    "energy_up_sleep": float(os.getenv("ENERGY_UP_SLEEP", str(1/600.0))),
+    "fun_down": float(os.getenv("FUN_DOWN", str(1/900.0))),
+    "hygiene_down": float(os.getenv("HYGIENE_DOWN", str(1/1800.0))),
+    "hunger_sleep_factor": float(os.getenv("HUNGER_SLEEP_FACTOR", "0.6")),
+    "fun_sleep_factor": float(os.getenv("FUN_SLEEP_FACTOR", "0.4")),
+}
+TUNE_CACHE_DIR = Path(os.getenv("TUNE_CACHE_DIR", str(Path.home() / ".pixelgotchi_tune")))  # tune.py results
 
 # Allow overriding the OpenAI-compatible base URL (e.g., vLLM, OpenRouter, local server)
 # Set environment variable OPENAI_BASE_URL to use. Example: http://localhost:8000/v1
 OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")  # None = use default api.openai.com
 
-FPS = 60
+FPS = int(os.getenv("FPS", "60"))  # render rate
+SIM_HZ = float(os.getenv("SIM_HZ", "10"))  # fixed simulation rate of the needs and pet timers
+SIM_MAX_CATCHUP = float(os.getenv("SIM_MAX_CATCHUP", "1.0"))  # seconds of sim run after a stall; the rest is skipped
 
 # Save location
 SAVE_PATH = Path.home() / ".pixelgotchi_save.json"
+SAVE_INTERVAL = float(os.getenv("SAVE_INTERVAL", "5"))  # seconds between autosaves (0 = only on exit)
+SAVE_FSYNC_INTERVAL = float(os.getenv("SAVE_FSYNC_INTERVAL", "2"))  # at most this long between journal fsyncs
+SAVE_COMPACT_EVERY = int(os.getenv("SAVE_COMPACT_EVERY", "120"))  # journal entries before a new snapshot
+SAVE_COALESCE = float(os.getenv("SAVE_COALESCE", "0.5"))  # saves closer together than this are written once
+SAVE_DEADLINE = float(os.getenv("SAVE_DEADLINE", "2"))  # longest a save may wait while more keep coming
 
 # Colors
 WHITE = (255, 255, 255)
@@ -0,0 +1,148 @@
+"""Local OpenAI-compatible stand-in server for trying the chat without a real LLM.
+
+    python -m pixelgotchi.devserver --port 8000 --delay 2
+    OPENAI_BASE_URL=http://127.0.0.1:8000/v1 OPENAI_API_KEY=dummy python -m pixelgotchi
+
+Answers POST /v1/chat/completions with a short canned reply that echoes the
+last user message, after an optional artificial delay. Requests with
+"stream": true get server-sent events, one word per chunk, like vLLM and
+OpenAI do.
+
+For exercising retries and the circuit breaker it can also misbehave:
+--fail-rate answers a share of requests with 503, --drop-rate closes the
+connection without answering, --stall-rate sleeps --stall seconds first,
+and --jitter adds a random extra delay.
+
+    python -m pixelgotchi.devserver --fail-rate 0.2 --drop-rate 0.05 --stall-rate 0.05 --stall 30
+"""
+import argparse
+import json
+import random
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+def canned_reply(messages) -> str:
+    last = next((m.get("content", "") for m in reversed(messages) if m.get("role") == "user"), "")
+    return f"*wiggles* You said: {last}" if last else "*wiggles*"
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, so pooled clients reuse connections
+    disable_nagle_algorithm = True  # headers and body go out as separate writes
+    delay = 0.0
+    token_delay = 0.0
+    jitter = 0.0
+    fail_rate = 0.0
+    drop_rate = 0.0
+    stall_rate = 0.0
+    stall = 30.0
+    rng = random.Random()
+
+    def log_message(self, fmt, *args):  # keep the terminal quiet
+        pass
+
+    def _json(self, code: int, body: dict):
+        data = json.dumps(body).encode()
+        self.send_response(code)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        try:
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client gave up (e.g. its deadline passed during a stall)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self._json(404, {"error": {"message": "not found"}})
+            return
+        req = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+        if self.delay or self.jitter:
+            time.sleep(self.delay + self.rng.uniform(0, self.jitter))
+        fault = self.rng.random()
+        if fault < self.drop_rate:
+            self.close_connection = True  # no response at all
+            return
+        fault -= self.drop_rate
+        if fault < self.fail_rate:
+            self._json(503, {"error": {"message": "injected failure", "type": "server_error"}})
+            return
+        fault -= self.fail_rate
+        if fault < self.stall_rate:
+            time.sleep(self.stall)
+        text = canned_reply(req.get("messages", []))
+        if req.get("stream"):
+            self._stream(req, text)
+            return
+        self._json(200, {
+            "id": "chatcmpl-dev",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "dev"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": 0, "completion_tokens": 0, "total_tokens": 0},
+        })
+
+    def _stream(self, req: dict, text: str):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")  # no Content-Length: the end of the body is the close
+        self.end_headers()
+        self.close_connection = True
+        base = {"id": "chatcmpl-dev", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": req.get("model", "dev")}
+        words = text.split(" ")
+        deltas = [{"role": "assistant", "content": ""}]
+        deltas += [{"content": (w if i == 0 else " " + w)} for i, w in enumerate(words)]
+        try:
+            for i, delta in enumerate(deltas):
+                if i and self.token_delay:
+                    time.sleep(self.token_delay)
+                chunk = dict(base, choices=[{"index": 0, "delta": delta, "finish_reason": None}])
+                self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\n")
+                self.wfile.flush()
+            chunk = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            self.wfile.write(b"data: " + json.dumps(chunk).encode() + b"\n\ndata: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # client cancelled mid-stream
+
+
+def serve(host: str = "127.0.0.1", port: int = 8000, delay: float = 0.0, token_delay: float = 0.0,
+          jitter: float = 0.0, fail_rate: float = 0.0, drop_rate: float = 0.0, stall_rate: float = 0.0,
+          stall: float = 30.0, seed: int = None) -> ThreadingHTTPServer:
+    handler = type("DevHandler", (Handler,), {
+        "delay": delay, "token_delay": token_delay, "jitter": jitter, "fail_rate": fail_rate,
+        "drop_rate": drop_rate, "stall_rate": stall_rate, "stall": stall, "rng": random.Random(seed)})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True  # stalled handlers must not hold up shutdown
+    return server
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pixelgotchi.devserver")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--delay", type=float, default=0.0, help="seconds to wait before each reply")
+    ap.add_argument("--token-delay", type=float, default=0.0, help="seconds between streamed words")
+    ap.add_argument("--jitter", type=float, default=0.0, help="random extra delay up to this many seconds")
+    ap.add_argument("--fail-rate", type=float, default=0.0, help="share of requests answered with 503")
+    ap.add_argument("--drop-rate", type=float, default=0.0, help="share of requests dropped without a response")
+    ap.add_argument("--stall-rate", type=float, default=0.0, help="share of requests that hang for --stall seconds")
+    ap.add_argument("--stall", type=float, default=30.0)
+    ap.add_argument("--seed", type=int)
+    args = ap.parse_args(argv)
+    server = serve(args.host, args.port, args.delay, args.token_delay, args.jitter, args.fail_rate,
+                   args.drop_rate, args.stall_rate, args.stall, args.seed)
+    print(f"serving on http://{args.host}:{server.server_port}/v1 (delay {args.delay}s)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
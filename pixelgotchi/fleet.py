@@ -0,0 +1,326 @@
+"""Many pets at once: PetState's rules applied to NumPy columns.
+
+    python -m pixelgotchi.fleet --pets 200000 --hours 48 --policy caretaker
+
+For balancing and retention studies. A Fleet holds the needs, flags and
+timestamps of N pets as arrays and applies the same decay, clamp, death
+and action rules as PetState, with bit-identical results (see verify()).
+A policy decides which action each pet takes at each decision point, and
+simulate_many() spreads chunks of the fleet over a process pool and merges
+the death times into survival curves and time-to-death histograms.
+"""
+import argparse
+import json
+import math
+import os
+import random
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Optional, Sequence
+
+try:
+    import numpy as np
+except Exception:  # optional
+    np = None
+
+from .state import PetState, rates_for, STARVED_AT, EXHAUSTED_AT
+
+# Action codes, as used by policies and Fleet.act
+NONE, FEED, PLAY, SLEEP, CLEAN = range(5)
+ACTIONS = {FEED: "Feed", PLAY: "Play", SLEEP: "Sleep", CLEAN: "Clean"}
+REASONS = ("", "Starved", "Exhausted")
+NEEDS = ("hunger", "energy", "fun", "hygiene")
+
+
+def _clamp(x):
+    return np.maximum(0.0, np.minimum(1.0, x))
+
+
+class Fleet:
+    """Needs, flags and timestamps of N pets as column arrays."""
+
+    def __init__(self, n: int, **init):
+        if np is None:
+            raise RuntimeError("fleet simulation needs NumPy")
+        d = PetState(last_timestamp=0.0)
+        self.hunger = np.full(n, d.hunger)
+        self.energy = np.full(n, d.energy)
+        self.fun = np.full(n, d.fun)
+        self.hygiene = np.full(n, d.hygiene)
+        self.asleep = np.zeros(n, bool)
+        self.alive = np.ones(n, bool)
+        self.reason = np.zeros(n, np.int8)       # index into REASONS
+        self.last_timestamp = np.zeros(n)
+        self.died_at = np.full(n, np.nan)
+        for name, val in init.items():
+            getattr(self, name)[...] = val
+
+    def __len__(self) -> int:
+        return len(self.hunger)
+
+    @classmethod
+    def from_states(cls, states: Sequence[PetState]) -> "Fleet":
+        f = cls(len(states))
+        for name in NEEDS + ("asleep", "alive", "last_timestamp"):
+            getattr(f, name)[:] = [getattr(s, name) for s in states]
+        f.reason[:] = [REASONS.index(s.death_reason) for s in states]
+        f.died_at[:] = [np.nan if s.died_at is None else s.died_at for s in states]
+        return f
+
+    def state(self, i: int) -> PetState:
+        died = self.died_at[i]
+        return PetState(hunger=float(self.hunger[i]), energy=float(self.energy[i]), fun=float(self.fun[i]),
+                        hygiene=float(self.hygiene[i]), asleep=bool(self.asleep[i]), alive=bool(self.alive[i]),
+                        death_reason=REASONS[self.reason[i]], last_timestamp=float(self.last_timestamp[i]),
+                        died_at=None if np.isnan(died) else float(died))
+
+    # --- Simulation (mirrors PetState.apply_offline) ---
+    def _rates(self):
+        awake, asleep = rates_for(False), rates_for(True)
+        return tuple(np.where(self.asleep, asleep[k], awake[k]) for k in NEEDS)
+
+    def apply_offline(self, now):
+        last = self.last_timestamp
+        dt = np.maximum(0.0, now - last)
+        live = self.alive.copy()
+        r_h, r_e, r_f, r_y = self._rates()
+        with np.errstate(divide="ignore", invalid="ignore"):
+            starve = np.where(r_h > 0, np.maximum(0.0, (STARVED_AT - self.hunger) / r_h), np.inf)
+            exhaust = np.where(r_e < 0, np.maximum(0.0, (self.energy - EXHAUSTED_AT) / -r_e), np.inf)
+        starved_first = starve <= exhaust
+        t_death = np.where(starved_first, starve, exhaust)
+        dies = live & (t_death <= dt)
+        step = np.where(dies, t_death, dt)
+        self.energy = np.where(live, _clamp(self.energy + step * r_e), self.energy)
+        self.hunger = np.where(live, _clamp(self.hunger + step * r_h), self.hunger)
+        self.fun = np.where(live, _clamp(self.fun + step * r_f), self.fun)
+        self.hygiene = np.where(live, _clamp(self.hygiene + step * r_y), self.hygiene)
+        self._die(dies, np.where(starved_first, 1, 2), last + t_death)
+        self.check_death(live & ~dies)
+        self.last_timestamp = np.broadcast_to(np.asarray(now, float), last.shape).copy()
+
+    def tick(self, dt: float):
+        self.apply_offline(self.last_timestamp + dt)
+
+    def check_death(self, mask=None):
+        mask = self.alive if mask is None else mask & self.alive
+        starved = mask & (self.hunger >= STARVED_AT)
+        exhausted = mask & ~starved & (self.energy <= EXHAUSTED_AT)
+        self._die(starved, 1, self.last_timestamp)
+        self._die(exhausted, 2, self.last_timestamp)
+
+    def _die(self, mask, reason, at):
+        if not mask.any():
+            return
+        self.alive[mask] = False
+        self.asleep[mask] = False
+        self.reason[mask] = np.broadcast_to(reason, mask.shape)[mask]
+        unset = mask & np.isnan(self.died_at)
+        self.died_at[unset] = np.broadcast_to(at, mask.shape)[unset]
+
+    # --- Actions (mirror PetState; like the game, only living pets act) ---
+    def act(self, actions):
+        actions = np.asarray(actions)
+        live = self.alive
+        m = live & (actions == FEED)
+        self.hunger[m] = _clamp(self.hunger[m] - 0.5)
+        self.hygiene[m] = _clamp(self.hygiene[m] - 0.05)
+        m = live & (actions == PLAY)
+        self.fun[m] = _clamp(self.fun[m] + 0.5)
+        self.energy[m] = _clamp(self.energy[m] - 0.1)
+        self.hunger[m] = _clamp(self.hunger[m] + 0.1)
+        m = live & (actions == SLEEP)
+        self.asleep[m] = ~self.asleep[m]
+        m = live & (actions == CLEAN)
+        self.hygiene[m] = _clamp(self.hygiene[m] + 0.6)
+
+
+# --- Policies: (fleet, t, rng) -> action code per pet ---
+
+class IdlePolicy:
+    """Nobody looks after their pet."""
+
+    def __call__(self, fleet: Fleet, t: float, rng) -> "np.ndarray":
+        return np.zeros(len(fleet), np.int8)
+
+
+class CaretakerPolicy:
+    """Acts on the worst need once it passes a line, like an attentive player."""
+
+    def __init__(self, hunger: float = 0.7, energy: float = 0.25, fun: float = 0.3, hygiene: float = 0.3,
+                 wake: float = 0.95, attention: float = 1.0):
+        self.hunger, self.energy, self.fun, self.hygiene = hunger, energy, fun, hygiene
+        self.wake = wake
+        self.attention = attention  # chance the player checks in at a decision point
+
+    def __call__(self, fleet: Fleet, t: float, rng) -> "np.ndarray":
+        out = np.zeros(len(fleet), np.int8)
+        out[fleet.hygiene < self.hygiene] = CLEAN
+        out[(fleet.fun < self.fun) & ~fleet.asleep & (fleet.energy > self.energy + 0.1)] = PLAY
+        out[fleet.hunger > self.hunger] = FEED
+        out[~fleet.asleep & (fleet.energy < self.energy)] = SLEEP
+        out[fleet.asleep & (fleet.energy > self.wake)] = SLEEP
+        if self.attention < 1.0:
+            out[rng.random(len(fleet)) >= self.attention] = NONE
+        return out
+
+
+class RandomPolicy:
+    """Each pet takes a random action with probability `p` per decision."""
+
+    def __init__(self, p: float = 0.05):
+        self.p = p
+
+    def __call__(self, fleet: Fleet, t: float, rng) -> "np.ndarray":
+        acts = rng.integers(1, 5, len(fleet)).astype(np.int8)
+        acts[rng.random(len(fleet)) >= self.p] = NONE
+        return acts
+
+
+POLICIES = {"idle": IdlePolicy, "caretaker": CaretakerPolicy, "random": RandomPolicy}
+
+
+def simulate(n: int, horizon: float, step: float = 10.0, policy: Callable = None, decide_every: float = 60.0,
+             seed: int = 0, randomize: bool = False) -> Dict[str, "np.ndarray"]:
+    """Run n pets for `horizon` seconds of sim time; returns death times (nan = survived) and reasons."""
+    rng = np.random.default_rng(seed)
+    policy = policy or IdlePolicy()
+    fleet = Fleet(n)
+    if randomize:
+        fleet.hunger[:] = rng.uniform(0.0, 0.6, n)
+        fleet.energy[:] = rng.uniform(0.3, 1.0, n)
+        fleet.fun[:] = rng.uniform(0.2, 1.0, n)
+        fleet.hygiene[:] = rng.uniform(0.2, 1.0, n)
+    actions = np.zeros(5, np.int64)
+    every = max(1, round(decide_every / step))
+    for i in range(int(math.ceil(horizon / step))):
+        if i % every == 0:
+            acts = policy(fleet, i * step, rng)
+            actions += np.bincount(acts[fleet.alive], minlength=5)
+            fleet.act(acts)
+        fleet.tick(step)
+        if not fleet.alive.any():
+            break
+    return {"died_at": fleet.died_at, "reason": fleet.reason, "actions": actions}
+
+
+def _simulate_chunk(args) -> Dict[str, "np.ndarray"]:
+    n, horizon, step, policy, decide_every, seed, randomize = args
+    return simulate(n, horizon, step, policy, decide_every, seed, randomize)
+
+
+def simulate_many(n: int, horizon: float, step: float = 10.0, policy: Callable = None, decide_every: float = 60.0,
+                  seed: int = 0, randomize: bool = False, chunk: int = 25000,
+                  workers: Optional[int] = None) -> Dict[str, "np.ndarray"]:
+    """simulate() in chunks of `chunk` pets over a process pool (workers=1 runs inline)."""
+    sizes = [min(chunk, n - i) for i in range(0, n, chunk)]
+    seeds = np.random.SeedSequence(seed).generate_state(len(sizes)).tolist()
+    jobs = [(k, horizon, step, policy, decide_every, s, randomize) for k, s in zip(sizes, seeds)]
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(jobs) == 1:
+        parts = [_simulate_chunk(j) for j in jobs]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+            parts = list(pool.map(_simulate_chunk, jobs))
+    return {"died_at": np.concatenate([p["died_at"] for p in parts]),
+            "reason": np.concatenate([p["reason"] for p in parts]),
+            "actions": sum(p["actions"] for p in parts)}
+
+
+# --- Summaries ---
+
+def survival_curve(died_at: "np.ndarray", horizon: float, points: int = 25):
+    """(times, fraction of pets still alive at each time)."""
+    times = np.linspace(0.0, horizon, points)
+    d = np.where(np.isnan(died_at), np.inf, died_at)
+    d.sort()
+    alive = 1.0 - np.searchsorted(d, times, side="right") / max(1, len(d))
+    return times, alive
+
+
+def death_histogram(died_at: "np.ndarray", horizon: float, bins: int = 24):
+    """(bin edges, deaths per bin) over [0, horizon]; survivors are not counted."""
+    return np.histogram(died_at[~np.isnan(died_at)], bins=bins, range=(0.0, horizon))[::-1]
+
+
+def summarize(res: Dict[str, "np.ndarray"], horizon: float, points: int = 25, bins: int = 24) -> dict:
+    died_at, reason = res["died_at"], res["reason"]
+    times, alive = survival_curve(died_at, horizon, points)
+    edges, counts = death_histogram(died_at, horizon, bins)
+    dead = died_at[~np.isnan(died_at)]
+    return {
+        "pets": len(died_at),
+        "survived": int(np.isnan(died_at).sum()),
+        "reasons": {REASONS[i]: int((reason == i).sum()) for i in (1, 2)},
+        "median_death_h": float(np.median(dead) / 3600) if len(dead) else None,
+        "actions": {ACTIONS[i]: int(res["actions"][i]) for i in ACTIONS},
+        "survival": [[float(t), float(a)] for t, a in zip(times, alive)],
+        "death_histogram": {"edges": edges.tolist(), "counts": counts.tolist()},
+    }
+
+
+def verify(n: int = 2000, steps: int = 300, seed: int = 0) -> int:
+    """Run the same random states and actions through Fleet and PetState; returns mismatching pets."""
+    rnd = random.Random(seed)
+    states = [PetState(hunger=rnd.random(), energy=rnd.random(), fun=rnd.random(), hygiene=rnd.random(),
+                       asleep=rnd.random() < 0.3, last_timestamp=rnd.uniform(0, 1e6)) for _ in range(n)]
+    fleet = Fleet.from_states(states)
+    for _ in range(steps):
+        acts = [rnd.choice((NONE, NONE, NONE, FEED, PLAY, SLEEP, CLEAN)) for _ in range(n)]
+        dt = rnd.choice((0.1, 1.0, 1 / 60, rnd.uniform(0, 600)))
+        for s, a in zip(states, acts):
+            if a and s.alive:
+                getattr(s, {FEED: "feed", PLAY: "play", SLEEP: "toggle_sleep", CLEAN: "clean"}[a])()
+            s.tick(dt)
+        fleet.act(acts)
+        fleet.tick(dt)
+    fields = NEEDS + ("asleep", "alive", "death_reason", "last_timestamp", "died_at")
+    return sum(1 for i, s in enumerate(states)
+               if any(getattr(s, k) != getattr(fleet.state(i), k) for k in fields))
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pixelgotchi.fleet")
+    ap.add_argument("--pets", type=int, default=100000)
+    ap.add_argument("--hours", type=float, default=48.0)
+    ap.add_argument("--step", type=float, default=10.0, help="sim step in seconds")
+    ap.add_argument("--decide-every", type=float, default=60.0, help="seconds between policy decisions")
+    ap.add_argument("--policy", choices=sorted(POLICIES), default="caretaker")
+    ap.add_argument("--attention", type=float, default=1.0, help="caretaker: chance of checking in per decision")
+    ap.add_argument("--randomize", action="store_true", help="random starting needs instead of the defaults")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=0, help="processes (0 = all cores)")
+    ap.add_argument("--chunk", type=int, default=25000, help="pets per process-pool task")
+    ap.add_argument("--json", help="write the summary to this file")
+    ap.add_argument("--verify", action="store_true", help="only check Fleet against PetState")
+    args = ap.parse_args(argv)
+
+    if args.verify:
+        bad = verify()
+        print(f"{bad} mismatching pets")
+        return 1 if bad else 0
+    policy = CaretakerPolicy(attention=args.attention) if args.policy == "caretaker" else POLICIES[args.policy]()
+    horizon = args.hours * 3600
+    res = simulate_many(args.pets, horizon, args.step, policy, args.decide_every, args.seed, args.randomize,
+                        args.chunk, args.workers or None)
+    summ = summarize(res, horizon)
+    print(f"{summ['pets']} pets, {summ['survived']} survived {args.hours:g} h; deaths {summ['reasons']}")
+    if summ["median_death_h"] is not None:
+        print(f"median time to death {summ['median_death_h']:.2f} h")
+    print("survival:")
+    for t, a in summ["survival"][::3]:
+        print(f"  {t/3600:6.1f} h  {a*100:6.2f}%  {'#' * int(a * 40)}")
+    hist = summ["death_histogram"]
+    if any(hist["counts"]):
+        print("deaths:")
+        top = max(hist["counts"])
+        for lo, hi, c in zip(hist["edges"], hist["edges"][1:], hist["counts"]):
+            print(f"  {lo/3600:6.2f}-{hi/3600:<6.2f} h {c:8d}  {'#' * round(c / top * 40)}")
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(summ, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
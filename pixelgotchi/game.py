@@ -1,16 +1,26 @@
 import os
 os.environ["SDL_HINT_RENDER_SCALE_QUALITY"] = "0"  # nearest-neighbor
 import math
+import random
+from collections import deque
 import pygame as pg
 from typing import Optional, List
 
 from .config import *
-from .state import PetState, load_state, save_state, clamp
+from .state import PetState, load_state, save_state, save_record, clamp
+from .journal import SaveJournal, SaveWriter
 from .appearance import random_appearance
 from .pet import PetSprite
-from .ui import draw_bar, draw_help, draw_chat_dialog
+from .ui import draw_bar, draw_help, draw_chat_dialog, draw_perf_overlay, render_text, text_cache, chat_log
+from .render import CachedLayer, DirtyTracker, make_background
+from .particles import ParticleSystem
+from .sim import FixedStep, Needs, NeedsInterpolator
+from .needs import NeedEvent, NeedsScheduler, stat_emotion
+from .sound import tones
 from .chat import ChatEngine
-from .sentiment import sentiment_score
+from .loop import LiveDriver
+from .perf import FrameProfiler, span, stats as frame_stats
+from .sentiment import sentiment_score, sentiment_deltas
 
 actions = [
     ("Feed", "F", "Decrease hunger"),
@@ -19,20 +29,84 @@ actions = [
     ("Clean", "C", "Increase hygiene"),
 ]
 
+CHAT_PAGE_LINES = 4  # lines per PageUp/PageDown in the chat dialog
+
 class PixelCanvas:
-    def __init__(self, vw, vh, scale):
-        self.vw, self.vh, self.scale = vw, vh, scale
+    def __init__(self, vw, vh, scale, display_scaled: bool = False):
+        self.vw, self.vh = vw, vh
+        # With display_scaled the window's logical size is the canvas and SDL
+        # does the (integer) upscale on present, so `scale` is not used.
+        self.display_scaled = display_scaled
+        self.scale = max(1, int(scale))
         self.surface = pg.Surface((vw, vh))
+        self.background = make_background(vw, vh)  # fill + grid, drawn once
+        self.scaled: Optional[pg.Surface] = None   # preallocated upscale target
+        self.dirty = DirtyTracker(vw, vh)
+
+    def window_size(self):
+        if self.display_scaled:
+            return (self.vw, self.vh)
+        return (self.vw * self.scale, self.vh * self.scale)
+
+    def open_window(self) -> pg.Surface:
+        screen = pg.display.set_mode(self.window_size(), pg.SCALED if self.display_scaled else 0)
+        # Match the display format so scaling and blits need no conversion.
+        self.surface = self.surface.convert()
+        self.background = self.background.convert()
+        self.scaled = None
+        self.dirty.invalidate()
+        return screen
+
+    def set_scale(self, scale: int) -> bool:
+        """Change the upscale factor; returns True if the window must be reopened."""
+        scale = max(1, int(scale))
+        if self.display_scaled or scale == self.scale:
+            return False
+        self.scale = scale
+        return True
+
+    def to_virtual(self, pos):
+        if self.display_scaled:
+            return pos  # SDL already reports logical coordinates
+        return pos[0] // self.scale, pos[1] // self.scale
 
     def begin(self):
-        self.surface.fill((20, 20, 20))
-
-    def end_blit(self, screen):
-        scaled = pg.transform.scale(self.surface, (self.vw * self.scale, self.vh * self.scale))
-        screen.blit(scaled, (0, 0))
+        self.surface.blit(self.background, (0, 0))
+
+    def end_blit(self, screen, rects: Optional[List[pg.Rect]] = None) -> List[pg.Rect]:
+        """Present the given canvas rects (all of it by default); returns the screen rects.
+
+        Only those rects are scaled: each goes from a subsurface of the
+        canvas straight onto the matching area of the screen when it has the
+        scaled size and format, otherwise into a destination surface that is
+        only reallocated when the size changes (subsurfaces are views, not
+        copies).
+        """
+        bounds = self.surface.get_rect()
+        rects = [bounds] if rects is None else [r for r in (bounds.clip(r) for r in rects) if r.w and r.h]
+        if self.display_scaled:
+            for r in rects:
+                screen.blit(self.surface, r, r)
+            return rects
+        s = self.scale
+        size = (self.vw * s, self.vh * s)
+        out = [pg.Rect(r.x * s, r.y * s, r.w * s, r.h * s) for r in rects]
+        direct = screen.get_size() == size and screen.get_masks() == self.surface.get_masks()
+        if not direct and (self.scaled is None or self.scaled.get_size() != size):
+            self.scaled = pg.Surface(size, 0, self.surface)
+        target = screen if direct else self.scaled
+        if bounds in rects:
+            pg.transform.scale(self.surface, size, target)
+        else:
+            for r, o in zip(rects, out):
+                pg.transform.scale(self.surface.subsurface(r), o.size, target.subsurface(o))
+        if not direct:
+            for o in out:
+                screen.blit(self.scaled, o, o)
+        return out
 
 
-def compute_mood(state: PetState) -> float:
+def compute_mood(state) -> float:
     good = [state.energy, state.fun, state.hygiene, 1 - state.hunger]
     return clamp(sum(good)/len(good))
 
@@ -41,22 +115,12 @@ def beep(enabled: bool, freq=880, dur_ms=60):
     if not enabled:
         return
     try:
-        pg.mixer.init()
-        sample_rate = 22050
-        n = int(sample_rate * (dur_ms/1000.0))
-        buf = bytearray()
-        for i in range(n):
-            t = i / sample_rate
-            s = int(32767 * 0.2 * math.sin(2*math.pi*freq*t))
-            buf += s.to_bytes(2, byteorder='little', signed=True)
-        snd = pg.mixer.Sound(buffer=bytes(buf))
-        snd.play()
+        tones.play(freq, dur_ms)
     except Exception:
         pass
 
 
 def random_choice(options):
-    import random
     return options[random.randrange(len(options))]
 
 
@@ -71,38 +135,36 @@ def do_action(state: PetState, name: str):
         state.toggle_sleep()
     elif name == "Clean":
         state.clean()
-    state.last_timestamp = pg.time.get_ticks() / 1000.0
 
 
 def do_action_with_fx(state: PetState, name: str, pet: PetSprite,
-                      particles: List, floats: List, muted: bool, font):
+                      particles: ParticleSystem, floats: List, muted: bool, font):
     was_asleep = state.asleep
     do_action(state, name)
     pet.reaction = 1.0
     px, py = VIRTUAL_W//2, VIRTUAL_H//2
     if name == "Feed":
         spawn_particles_burst(particles, px, py, color=GREEN)
-        floats.append((font.render(random_choice(["Yum!","Delish!","Nom nom!","Mmmm!"]), False, WHITE), px-12, py-18))
+        floats.append((render_text(font, random_choice(["Yum!","Delish!","Nom nom!","Mmmm!"]), False, WHITE), px-12, py-18))
         beep(not muted, freq=520)
         pet.set_emotion("love", 1.2)
     elif name == "Play":
         spawn_particles_confetti(particles, px, py)
-        floats.append((font.render(random_choice(["Fun!","Yay!","Woo!","Nice!"]), False, WHITE), px-10, py-18))
+        floats.append((render_text(font, random_choice(["Fun!","Yay!","Woo!","Nice!"]), False, WHITE), px-10, py-18))
         beep(not muted, freq=760)
         pet.set_emotion("excited", 1.2)
         # Random surprise during play
-        import random
         if random.random() < SURPRISE_PROB_PLAY:
             pet.set_emotion("surprised", 0.8)
-            floats.append((font.render(random_choice(["Whoa!","Woah!","Huh?","Oh!"]), False, WHITE), px-8, py-28))
+            floats.append((render_text(font, random_choice(["Whoa!","Woah!","Huh?","Oh!"]), False, WHITE), px-8, py-28))
     elif name == "Sleep":
         spawn_particles_stars(particles, px+16, py-10)
-        floats.append((font.render(random_choice(["ZzZ","Sleepy...","Nap time"]), False, WHITE), px-12, py-20))
+        floats.append((render_text(font, random_choice(["ZzZ","Sleepy...","Nap time"]), False, WHITE), px-12, py-20))
         beep(not muted, freq=400)
         pet.set_emotion("sleepy", 1.5)
     elif name == "Clean":
         spawn_particles_bubbles(particles, px, py)
-        floats.append((font.render(random_choice(["Fresh!","Squeaky!","Shiny!","So clean!"]), False, WHITE), px-14, py-20))
+        floats.append((render_text(font, random_choice(["Fresh!","Squeaky!","Shiny!","So clean!"]), False, WHITE), px-14, py-20))
         beep(not muted, freq=640)
         pet.set_emotion("yuck", 0.9)
 
@@ -112,89 +174,98 @@ def do_action_with_fx(state: PetState, name: str, pet: PetSprite,
     # Angry if you woke the pet from sleep
     if WAKE_ANGRY and name == "Sleep" and was_asleep and not state.asleep:
         pet.set_emotion("angry", 1.2)
-        floats.append((font.render(random_choice(["Hey!","Grr...","Let me sleep!","Ugh!"]), False, WHITE), px-16, py-32))
+        floats.append((render_text(font, random_choice(["Hey!","Grr...","Let me sleep!","Ugh!"]), False, WHITE), px-16, py-32))
         beep(not muted, freq=300)
 
 
-class Particle:
-    def __init__(self, x, y, vx, vy, life, color):
-        self.x, self.y, self.vx, self.vy, self.life, self.color = x, y, vx, vy, life, color
-
-    def update(self, dt):
-        self.x += self.vx * dt
-        self.y += self.vy * dt
-        self.life -= dt
-
-    def draw(self, surf: pg.Surface):
-        if self.life > 0:
-            if 0 <= int(self.x) < VIRTUAL_W and 0 <= int(self.y) < VIRTUAL_H:
-                surf.set_at((int(self.x), int(self.y)), self.color)
-
-
-def spawn_particles_burst(particles, cx, cy, color=WHITE, n=20):
-    import random
+def spawn_particles_burst(particles: ParticleSystem, cx, cy, color=WHITE, n=20):
+    xs, ys, vxs, vys, lifes = [], [], [], [], []
     for _ in range(n):
         ang = random.random() * math.tau
         spd = 20 + random.random()*30
-        vx, vy = math.cos(ang)*spd, math.sin(ang)*spd
-        particles.append(Particle(cx, cy, vx, vy, life=0.4+random.random()*0.3, color=color))
+        xs.append(cx); ys.append(cy)
+        vxs.append(math.cos(ang)*spd); vys.append(math.sin(ang)*spd)
+        lifes.append(0.4+random.random()*0.3)
+    particles.emit(xs, ys, vxs, vys, lifes, [color]*n)
 
 
-def spawn_particles_confetti(particles, cx, cy, n=30):
-    import random
+def spawn_particles_confetti(particles: ParticleSystem, cx, cy, n=30):
     cols = [RED, GREEN, BLUE, YELLOW, PURPLE, CYAN]
+    xs, vxs, vys, colors = [], [], [], []
     for _ in range(n):
-        vx = (random.random()-0.5) * 50
-        vy = -20 - random.random()*30
-        color = random.choice(cols)
-        particles.append(Particle(cx + (random.random()-0.5)*10, cy, vx, vy, life=0.8, color=color))
+        vxs.append((random.random()-0.5) * 50)
+        vys.append(-20 - random.random()*30)
+        colors.append(random.choice(cols))
+        xs.append(cx + (random.random()-0.5)*10)
+    particles.emit(xs, [cy]*n, vxs, vys, [0.8]*n, colors)
 
 
-def spawn_particles_stars(particles, cx, cy, n=8):
-    import random
+def spawn_particles_stars(particles: ParticleSystem, cx, cy, n=8):
+    vxs, vys = [], []
     for _ in range(n):
-        vx = (random.random()-0.5) * 10
-        vy = -5 - random.random()*10
-        particles.append(Particle(cx, cy, vx, vy, life=1.0, color=YELLOW))
+        vxs.append((random.random()-0.5) * 10)
+        vys.append(-5 - random.random()*10)
+    particles.emit([cx]*n, [cy]*n, vxs, vys, [1.0]*n, [YELLOW]*n)
 
 
-def spawn_particles_bubbles(particles, cx, cy, n=16):
-    import random
+def spawn_particles_bubbles(particles: ParticleSystem, cx, cy, n=16):
+    xs, vxs, vys = [], [], []
     for _ in range(n):
-        vx = (random.random()-0.5) * 10
-        vy = -10 - random.random()*10
-        particles.append(Particle(cx + (random.random()-0.5)*8, cy+8, vx, vy, life=0.9, color=BLUE))
+        vxs.append((random.random()-0.5) * 10)
+        vys.append(-10 - random.random()*10)
+        xs.append(cx + (random.random()-0.5)*8)
+    particles.emit(xs, [cy+8]*n, vxs, vys, [0.9]*n, [BLUE]*n)
+
+
+# EMOTION_THRESHOLDS key -> (emotion, seconds, phrases, x offset of the float)
+STAT_EMOTIONS = {
+    "energy_low": ("tired", 1.2, ["Tired...","So sleepy","Low energy"], -18),
+    "hunger_high": ("sad", 1.2, ["Hungry...","Feed me","Stomach growls"], -20),
+    "fun_low": ("sad", 1.0, ["Bored...","Play?","Lonely..."], -16),
+    "hygiene_low": ("yuck", 1.0, ["Dirty...","Messy","Eww!"], -12),
+}
+
+
+def show_stat_emotion(key: str, pet: PetSprite, floats: List, font):
+    emotion, secs, phrases, dx = STAT_EMOTIONS[key]
+    pet.set_emotion(emotion, secs)
+    floats.append((render_text(font, random_choice(phrases), False, WHITE), VIRTUAL_W//2 + dx, VIRTUAL_H//2 - 34))
 
 
 def apply_stat_emotions(state: PetState, pet: PetSprite, floats: List, font):
     # Priority-driven thresholds from config
-    px, py = VIRTUAL_W//2, VIRTUAL_H//2
-    for key in EMOTION_PRIORITY:
-        if key == "energy_low" and state.energy < EMOTION_THRESHOLDS["energy_low"]:
-            pet.set_emotion("tired", 1.2)
-            floats.append((font.render(random_choice(["Tired...","So sleepy","Low energy"]), False, WHITE), px-18, py-34))
-            return
-        if key == "hunger_high" and state.hunger > EMOTION_THRESHOLDS["hunger_high"]:
-            pet.set_emotion("sad", 1.2)
-            floats.append((font.render(random_choice(["Hungry...","Feed me","Stomach growls"]), False, WHITE), px-20, py-34))
-            return
-        if key == "fun_low" and state.fun < EMOTION_THRESHOLDS["fun_low"]:
-            pet.set_emotion("sad", 1.0)
-            floats.append((font.render(random_choice(["Bored...","Play?","Lonely..."]), False, WHITE), px-16, py-34))
-            return
-        if key == "hygiene_low" and state.hygiene < EMOTION_THRESHOLDS["hygiene_low"]:
-            pet.set_emotion("yuck", 1.0)
-            floats.append((font.render(random_choice(["Dirty...","Messy","Eww!"]), False, WHITE), px-12, py-34))
-            return
-
-
-def main():
+    key = stat_emotion(state)
+    if key is not None:
+        show_stat_emotion(key, pet, floats, font)
+
+
+def react_to_need(ev: NeedEvent, pet: PetSprite, floats: List, font, muted: bool):
+    # A need just crossed its threshold (or the pet woke rested / died) on its own.
+    if ev.key in STAT_EMOTIONS:
+        show_stat_emotion(ev.key, pet, floats, font)
+    elif ev.kind == "rested":
+        pet.set_emotion("excited", 1.0)
+        floats.append((render_text(font, "Rested!", False, WHITE), VIRTUAL_W//2 - 14, VIRTUAL_H//2 - 34))
+    elif ev.kind == "died":
+        beep(not muted, freq=300)
+
+
+def main(driver=None, state: Optional[PetState] = None, chat: Optional[ChatEngine] = None,
+         persist: bool = True) -> PetState:
+    """Run the game until quit; returns the final state.
+
+    `driver` supplies frame deltas and input (the real clock and event queue
+    by default, see loop.py). With persist=False the save file is neither
+    read nor written.
+    """
     pg.init()
-    screen = pg.display.set_mode((WINDOW_W, WINDOW_H))
+    driver = driver or LiveDriver()
+    canvas = PixelCanvas(VIRTUAL_W, VIRTUAL_H, SCALE, DISPLAY_SCALED)
+    screen = canvas.open_window()
     pg.display.set_caption("Pixelgotchi")
-    clock = pg.time.Clock()
+    tones.init()  # mixer + all action tones, before the first frame
 
-    canvas = PixelCanvas(VIRTUAL_W, VIRTUAL_H, SCALE)
+    hud = CachedLayer((VIRTUAL_W, VIRTUAL_H))
     # Main UI font
     font = pg.font.SysFont("Courier", 8)
     # Chat font (configurable)
@@ -206,50 +277,88 @@ def main():
     except Exception:
         chat_font = font  # fallback
 
-    state = load_state()
+    if state is None:
+        state = load_state() if persist else PetState()
     if not state.appearance:
         state.appearance = random_appearance()
     pet = PetSprite()
-    chat = ChatEngine()
+    chat = chat or ChatEngine()
+    chat_worker = driver.chat_worker(chat)
     typing = False
     input_text = ""
     chat_open = False
     chat_messages: List[tuple] = []  # (role, text)
+    streaming: dict = {}  # req_id -> index in chat_messages of a reply still streaming in
 
     running = True
     show_help = False
     muted = False
     action_idx = 0
     hovered_idx: Optional[int] = None
-    particles: List[Particle] = []
+    particles = ParticleSystem()
     floats: List[tuple] = []  # (surface, x, y)
     hovered_chat: bool = False
+    perf_overlay = False
+    dts = deque(maxlen=PERF_HISTORY)  # recent frame deltas, for the overlay's FPS
+    profiler = FrameProfiler(PROFILE_DIR)
+    stepper = FixedStep(SIM_HZ, SIM_MAX_CATCHUP)  # needs and pet timers advance in fixed steps
+    needs = NeedsInterpolator(state)
+    scheduler = NeedsScheduler(state)  # threshold/death events at their exact times
+    sim_now = state.last_timestamp  # sim clock; the state is only brought up to it when needed
+    # Autosaves hand a snapshot to a writer thread, which appends the changes to the journal
+    saver = SaveWriter(SaveJournal(SAVE_PATH)) if persist else None
+    since_save = 0.0
+    if PERF_OVERLAY and not frame_stats.enabled:
+        perf_overlay = True
+        frame_stats.start(PERF_HISTORY)
 
     while running:
-        dt = clock.tick(FPS) / 1000.0
-
-        for event in pg.event.get():
+        dt = driver.tick()
+        dts.append(dt)
+        frame_stats.begin_frame()
+        need_events: List[NeedEvent] = []
+        events = driver.events()
+        if any(ev.type in (pg.KEYDOWN, pg.MOUSEBUTTONDOWN) for ev in events):
+            need_events += scheduler.advance(state, sim_now)  # input acts on the needs as of now
+        before_input = (state, Needs.of(state), state.alive)
+
+        for event in events:
             if event.type == pg.QUIT:
                 running = False
+            elif event.type in (pg.VIDEOEXPOSE, pg.WINDOWEXPOSED, pg.WINDOWRESTORED):
+                canvas.dirty.invalidate()
             elif event.type == pg.KEYDOWN:
+                # Perf tools work everywhere, even with the chat dialog open
+                if event.key == pg.K_F3:
+                    perf_overlay = not perf_overlay
+                    if perf_overlay: frame_stats.start(PERF_HISTORY)
+                    else: frame_stats.stop()
+                elif event.key == pg.K_F4 and not profiler.active:
+                    profiler.start(PROFILE_FRAMES)
+                    floats.append((render_text(font, "Profiling...", False, WHITE), 6, VIRTUAL_H-30))
                 # When in chat dialog, capture keys exclusively
-                if chat_open:
+                elif chat_open:
                     if event.key == pg.K_ESCAPE:
-                        chat_open = False
-                        typing = False
-                        input_text = ""
+                        if chat_worker.busy():
+                            # first Esc gives up on the pending reply, the next one closes
+                            chat_worker.cancel()
+                            streaming.clear()
+                            chat_messages.append(("assistant", "(cancelled)"))
+                        else:
+                            chat_open = False
+                            typing = False
+                            input_text = ""
                     elif event.key == pg.K_RETURN:
-                        # send
+                        # send; the reply arrives through chat_worker.poll()
                         if input_text.strip():
                             user_text = input_text.strip()
                             chat_messages.append(("user", user_text))
                             if chat.is_ready():
-                                chat.push_user(user_text)
-                                reply = chat.reply()
+                                chat_worker.submit(user_text, Needs.of(state))
                             else:
                                 reply = "(chat disabled)"
-                            chat_messages.append(("assistant", reply))
-                            apply_chat_sentiment_effects(state, pet, user_text + "\n" + reply, floats, font)
+                                chat_messages.append(("assistant", reply))
+                                apply_chat_sentiment_effects(state, pet, user_text + "\n" + reply, floats, font)
                             input_text = ""
                         else:
                             # empty enter closes dialog
@@ -257,6 +366,8 @@ def main():
                             typing = False
                     elif event.key == pg.K_BACKSPACE:
                         input_text = input_text[:-1]
+                    elif event.key in (pg.K_PAGEUP, pg.K_PAGEDOWN):
+                        chat_log.scroll_by(CHAT_PAGE_LINES if event.key == pg.K_PAGEUP else -CHAT_PAGE_LINES)
                     else:
                         ch = event.unicode
                         if ch and 32 <= ord(ch) < 127 and len(input_text) < 200:
@@ -270,14 +381,14 @@ def main():
                     elif event.key == pg.K_RETURN:
                         typing = False
                         if input_text.strip():
+                            floats.append((render_text(font, f"You: {input_text.strip()}", False, WHITE), 6, VIRTUAL_H-30))
+                            chat_messages.append(("user", input_text.strip()))
                             if chat.is_ready():
-                                chat.push_user(input_text.strip())
-                                reply = chat.reply()
+                                chat_worker.submit(input_text.strip(), Needs.of(state))
                             else:
                                 reply = "(chat disabled)"
-                            floats.append((font.render(f"You: {input_text.strip()}", False, WHITE), 6, VIRTUAL_H-30))
-                            floats.append((font.render(f"Pet: {reply[:28]}", False, WHITE), 6, VIRTUAL_H-20))
-                            apply_chat_sentiment_effects(state, pet, input_text + "\n" + reply, floats, font)
+                                floats.append((render_text(font, f"Pet: {reply[:28]}", False, WHITE), 6, VIRTUAL_H-20))
+                                apply_chat_sentiment_effects(state, pet, input_text + "\n" + reply, floats, font)
                         input_text = ""
                     elif event.key == pg.K_BACKSPACE:
                         input_text = input_text[:-1]
@@ -292,13 +403,17 @@ def main():
                     show_help = not show_help
                 elif event.key == pg.K_m:
                     muted = not muted
+                elif event.key in (pg.K_EQUALS, pg.K_PLUS, pg.K_KP_PLUS, pg.K_MINUS, pg.K_KP_MINUS):
+                    step = -1 if event.key in (pg.K_MINUS, pg.K_KP_MINUS) else 1
+                    if canvas.set_scale(canvas.scale + step):
+                        screen = canvas.open_window()
                 elif event.key == pg.K_t:
                     # open dialog chat UI instead of inline
                     chat_open = True
                     typing = True
                     input_text = ""
                 elif event.key == pg.K_r and not state.alive:
-                    state = PetState(); state.apply_offline(pg.time.get_ticks()/1000.0)
+                    state = PetState(); state.apply_offline(driver.ticks_ms()/1000.0); sim_now = state.last_timestamp
                     state.appearance = random_appearance(); particles.clear(); floats.clear()
                 elif event.key == pg.K_LEFT:
                     action_idx = (action_idx - 1) % len(actions)
@@ -316,17 +431,17 @@ def main():
                 elif event.key == pg.K_c:
                     do_action_with_fx(state, "Clean", pet, particles, floats, muted, font)
             elif event.type == pg.MOUSEMOTION:
-                mx, my = event.pos
-                vx, vy = mx // SCALE, my // SCALE
+                vx, vy = canvas.to_virtual(event.pos)
                 if state.alive:
                     hovered_idx = hit_test_action(vx, vy, font)
                 else:
                     hovered_idx = None
                 # chat button hover
                 hovered_chat = get_chat_button_rect(font).collidepoint(vx, vy)
+            elif event.type == pg.MOUSEWHEEL and chat_open:
+                chat_log.scroll_by(event.y)
             elif event.type == pg.MOUSEBUTTONDOWN and event.button == 1:
-                mx, my = event.pos
-                vx, vy = mx // SCALE, my // SCALE
+                vx, vy = canvas.to_virtual(event.pos)
                 # chat button click
                 if get_chat_button_rect(font).collidepoint(vx, vy):
                     chat_open = True
@@ -341,51 +456,181 @@ def main():
                         do_action_with_fx(state, name, pet, particles, floats, muted, font)
                 else:
                     if hit_test_respawn(vx, vy, font):
-                        state = PetState(); state.apply_offline(pg.time.get_ticks()/1000.0)
-                        state.appearance = random_appearance(); particles.clear(); floats.clear(); save_state(state)
-
-        if state.alive:
-            state.tick(dt)
-            pet.update(dt)
-        for p in particles: p.update(dt)
-        particles = [p for p in particles if p.life > 0]
-        floats = [(s, x, y-12*dt) for (s, x, y) in floats if y > -10]
-
-        canvas.begin(); surf = canvas.surface
-        for gx in range(0, VIRTUAL_W, 8): pg.draw.line(surf, (24,24,24), (gx,0), (gx,VIRTUAL_H))
-        for gy in range(0, VIRTUAL_H, 8): pg.draw.line(surf, (24,24,24), (0,gy), (VIRTUAL_W,gy))
-
-        mood = compute_mood(state)
-        px = VIRTUAL_W//2 - 12; py = VIRTUAL_H//2 - 10
-        if not state.appearance: state.appearance = random_appearance()
-        pet.draw(surf, px, py, mood, state.asleep, state.appearance)
-
-        draw_bar(surf, 6, 6, 40, 4, 1 - state.hunger, GREEN); surf.blit(font.render("Food", False, WHITE), (6, 1))
-        draw_bar(surf, 6, 16, 40, 4, state.energy, YELLOW); surf.blit(font.render("Energy", False, WHITE), (6, 11))
-        draw_bar(surf, 6, 26, 40, 4, state.fun, CYAN); surf.blit(font.render("Fun", False, WHITE), (6, 21))
-        draw_bar(surf, 6, 36, 40, 4, state.hygiene, BLUE); surf.blit(font.render("Clean", False, WHITE), (6, 31))
-
-        if state.alive:
-            draw_actions(surf, font, action_idx, hovered_idx)
-            surf.blit(font.render(f"Mood {int(mood*100)}%", False, WHITE), (VIRTUAL_W-52, 2))
-            if state.asleep: surf.blit(font.render("Z z z", False, WHITE), (px+18, py-6))
-        else:
-            draw_death_screen(surf, font, state.death_reason)
-
-        for s, x, y in floats: surf.blit(s, (int(x), int(y)))
-
-        if show_help and state.alive: draw_help(surf, font)
-
-        # Chat button
-        draw_chat_button(surf, font, hovered_chat, chat_open)
-
-        # Chat dialog box
-        if chat_open:
-            draw_chat_dialog(surf, chat_font, chat_messages, input_text, int(pg.time.get_ticks()/300)%2==0)
-
-        canvas.end_blit(screen); pg.display.flip()
-
-    save_state(state); pg.quit()
+                        state = PetState(); state.apply_offline(driver.ticks_ms()/1000.0); sim_now = state.last_timestamp
+                        state.appearance = random_appearance(); particles.clear(); floats.clear()
+
+        if driver.done:
+            running = False
+
+        # Replies (and streamed partial replies) from the chat worker since last frame
+        with span("update"):
+            for res in chat_worker.poll():
+                idx = streaming.get(res.req_id)
+                if idx is None:
+                    chat_messages.append(("assistant", res.text))
+                else:
+                    chat_messages[idx] = ("assistant", res.text)
+                if not res.done:
+                    streaming[res.req_id] = len(chat_messages) - 1 if idx is None else idx
+                    continue
+                streaming.pop(res.req_id, None)
+                if not res.error:
+                    need_events += scheduler.advance(state, sim_now)
+                    apply_chat_sentiment_effects(state, pet, res.user_text + "\n" + res.text, floats, font)
+
+            # Save after anything the player did (bursts coalesce in the writer) and every SAVE_INTERVAL
+            since_save += dt
+            if saver and SAVE_INTERVAL > 0:
+                touched = before_input[0] is not state or before_input[1:] != (Needs.of(state), state.alive)
+                if touched or since_save >= SAVE_INTERVAL:
+                    since_save = 0.0
+                    need_events += scheduler.advance(state, sim_now)
+                    saver.submit(save_record(state))
+
+            # The needs are linear between events, so the state is only advanced when
+            # the next crossing (or death) is due; the HUD reads Needs.at the step time.
+            if scheduler.changed(state):
+                need_events += scheduler.advance(state, sim_now)
+            needs.begin(Needs.at(state, sim_now))
+            due = scheduler.next_at(state)
+            for _ in range(stepper.advance(dt)):
+                if state.alive:
+                    sim_now += stepper.step
+                    if sim_now >= due:
+                        need_events += scheduler.advance(state, sim_now)
+                        due = scheduler.next_at(state)
+                    pet.update(stepper.step)
+                needs.stepped(Needs.at(state, sim_now))
+            for ev in need_events:
+                react_to_need(ev, pet, floats, font, muted)
+            floats = [(s, x, y-12*dt) for (s, x, y) in floats if y > -10]
+        with span("particles"):
+            particles.update(dt)
+
+        # Compose the canvas from layers and mark what each one shows, so
+        # only regions that actually changed are pushed to the window.
+        with span("draw"):
+            canvas.begin(); surf = canvas.surface; dirty = canvas.dirty
+
+            view = needs.view(stepper.alpha)  # needs as of render time, between the last two steps
+            mood = compute_mood(view)
+            px = VIRTUAL_W//2 - 12; py = VIRTUAL_H//2 - 10
+            if not state.appearance: state.appearance = random_appearance()
+
+            if state.alive:
+                # Pet layer
+                dirty.mark(pet.draw(surf, px, py, mood, state.asleep, state.appearance, stepper.ahead), pet.frame_key)
+                # HUD layer, repainted only when a bar or the mood moves by a visible pixel
+                with span("hud"):
+                    bars = hud_bar_fills(view)
+                    mood_pct = int(mood*100)
+                    hud.update((bars, mood_pct, action_idx, hovered_idx, state.asleep),
+                               lambda s: draw_hud(s, font, view, mood_pct, action_idx, hovered_idx, px, py))
+                    surf.blit(hud.surface, (0, 0))
+                    dirty.mark(HUD_STATS_RECT, bars)
+                    dirty.mark((VIRTUAL_W-52, 2, 52, font.get_height()), mood_pct)
+                    dirty.mark(actions_rect(font), (action_idx, hovered_idx))
+                    if state.asleep: dirty.mark(render_text(font, "Z z z", False, WHITE).get_rect(topleft=(px+18, py-6)), "zzz")
+            else:
+                with span("hud"):
+                    dirty.mark(draw_death_screen(surf, font, state.death_reason), ("death", state.death_reason))
+
+            # FX layer
+            with span("particles"):
+                fx_rect = particles.draw(surf)
+                if fx_rect: dirty.mark(fx_rect)
+            for s, x, y in floats: dirty.mark(surf.blit(s, (int(x), int(y))), id(s))
+
+            if show_help and state.alive: dirty.mark(draw_help(surf, font), "help")
+
+            # Chat button
+            dirty.mark(draw_chat_button(surf, font, hovered_chat, chat_open), (hovered_chat, chat_open))
+
+            # Chat dialog box
+            if chat_open:
+                cursor_on = int(driver.ticks_ms()/300)%2==0
+                thinking = chat_worker.busy() and not streaming
+                rect = draw_chat_dialog(surf, chat_font, chat_messages, input_text, cursor_on, thinking, chat_log)
+                dirty.mark(rect, ("chat", len(chat_messages), chat_messages[-1] if chat_messages else None,
+                                  input_text, cursor_on, thinking, chat_log.scroll))
+
+            # Perf overlay (F3), redrawn every frame
+            if perf_overlay:
+                frame_ms = [f["frame"] * 1000 for f in frame_stats.frames]
+                dirty.mark(draw_perf_overlay(surf, font, perf_lines(dts, frame_ms, particles, chat_worker, driver.load(), saver),
+                                             frame_ms, 1000.0 / FPS))
+
+        with span("present"):
+            rects = dirty.collect()
+            if rects: pg.display.update(canvas.end_blit(screen, rects))
+        frame_stats.end_frame()
+        # Anything still moving keeps the full frame rate; otherwise the driver may idle.
+        driver.set_active(bool(len(particles) or floats or pet.reaction > 0 or pet.face_timer > 0
+                               or chat_worker.busy() or profiler.active))
+        if profiler.step():
+            floats.append((render_text(font, "Profile saved", False, WHITE), 6, VIRTUAL_H-30))
+
+    chat_worker.close()
+    scheduler.advance(state, sim_now)
+    if saver: save_state(state, writer=saver)
+    pg.quit()
+    return state
+
+
+def perf_lines(dts, frame_ms: List[float], particles: ParticleSystem, chat_worker, load=None,
+               saver: Optional[SaveWriter] = None) -> List[str]:
+    fps = len(dts) / sum(dts) if sum(dts) else 0.0
+    last = frame_ms[-1] if frame_ms else 0.0
+    peak = max(frame_ms) if frame_ms else 0.0
+    lat = chat_worker.last_latency
+    lines = [
+        f"{fps:.0f}fps {last:.1f}ms",
+        f"peak {peak:.1f}ms",
+        f"parts {len(particles)}",
+        f"text {text_cache.hit_rate()*100:.0f}%",
+        f"chat {lat:.2f}s" if lat is not None else "chat -",
+    ]
+    cache = getattr(chat_worker.engine, "cache", None)
+    if cache is not None:
+        lines.append(f"chat$ {cache.hit_rate()*100:.0f}%")
+    transport = getattr(chat_worker.engine, "transport", None)
+    if transport is not None and transport.breaker.state != "closed":
+        lines.append(f"net {transport.breaker.state}")
+    if load:
+        lines.append(f"cpu {load[0]:.0f}% {load[1]:.0f}/s")
+    if saver and saver.latency:
+        lines.append(f"save q{saver.depth} {saver.latency[-1]*1000:.1f}ms")
+    return lines
+
+
+HUD_STATS_RECT = pg.Rect(0, 0, 48, 42)  # stat labels + bars
+
+
+def hud_bar_fills(state) -> tuple:
+    # Filled width in pixels of each stat bar, as draw_bar computes it.
+    return tuple(int(40 * clamp(v)) for v in (1 - state.hunger, state.energy, state.fun, state.hygiene))
+
+
+def draw_hud(surf: pg.Surface, font, state, mood_pct: int, action_idx: int,
+             hovered_idx: Optional[int], px: int, py: int):
+    draw_bar(surf, 6, 6, 40, 4, 1 - state.hunger, GREEN); surf.blit(render_text(font, "Food", False, WHITE), (6, 1))
+    draw_bar(surf, 6, 16, 40, 4, state.energy, YELLOW); surf.blit(render_text(font, "Energy", False, WHITE), (6, 11))
+    draw_bar(surf, 6, 26, 40, 4, state.fun, CYAN); surf.blit(render_text(font, "Fun", False, WHITE), (6, 21))
+    draw_bar(surf, 6, 36, 40, 4, state.hygiene, BLUE); surf.blit(render_text(font, "Clean", False, WHITE), (6, 31))
+    draw_actions(surf, font, action_idx, hovered_idx)
+    surf.blit(render_text(font, f"Mood {mood_pct}%", False, WHITE), (VIRTUAL_W-52, 2))
+    if state.asleep: surf.blit(render_text(font, "Z z z", False, WHITE), (px+18, py-6))
+
+
+def actions_rect(font) -> pg.Rect:
+    margin = 6; ax = margin; row_h = font.get_height() + 6
+    x = ax; y = VIRTUAL_H - (row_h + 4); gap = 4
+    rects = []
+    for name, hot, _ in actions:
+        label = f"[{hot}] {name}"; w, h = font.size(label)
+        if x + w + 6 > VIRTUAL_W - margin: x = ax; y -= row_h
+        rects.append(pg.Rect(x-2, y-2, w+4, h+4)); x += w + gap + 6
+    return rects[0].unionall(rects[1:])
 
 
 def draw_actions(surf: pg.Surface, font, active_idx: int, hovered_idx: Optional[int]):
@@ -397,7 +642,7 @@ def draw_actions(surf: pg.Surface, font, active_idx: int, hovered_idx: Optional[
         rect = pg.Rect(x-2, y-2, w+4, h+4)
         bg = (30,30,30); bg = (40,40,60) if i == active_idx else bg; bg = (60,60,80) if hovered_idx == i else bg
         pg.draw.rect(surf, bg, rect); pg.draw.rect(surf, (0,0,0), rect, 1)
-        surf.blit(font.render(label, False, WHITE), (x, y)); x += w + gap + 6
+        surf.blit(render_text(font, label, False, WHITE), (x, y)); x += w + gap + 6
 
 
 def hit_test_action(vx: int, vy: int, font) -> Optional[int]:
@@ -417,11 +662,12 @@ def draw_death_screen(surf: pg.Surface, font, reason: str):
     w, h = 110, 60; x, y = (VIRTUAL_W - w)//2, (VIRTUAL_H - h)//2
     pg.draw.rect(surf, (20,20,20), (x, y, w, h)); pg.draw.rect(surf, WHITE, (x, y, w, h), 1)
     lines = ["Your Pixelgotchi", f"has died ({reason}).", "Press R or click"]
-    for i, line in enumerate(lines): surf.blit(font.render(line, False, WHITE), (x+6, y+6 + i*12))
+    for i, line in enumerate(lines): surf.blit(render_text(font, line, False, WHITE), (x+6, y+6 + i*12))
     bx, by, bw, bh = x+8, y+h-18, w-16, 12
     pg.draw.rect(surf, (40,40,60), (bx, by, bw, bh)); pg.draw.rect(surf, (0,0,0), (bx, by, bw, bh), 1)
     label = "Respawn"; tw, th = font.size(label)
-    surf.blit(font.render(label, False, WHITE), (bx + (bw - tw)//2, by + (bh - th)//2))
+    surf.blit(render_text(font, label, False, WHITE), (bx + (bw - tw)//2, by + (bh - th)//2))
+    return (0, 0, VIRTUAL_W, VIRTUAL_H)
 
 
 def hit_test_respawn(vx: int, vy: int, font) -> bool:
@@ -449,32 +695,23 @@ def draw_chat_button(surf: pg.Surface, font, hovered: bool, active: bool):
     pg.draw.rect(surf, (0,0,0), rect, 1)
     label = "Chat"
     w, h = font.size(label)
-    surf.blit(font.render(label, False, WHITE), (rect.x + (rect.w - w)//2, rect.y + (rect.h - h)//2))
+    surf.blit(render_text(font, label, False, WHITE), (rect.x + (rect.w - w)//2, rect.y + (rect.h - h)//2))
+    return rect
 
 
 def apply_chat_sentiment_effects(state: PetState, pet: PetSprite, text: str, floats: List, font):
-    from .config import (
-        CHAT_SENTIMENT_FUN_GAIN, CHAT_SENTIMENT_FUN_LOSS,
-        CHAT_SENTIMENT_ENERGY_GAIN, CHAT_SENTIMENT_ENERGY_LOSS,
-        CHAT_SENTIMENT_HYGIENE_GAIN, CHAT_SENTIMENT_HYGIENE_LOSS,
-    )
+    from .config import CHAT_SENTIMENT_GAINS
     s, label = sentiment_score(text)
     # map [-1,1] → [-loss, +gain]
+    dfun, denergy, dhyg = sentiment_deltas(s, CHAT_SENTIMENT_GAINS)
     if s > 0:
-        dfun = s * CHAT_SENTIMENT_FUN_GAIN
-        denergy = s * CHAT_SENTIMENT_ENERGY_GAIN
-        dhyg = s * CHAT_SENTIMENT_HYGIENE_GAIN
         pet.set_emotion("love", 1.0)
-        floats.append((font.render("(feels better)", False, WHITE), 6, 6))
+        floats.append((render_text(font, "(feels better)", False, WHITE), 6, 6))
     elif s < 0:
-        dfun = s * CHAT_SENTIMENT_FUN_LOSS
-        denergy = s * CHAT_SENTIMENT_ENERGY_LOSS
-        dhyg = s * CHAT_SENTIMENT_HYGIENE_LOSS
         pet.set_emotion("sad", 1.0)
-        floats.append((font.render("(feels worse)", False, WHITE), 6, 6))
+        floats.append((render_text(font, "(feels worse)", False, WHITE), 6, 6))
     else:
-        dfun = denergy = dhyg = 0.0
-        floats.append((font.render("(neutral)", False, WHITE), 6, 6))
+        floats.append((render_text(font, "(neutral)", False, WHITE), 6, 6))
     # apply, clamp
     from .state import clamp
     state.fun = clamp(state.fun + dfun)
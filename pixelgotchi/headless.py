@@ -0,0 +1,53 @@
+"""Run the real game loop without a window or sound, from a scripted input trace.
+
+    python -m pixelgotchi.headless --frames 600 --trace trace.json --seed 1
+
+The trace is a JSON list of ``[frame, event]`` pairs, e.g.
+``[[10, {"type": "KEYDOWN", "key": "p"}], [30, {"type": "KEYDOWN", "key": "t"}]]``
+(see loop.make_event). Every frame advances by a fixed ``--dt``, the RNG is
+seeded, chat stays offline and the save file is left alone, so a run is
+repeatable.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+from .config import FPS
+from .state import PetState
+from .chat import ChatEngine
+from .loop import ScriptedDriver
+from . import game
+
+
+def run(trace=(), frames: int = 600, dt: float = 1.0 / FPS, seed: int = 0,
+        state: PetState = None, chat: ChatEngine = None) -> PetState:
+    random.seed(seed)
+    state = state or PetState()
+    state.last_timestamp = 0.0  # sim time starts at zero, not at the wall clock
+    driver = ScriptedDriver(trace, frames, dt)
+    return game.main(driver, state=state, chat=chat or ChatEngine(enabled=False), persist=False)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pixelgotchi.headless")
+    ap.add_argument("--trace", help="JSON input trace ([frame, event] pairs)")
+    ap.add_argument("--frames", type=int, default=600)
+    ap.add_argument("--dt", type=float, default=1.0 / FPS, help="seconds per frame")
+    ap.add_argument("--seed", type=int, default=0)
+    args = ap.parse_args(argv)
+    trace = []
+    if args.trace:
+        with open(args.trace) as f:
+            trace = json.load(f)
+    state = run(trace, args.frames, args.dt, args.seed)
+    print(json.dumps({k: v for k, v in vars(state).items() if k not in ("appearance", "last_timestamp")}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
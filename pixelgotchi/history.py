@@ -0,0 +1,154 @@
+"""Chat history kept within a token budget.
+
+Recent turns are sent verbatim as long as they fit in CHAT_HISTORY_TOKENS
+(and CHAT_MAX_HISTORY messages); older turns are folded into a short
+rolling summary of at most CHAT_SUMMARY_TOKENS that rides along in the
+system prompt. Folding is immediate with a local heuristic (first sentence
+of each turn); with a `summarizer` (CHAT_SUMMARY=model) the model rewrites
+the summary on a background thread and the heuristic only covers turns it
+has not seen yet. Either way a prompt never grows past
+system + summary + budget, however long the session runs.
+
+Tokens are estimated at ~4 characters each, which is close enough for
+English chat and needs no tokenizer.
+"""
+import re
+import threading
+from typing import Callable, List, Optional, Sequence, Tuple
+
+from .config import CHAT_HISTORY_TOKENS, CHAT_SUMMARY_TOKENS, CHAT_MAX_HISTORY
+
+SYSTEM_PROMPT = "You are a friendly, concise pet character. Keep responses short."
+MESSAGE_OVERHEAD = 4  # tokens per message for role and separators
+SPEAKERS = {"user": "User", "assistant": "Pet"}
+MAX_UNSUMMARIZED = 32  # folded turns queued for the summarizer
+
+Turn = Tuple[str, str]  # (role, content)
+Summarizer = Callable[[str, Sequence[Turn]], str]
+
+_SENTENCE = re.compile(r"(?<=[.!?])\s")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + 3) // 4
+
+
+def message_tokens(turns: Sequence[Turn]) -> int:
+    return sum(MESSAGE_OVERHEAD + estimate_tokens(c) for _, c in turns)
+
+
+def clip(text: str, tokens: int, keep_end: bool = False) -> str:
+    """`text` cut to about `tokens` tokens at a word boundary (from the front with keep_end)."""
+    limit = tokens * 4
+    if len(text) <= limit:
+        return text
+    if keep_end:
+        cut = text[-limit + 1:]
+        return "…" + cut[cut.find(" ") + 1:] if " " in cut else "…" + cut
+    cut = text[:limit - 1]
+    return (cut.rsplit(" ", 1)[0] if " " in cut else cut) + "…"
+
+
+def gist(text: str, tokens: int = 20) -> str:
+    return clip(_SENTENCE.split(" ".join(text.split()), 1)[0], tokens)
+
+
+def summarize_local(summary: str, turns: Sequence[Turn], tokens: int = CHAT_SUMMARY_TOKENS) -> str:
+    """Append the gist of each turn to `summary`, dropping the oldest gists past `tokens`."""
+    parts = [summary] if summary else []
+    parts += [f"{SPEAKERS.get(r, r)}: {gist(c)}" for r, c in turns]
+    return clip(" ".join(parts), tokens, keep_end=True)
+
+
+class ChatHistory:
+    """Turns of one conversation plus the summary of those that no longer fit.
+
+    Used from the chat worker thread; a model summarizer runs on its own
+    thread and only ever swaps the summary under the lock.
+    """
+
+    def __init__(self, budget: int = CHAT_HISTORY_TOKENS, summary_tokens: int = CHAT_SUMMARY_TOKENS,
+                 max_turns: int = CHAT_MAX_HISTORY, summarizer: Optional[Summarizer] = None,
+                 system: str = SYSTEM_PROMPT):
+        self.budget = budget
+        self.summary_tokens = summary_tokens
+        self.max_turns = max_turns
+        self.summarizer = summarizer
+        self.system = system
+        self.turns: List[Turn] = []
+        self.summary = ""              # what the prompt carries
+        self.model_summary = ""        # last summary from the summarizer
+        self.unsummarized: List[Turn] = []  # folded turns the summarizer has not covered yet
+        self.folded = 0
+        self.summaries = 0             # summarizer calls that finished
+        self.errors = 0
+        self.lock = threading.Lock()
+        self._job: Optional[threading.Thread] = None
+
+    def append(self, role: str, content: str) -> Turn:
+        turn = (role, clip(content, max(1, self.budget - MESSAGE_OVERHEAD)))
+        with self.lock:
+            self.turns.append(turn)
+            self._trim()
+        return turn
+
+    def retract(self, turn: Turn) -> bool:
+        """Drop `turn` (as returned by append) and the reply right after it, unless already folded away."""
+        with self.lock:
+            for i in range(len(self.turns) - 1, -1, -1):
+                if self.turns[i] is turn:
+                    end = i + 2 if i + 1 < len(self.turns) and self.turns[i + 1][0] == "assistant" else i + 1
+                    del self.turns[i:end]
+                    return True
+        return False
+
+    def _trim(self):
+        out = []
+        while len(self.turns) > 1 and (len(self.turns) > self.max_turns or message_tokens(self.turns) > self.budget):
+            out.append(self.turns.pop(0))
+        if out:
+            self.folded += len(out)
+            self.summary = summarize_local(self.summary, out, self.summary_tokens)
+            if self.summarizer is not None:
+                self.unsummarized += out
+                del self.unsummarized[:-MAX_UNSUMMARIZED]  # summarizer down: older gists are gone anyway
+                self._start_summarizer()
+
+    def _start_summarizer(self):
+        if self.summarizer is None or (self._job is not None and self._job.is_alive()):
+            return
+        base, turns = self.model_summary, list(self.unsummarized)
+        self._job = threading.Thread(target=self._summarize, args=(base, turns), name="pixelgotchi-summary",
+                                     daemon=True)
+        self._job.start()
+
+    def _summarize(self, base: str, turns: List[Turn]):
+        try:
+            text = clip(" ".join(self.summarizer(base, turns).split()), self.summary_tokens, keep_end=True)
+        except Exception:
+            with self.lock:
+                self.errors += 1  # the local summary stays in place
+            return
+        with self.lock:
+            self.summaries += 1
+            self.model_summary = text
+            del self.unsummarized[:len(turns)]
+            self.summary = summarize_local(text, self.unsummarized, self.summary_tokens) if self.unsummarized else text
+            self._job = None
+            if self.unsummarized:
+                self._start_summarizer()
+
+    def messages(self) -> List[dict]:
+        with self.lock:
+            system = self.system + (f"\nEarlier in this chat: {self.summary}" if self.summary else "")
+            return [{"role": "system", "content": system}] + [{"role": r, "content": c} for r, c in self.turns]
+
+    def tokens(self) -> int:
+        """Estimated prompt size of messages()."""
+        return message_tokens([(m["role"], m["content"]) for m in self.messages()])
+
+    def clear(self):
+        with self.lock:
+            self.turns.clear()
+            self.unsummarized.clear()
+            self.summary = self.model_summary = ""
@@ -0,0 +1,262 @@
+"""Crash-safe saves: an atomic snapshot plus an append-only journal of changes.
+
+The snapshot (SAVE_PATH) is the full saved state as JSON, written to a
+temp file, fsynced and renamed over the old one, so it is always either the
+old or the new version. Between snapshots each save appends only the fields
+that changed to SAVE_PATH + ".journal", one line per save:
+
+    <crc32 hex> {"seq": n, "set": {field: value, ...}}
+
+Lines reach the OS on every save (so a crash of the game loses nothing);
+fsync, which is what survives a power cut, is batched to once every
+SAVE_FSYNC_INTERVAL seconds. Every SAVE_COMPACT_EVERY saves the journal is
+folded into a new snapshot (which records the last seq it covers) and
+truncated. Recovery reads the snapshot, then applies journal lines with a
+higher seq up to the first torn or corrupt one.
+"""
+import atexit
+import json
+import os
+import threading
+import time
+import zlib
+from collections import deque
+from pathlib import Path
+from typing import Dict, Mapping, NamedTuple, Optional
+
+from .config import SAVE_PATH, SAVE_FSYNC_INTERVAL, SAVE_COMPACT_EVERY, SAVE_COALESCE, SAVE_DEADLINE
+
+SEQ_KEY = "_seq"  # snapshot field: last journal seq folded into it
+
+
+def journal_path(path: Path) -> Path:
+    return path.with_name(path.name + ".journal")
+
+
+def write_atomic(path: Path, data: bytes):
+    """Replace `path` with `data` so a crash leaves either the old or the new file."""
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "wb") as f:
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+    try:
+        fd = os.open(path.parent, os.O_RDONLY)
+    except OSError:
+        return  # no directory fds (Windows)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _line(seq: int, changed: Dict[str, str]) -> bytes:
+    body = ",".join(f"{json.dumps(k)}:{v}" for k, v in changed.items())
+    payload = f'{{"seq":{seq},"set":{{{body}}}}}'.encode("utf-8")
+    return b"%08x %s\n" % (zlib.crc32(payload), payload)
+
+
+class Recovered(NamedTuple):
+    data: Optional[dict]  # saved fields, None if there is no usable save
+    seq: int              # last journal seq applied
+    good: int             # byte length of the journal's intact prefix
+    entries: int          # intact journal lines
+
+
+def recover(path: Path = SAVE_PATH) -> Recovered:
+    """Snapshot plus every intact journal line after it."""
+    try:
+        data = json.loads(path.read_text())
+    except (OSError, ValueError):
+        data = None
+    seq = data.pop(SEQ_KEY, 0) if data else 0
+    good = entries = 0
+    try:
+        raw = journal_path(path).read_bytes()
+    except OSError:
+        return Recovered(data, seq, 0, 0)
+    for line in raw.splitlines(keepends=True):
+        if not line.endswith(b"\n") or len(line) < 10:
+            break  # torn tail
+        crc, payload = line[:8], line[9:-1]
+        try:
+            if int(crc, 16) != zlib.crc32(payload):
+                break
+            entry = json.loads(payload)
+        except ValueError:
+            break
+        good += len(line)
+        entries += 1
+        if entry["seq"] <= seq:
+            continue  # already in the snapshot (crash between compaction and truncation)
+        if data is None:
+            data = {}
+        data.update(entry["set"])
+        seq = entry["seq"]
+    return Recovered(data, seq, good, entries)
+
+
+class SaveJournal:
+    """Appends the changed fields of each save; compacts into an atomic snapshot now and then."""
+
+    def __init__(self, path: Path = SAVE_PATH, fsync_interval: float = SAVE_FSYNC_INTERVAL,
+                 compact_every: int = SAVE_COMPACT_EVERY):
+        self.path = Path(path)
+        self.fsync_interval = fsync_interval
+        self.compact_every = compact_every
+        data, self.seq, good, self.entries = recover(self.path)  # entries: journal lines since the snapshot
+        self.last: Dict[str, str] = {k: json.dumps(v) for k, v in (data or {}).items()}
+        self.file = open(journal_path(self.path), "ab")
+        if self.file.tell() != good:
+            self.file.truncate(good)  # drop a torn tail so new lines stay reachable
+            self.file.seek(good)
+        self.synced_at = time.monotonic()
+        self.unsynced = False
+        self.bytes_written = 0
+        self.fsyncs = 0
+        self.compactions = 0
+
+    def save(self, record: Mapping) -> int:
+        """Journal the fields of `record` that changed since the last save; returns bytes appended."""
+        enc = {k: json.dumps(v) for k, v in record.items()}
+        changed = {k: v for k, v in enc.items() if self.last.get(k) != v}
+        self.last = enc
+        if not changed:
+            return 0
+        self.seq += 1
+        line = _line(self.seq, changed)
+        self.file.write(line)
+        self.file.flush()
+        self.bytes_written += len(line)
+        self.entries += 1
+        self.unsynced = True
+        if self.compact_every and self.entries >= self.compact_every:
+            self.compact()
+        elif time.monotonic() - self.synced_at >= self.fsync_interval:
+            self.sync()
+        return len(line)
+
+    def sync(self):
+        if self.unsynced:
+            self.file.flush()
+            os.fsync(self.file.fileno())
+            self.fsyncs += 1
+            self.unsynced = False
+        self.synced_at = time.monotonic()
+
+    def compact(self):
+        """Fold everything into a fresh snapshot, then start an empty journal."""
+        snap = "{" + ",".join(f"{json.dumps(k)}:{v}" for k, v in self.last.items())
+        snap += ("," if self.last else "") + f'"{SEQ_KEY}":{self.seq}}}'
+        write_atomic(self.path, snap.encode("utf-8"))
+        self.file.truncate(0)
+        self.file.seek(0)
+        self.entries = 0
+        self.unsynced = False
+        self.synced_at = time.monotonic()
+        self.compactions += 1
+
+    def close(self, compact: bool = True):
+        if compact and (self.entries or not self.path.exists()):
+            self.compact()
+        else:
+            self.sync()
+        self.file.close()
+
+
+class SaveWriter:
+    """Runs a SaveJournal on its own thread so a save never blocks a frame.
+
+    submit() only swaps in the newest snapshot. Submits less than
+    `coalesce` seconds apart (action spam) become one write, and a snapshot
+    never waits more than `deadline` seconds. Batched fsyncs also happen on
+    this thread. close() writes whatever is pending plus an optional final
+    record and compacts; it also runs at interpreter exit if the game loop
+    never got to call it.
+    """
+
+    def __init__(self, journal: SaveJournal, coalesce: float = SAVE_COALESCE, deadline: float = SAVE_DEADLINE):
+        self.journal = journal
+        self.coalesce = coalesce
+        self.deadline = deadline
+        self.cond = threading.Condition()
+        self.pending: Optional[Mapping] = None
+        self.first_at = self.last_at = 0.0
+        self.depth = 0            # submits waiting in `pending` (all but the newest will be skipped)
+        self.submitted = 0
+        self.writes = 0
+        self.errors = 0
+        self.latency: deque = deque(maxlen=100)  # seconds per journal write
+        self.closed = False
+        self._closing = False
+        self._thread = threading.Thread(target=self._run, name="pixelgotchi-save", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def submit(self, record: Mapping):
+        """Hand over a snapshot nobody will mutate; returns at once."""
+        now = time.monotonic()
+        with self.cond:
+            if self.pending is None:
+                self.first_at = now
+            self.pending = record
+            self.last_at = now
+            self.depth += 1
+            self.submitted += 1
+            self.cond.notify()
+
+    @property
+    def coalesced(self) -> int:
+        return self.submitted - self.writes - self.depth
+
+    def _due(self) -> float:
+        due = float("inf")
+        if self.pending is not None:
+            due = min(self.last_at + self.coalesce, self.first_at + self.deadline)
+        if self.journal.unsynced:
+            due = min(due, self.journal.synced_at + self.journal.fsync_interval)
+        return due
+
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self._closing:
+                    wait = self._due() - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self.cond.wait(None if wait == float("inf") else wait)
+                rec, self.pending, self.depth = self.pending, None, 0
+                closing = self._closing
+            if rec is not None:
+                self._write(rec)
+            elif self.journal.unsynced:
+                self.journal.sync()
+            if closing:
+                return
+
+    def _write(self, rec: Mapping):
+        t0 = time.perf_counter()
+        try:
+            self.journal.save(rec)
+            self.writes += 1
+        except OSError:
+            self.errors += 1  # keep playing; the next save retries with the full diff
+            self.journal.last = {}
+        self.latency.append(time.perf_counter() - t0)
+
+    def close(self, final: Optional[Mapping] = None):
+        if self.closed:
+            return
+        if final is not None:
+            self.submit(final)
+        with self.cond:
+            self._closing = True
+            self.cond.notify()
+        self._thread.join()
+        while self.pending is not None:  # submitted after the thread's last look
+            rec, self.pending = self.pending, None
+            self._write(rec)
+        self.journal.close()
+        self.closed = True
+        atexit.unregister(self.close)
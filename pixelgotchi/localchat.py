@@ -0,0 +1,93 @@
+"""Replies made up on the spot, without a model or a network.
+
+LocalBackend fills in a small template: an opener for the sentiment of the
+player's message (sentiment_score), an answer to what the message is about
+(greeting, food, play, sleep...) and a remark about the pet's most pressing
+need (stat_emotion on the Needs it was given), or a sleepy mumble while it
+sleeps. That takes microseconds, so it serves as CHAT_BACKEND=local, as the
+fallback while the chat server can't be reached, and as the quick answer
+shown until a remote reply arrives.
+"""
+import random
+import re
+from typing import Iterator, Optional
+
+from .history import ChatHistory
+from .needs import stat_emotion
+from .sentiment import sentiment_score
+from .sim import Needs
+
+OPENERS = {
+    "positive": ["*wiggles happily*", "*bounces*", "*purrs*", "Yay!", "*happy chirp*"],
+    "negative": ["*droops*", "*whimpers*", "Aww...", "*ears flat*", "*sad blink*"],
+    "neutral": ["*tilts head*", "Hmm!", "*blinks*", "*listens closely*", "Oh?"],
+}
+
+# (topic, words that give it away), first match wins
+TOPICS = [
+    ("greeting", "hi hello hey hiya howdy morning yo"),
+    ("bye", "bye goodbye night later cya"),
+    ("food", "food eat eating hungry snack dinner lunch breakfast treat feed yummy"),
+    ("play", "play game games ball fun toy run chase"),
+    ("sleep", "sleep sleepy tired nap bed rest"),
+    ("clean", "clean bath wash smelly dirty shower"),
+    ("love", "love cute good sweet best pretty adorable"),
+    ("thanks", "thanks thank thx"),
+]
+_TOPIC_RE = [(name, re.compile(r"\b(?:" + "|".join(words.split()) + r")\b")) for name, words in TOPICS]
+
+ANSWERS = {
+    "greeting": ["Hi hi! I missed you!", "Hello, friend!", "You're back!"],
+    "bye": ["Bye bye! Come back soon!", "Don't be long, okay?", "See you later!"],
+    "food": ["Did someone say food?", "Snacks are my favorite topic.", "I could always eat."],
+    "play": ["Play? Yes! Always yes!", "Throw the ball, throw it!", "I'm ready to play!"],
+    "sleep": ["Naps are the best.", "A cozy nap sounds nice.", "I'll curl up soon."],
+    "clean": ["Bath time? Do I have to?", "I'm sparkly enough... right?", "Fine, but gently!"],
+    "love": ["I love you too!", "You're the best human.", "*snuggles into your hand*"],
+    "thanks": ["Anytime!", "For you? Of course.", "Hehe, you're welcome!"],
+    "question": ["Good question! I think... yes?", "Hmm, let me sniff around for that.",
+                 "I don't know, but I like that you asked!"],
+    "other": ["Tell me more!", "I'm listening!", "Ooh, interesting.", "Really? Wow."],
+}
+
+NEED_REMARKS = {
+    "hunger_high": ["My tummy is rumbling...", "Food soon, please?"],
+    "energy_low": ["I'm so sleepy...", "*yawns* Can we rest?"],
+    "fun_low": ["I'm bored, let's play!", "Can we do something fun?"],
+    "hygiene_low": ["I feel a bit grubby.", "Maybe I need a bath..."],
+}
+ASLEEP = ["*snores softly*", "Zzz... five more minutes...", "*mumbles in its sleep*"]
+
+
+def topic(text: str) -> str:
+    lower = text.lower()
+    for name, pattern in _TOPIC_RE:
+        if pattern.search(lower):
+            return name
+    return "question" if lower.rstrip().endswith("?") else "other"
+
+
+class LocalBackend:
+    """Template replies conditioned on the pet's needs and the message's sentiment."""
+
+    name = "local"
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = random.Random(seed)
+
+    def compose(self, text: str, needs: Optional[Needs] = None) -> str:
+        if needs is not None and needs.asleep:
+            return self.rng.choice(ASLEEP)
+        _, label = sentiment_score(text)
+        parts = [self.rng.choice(OPENERS[label]), self.rng.choice(ANSWERS[topic(text)])]
+        need = stat_emotion(needs) if needs is not None else None
+        if need in NEED_REMARKS:
+            parts.append(self.rng.choice(NEED_REMARKS[need]))
+        return " ".join(parts)
+
+    def reply(self, history: ChatHistory, needs: Optional[Needs] = None) -> str:
+        last = next((c for r, c in reversed(history.turns) if r == "user"), "")
+        return self.compose(last, needs)
+
+    def reply_stream(self, history: ChatHistory, needs: Optional[Needs] = None) -> Iterator[str]:
+        yield self.reply(history, needs)
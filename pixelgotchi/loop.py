@@ -0,0 +1,180 @@
+import time
+import pygame as pg
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+from .config import FPS, ADAPTIVE_FPS, IDLE_FPS, BACKGROUND_FPS
+from .chat import ChatEngine, ChatWorker
+
+# Frame drivers: where main() gets its frame delta, input and chat worker from.
+#
+# LiveDriver is the normal game: the real clock and the real event queue.
+# ScriptedDriver runs the same loop from an input trace with a fixed dt and
+# virtual time, for headless runs and benchmarks.
+
+EventSpec = Union[pg.event.Event, dict]
+
+
+class LiveDriver:
+    """The real clock and event queue, with an adaptive frame rate.
+
+    main() reports after each frame whether anything is animating
+    (set_active). While nothing is, the driver sleeps in pg.event.wait for
+    up to 1/idle_fps seconds, or 1/background_fps while the window is
+    unfocused or minimised, and any event ends the wait at once. A
+    minimised window always runs at the background rate.
+    """
+
+    done = False
+
+    def __init__(self, fps: int = FPS, idle_fps: int = IDLE_FPS, background_fps: int = BACKGROUND_FPS,
+                 adaptive: bool = ADAPTIVE_FPS):
+        self.fps = fps
+        self.idle_fps = max(1, idle_fps)
+        self.background_fps = max(1, background_fps)
+        self.adaptive = adaptive
+        self.clock = pg.time.Clock()
+        self.active = True
+        self.focused = True
+        self.minimized = False
+        self.woken: List[pg.event.Event] = []  # event that ended an idle wait
+        # load accounting, refreshed about once a second
+        self.wakeups = 0
+        self.cpu_pct = 0.0
+        self.wakeups_per_s = 0.0
+        self._load_t0 = time.perf_counter()
+        self._cpu0 = time.process_time()
+
+    def rate(self) -> int:
+        if not self.adaptive:
+            return self.fps
+        if self.minimized:
+            return self.background_fps
+        if self.active:
+            return self.fps
+        return self.idle_fps if self.focused else self.background_fps
+
+    def tick(self) -> float:
+        rate = self.rate()
+        if rate >= self.fps:
+            ms = self.clock.tick(self.fps)
+        else:
+            ev = pg.event.wait(max(1, 1000 // rate))
+            if ev.type != pg.NOEVENT:
+                self.woken.append(ev)
+            ms = self.clock.tick()
+        self._count_wakeup()
+        return ms / 1000.0
+
+    def events(self) -> List[pg.event.Event]:
+        evs = self.woken + pg.event.get()
+        self.woken = []
+        for ev in evs:
+            if ev.type == pg.WINDOWFOCUSLOST:
+                self.focused = False
+            elif ev.type == pg.WINDOWFOCUSGAINED:
+                self.focused = True
+            elif ev.type in (pg.WINDOWMINIMIZED, pg.WINDOWHIDDEN):
+                self.minimized = True
+            elif ev.type in (pg.WINDOWRESTORED, pg.WINDOWSHOWN, pg.WINDOWMAXIMIZED):
+                self.minimized = False
+        if evs:
+            self.active = True  # react to input at full rate; main() says otherwise after the frame
+        return evs
+
+    def set_active(self, active: bool):
+        self.active = active
+
+    def load(self) -> Optional[Tuple[float, float]]:
+        """(CPU %, wakeups per second) over the last second or so."""
+        return self.cpu_pct, self.wakeups_per_s
+
+    def _count_wakeup(self):
+        self.wakeups += 1
+        now = time.perf_counter()
+        if now - self._load_t0 >= 1.0:
+            cpu = time.process_time()
+            self.cpu_pct = (cpu - self._cpu0) / (now - self._load_t0) * 100
+            self.wakeups_per_s = self.wakeups / (now - self._load_t0)
+            self._load_t0, self._cpu0, self.wakeups = now, cpu, 0
+
+    def ticks_ms(self) -> int:
+        return pg.time.get_ticks()
+
+    def chat_worker(self, engine: ChatEngine) -> ChatWorker:
+        return ChatWorker(engine)
+
+
+class ScriptedDriver:
+    """Feeds main() a fixed dt and the events of an input trace, without sleeping.
+
+    `trace` is a list of (frame, event) pairs; events may be pygame events or
+    dicts as accepted by make_event(). The run ends after `frames` frames.
+    Time (for blinking cursors etc.) is virtual: frame count times dt.
+    """
+
+    def __init__(self, trace: Iterable[Tuple[int, EventSpec]] = (), frames: int = 600, dt: float = 1.0 / FPS):
+        self.dt = dt
+        self.frames = frames
+        self.frame = 0
+        self.script: Dict[int, List[EventSpec]] = {}
+        for frame, ev in trace:
+            self.script.setdefault(int(frame), []).append(ev)
+
+    @property
+    def done(self) -> bool:
+        return self.frame >= self.frames
+
+    def tick(self) -> float:
+        self.frame += 1
+        return self.dt
+
+    def events(self) -> List[pg.event.Event]:
+        pg.event.pump()  # keep SDL serviced; real input is ignored
+        return [make_event(ev) for ev in self.script.get(self.frame, ())]
+
+    def ticks_ms(self) -> int:
+        return int(self.frame * self.dt * 1000)
+
+    def set_active(self, active: bool):
+        pass  # fixed dt, never throttled
+
+    def load(self) -> Optional[Tuple[float, float]]:
+        return None
+
+    def chat_worker(self, engine: ChatEngine) -> ChatWorker:
+        return ChatWorker(engine)
+
+
+def make_event(spec: EventSpec) -> pg.event.Event:
+    """Build a pygame event from a dict like {"type": "KEYDOWN", "key": "p"}.
+
+    "type" is a pygame event name; "key" may be a key name as understood by
+    pg.key.key_code ("p", "return", "escape"...) and "unicode" defaults to
+    the typed character for single-character keys.
+    """
+    if isinstance(spec, pg.event.EventType):
+        return spec
+    attrs = dict(spec)
+    etype = attrs.pop("type")
+    if isinstance(etype, str):
+        etype = getattr(pg, etype.upper())
+    if etype in (pg.KEYDOWN, pg.KEYUP):
+        key = attrs.get("key")
+        if isinstance(key, str):
+            attrs["key"] = pg.key.key_code(key)
+            attrs.setdefault("unicode", key if len(key) == 1 else "")
+        attrs.setdefault("unicode", "")
+        attrs.setdefault("mod", 0)
+        attrs.setdefault("scancode", 0)
+    if "pos" in attrs:
+        attrs["pos"] = tuple(attrs["pos"])
+    return pg.event.Event(etype, attrs)
+
+
+def type_text(start: int, text: str, submit: bool = True, every: int = 1) -> List[Tuple[int, dict]]:
+    """Trace entries that type `text` one key per `every` frames, then Enter."""
+    out = [(start + i * every, {"type": "KEYDOWN", "key": ch.lower() if ch != " " else "space", "unicode": ch})
+           for i, ch in enumerate(text)]
+    if submit:
+        out.append((start + len(text) * every, {"type": "KEYDOWN", "key": "return", "unicode": "\r"}))
+    return out
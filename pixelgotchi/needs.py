@@ -0,0 +1,122 @@
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .config import EMOTION_THRESHOLDS, EMOTION_PRIORITY
+from .state import PetState
+
+# EMOTION_THRESHOLDS key -> (need, direction it gets worse in, event raised on crossing)
+THRESHOLD_EVENTS = {
+    "energy_low": ("energy", -1, "tired"),
+    "hunger_high": ("hunger", +1, "hungry"),
+    "fun_low": ("fun", -1, "bored"),
+    "hygiene_low": ("hygiene", -1, "dirty"),
+}
+
+
+@dataclass(frozen=True)
+class NeedEvent:
+    at: float       # on the PetState.last_timestamp clock
+    kind: str       # tired, hungry, bored, dirty, rested, woke, died
+    key: str = ""   # EMOTION_THRESHOLDS key for threshold events
+
+
+def stat_emotion(state, thresholds: Dict[str, float] = EMOTION_THRESHOLDS,
+                 priority: Sequence[str] = EMOTION_PRIORITY) -> Optional[str]:
+    """First EMOTION_PRIORITY key whose need is past its threshold, or None."""
+    for key in priority:
+        if key not in THRESHOLD_EVENTS or key not in thresholds:
+            continue
+        need, direction, _ = THRESHOLD_EVENTS[key]
+        value = getattr(state, need)
+        if (value > thresholds[key]) if direction > 0 else (value < thresholds[key]):
+            return key
+    return None
+
+
+def crossing_time(value: float, rate: float, threshold: float, direction: int) -> Optional[float]:
+    """Seconds until `value` moving at `rate` passes `threshold` going in `direction`, or None."""
+    if rate * direction <= 0:
+        return None
+    gap = (threshold - value) * direction
+    if gap < 0:
+        return None  # already past it
+    return gap / abs(rate)
+
+
+class NeedsScheduler:
+    """Raises need events at their exact times instead of polling thresholds.
+
+    The needs are linear between rate changes, so each threshold crossing
+    is computed in closed form and queued (death times come from
+    PetState.death_in the same way). advance() brings the state to a time,
+    stopping at every queued crossing on the way. The queue is only
+    recomputed when something outside the simulation (an action, a sleep
+    toggle, a chat effect, a respawn) has changed the state since the last
+    call. Between those the state can be left behind: the game only calls
+    advance() once its clock reaches next_at(), when changed() says the
+    queue is stale, or before it reads or changes the state itself.
+    """
+
+    def __init__(self, state: PetState, thresholds: Dict[str, float] = EMOTION_THRESHOLDS):
+        self.thresholds = thresholds
+        self.queue: List[Tuple[float, int, NeedEvent]] = []
+        self.recomputes = 0
+        self._asleep = state.asleep
+        self._seen = None
+        self.reschedule(state)
+
+    @staticmethod
+    def _snapshot(state: PetState) -> tuple:
+        return (state.hunger, state.energy, state.fun, state.hygiene, state.asleep, state.alive)
+
+    def reschedule(self, state: PetState):
+        self.recomputes += 1
+        t0, q = state.last_timestamp, []
+        if state.alive:
+            rates = state.rates()
+            for key, (need, direction, kind) in THRESHOLD_EVENTS.items():
+                if key not in self.thresholds:
+                    continue
+                t = crossing_time(getattr(state, need), rates[need], self.thresholds[key], direction)
+                if t is not None:
+                    q.append(NeedEvent(t0 + t, kind, key))
+            if state.asleep and state.energy < 1.0 and rates["energy"] > 0:
+                q.append(NeedEvent(t0 + (1.0 - state.energy) / rates["energy"], "rested"))
+        self.queue = [(ev.at, i, ev) for i, ev in enumerate(q)]
+        heapq.heapify(self.queue)
+        self._seen = self._snapshot(state)
+
+    def changed(self, state: PetState) -> bool:
+        """The state was changed from outside since the last advance()."""
+        return self._snapshot(state) != self._seen
+
+    def next_at(self, state: PetState) -> float:
+        """Time of the next event (threshold crossing or death) if nothing intervenes."""
+        t = self.queue[0][0] if self.queue else math.inf
+        if state.alive:
+            t = min(t, state.last_timestamp + state.death_in()[0])
+        return t
+
+    def advance(self, state: PetState, now: float) -> List[NeedEvent]:
+        events = []
+        if self.changed(state):
+            if self._asleep and not state.asleep and state.alive:
+                events.append(NeedEvent(state.last_timestamp, "woke"))
+            self.reschedule(state)
+        self._asleep = state.asleep
+        alive = state.alive
+        while self.queue and self.queue[0][0] <= now:
+            _, _, ev = heapq.heappop(self.queue)
+            state.apply_offline(max(ev.at, state.last_timestamp))
+            if not state.alive:
+                break  # died before getting there
+            events.append(ev)
+        state.apply_offline(now)
+        if alive and not state.alive:
+            # PetState stops the clock at the exact boundary crossing itself
+            events.append(NeedEvent(state.died_at, "died"))
+            self.queue.clear()
+        self._seen = self._snapshot(state)
+        return events
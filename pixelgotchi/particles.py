@@ -0,0 +1,181 @@
+import pygame as pg
+from typing import Dict, List, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except Exception:  # optional
+    np = None
+
+from .config import PARTICLE_CAPACITY, PARTICLE_OVERFLOW
+
+Color = Tuple[int, int, int]
+
+OVERFLOW_POLICIES = ("drop_new", "replace_oldest")
+
+
+class ParticleSystem:
+    """Fixed-capacity particle pool stored as columns, not one object per pixel.
+
+    Columns are x, y, vx, vy, life, colour index (into `palette`) and a spawn
+    sequence number used by the "replace_oldest" overflow policy. Dead
+    particles are swap-removed so the live ones stay packed in [0, n).
+    Uses NumPy when available and plain lists otherwise.
+    """
+
+    def __init__(self, capacity: int = PARTICLE_CAPACITY, overflow: str = PARTICLE_OVERFLOW):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown overflow policy {overflow!r}, expected one of {OVERFLOW_POLICIES}")
+        self.capacity = max(1, capacity)
+        self.overflow = overflow
+        self.palette: List[Color] = []
+        self._palette_idx: Dict[Color, int] = {}
+        self.n = 0
+        self.dropped = 0   # particles lost to the overflow policy
+        self._seq = 0
+        if np is not None:
+            self.x = np.zeros(self.capacity)
+            self.y = np.zeros(self.capacity)
+            self.vx = np.zeros(self.capacity)
+            self.vy = np.zeros(self.capacity)
+            self.life = np.zeros(self.capacity)
+            self.color = np.zeros(self.capacity, dtype=np.intp)
+            self.seq = np.zeros(self.capacity, dtype=np.int64)
+        else:
+            self.x, self.y, self.vx, self.vy, self.life = [], [], [], [], []
+            self.color, self.seq = [], []
+
+    def __len__(self):
+        return self.n
+
+    def clear(self):
+        self.n = 0
+        if np is None:
+            for col in self._columns():
+                col.clear()
+
+    def _columns(self):
+        return (self.x, self.y, self.vx, self.vy, self.life, self.color, self.seq)
+
+    def _color_index(self, color) -> int:
+        color = tuple(color)
+        idx = self._palette_idx.get(color)
+        if idx is None:
+            idx = self._palette_idx[color] = len(self.palette)
+            self.palette.append(color)
+        return idx
+
+    def emit(self, xs: Sequence[float], ys: Sequence[float], vxs: Sequence[float], vys: Sequence[float],
+             lifes: Sequence[float], colors: Sequence[Color]):
+        """Add len(xs) particles; what happens past capacity depends on the overflow policy."""
+        k = len(xs)
+        if k == 0:
+            return
+        cols = [self._color_index(c) for c in colors]
+        seqs = range(self._seq, self._seq + k)
+        self._seq += k
+        rows = list(zip(xs, ys, vxs, vys, lifes, cols, seqs))
+        free = self.capacity - self.n
+        if k > free:
+            if self.overflow == "drop_new":
+                self.dropped += k - free
+                rows = rows[:free]
+            else:
+                # Newest rows win; overwrite the oldest live particles with the rest.
+                rows = rows[-self.capacity:]
+                replace = len(rows) - free
+                self.dropped += k - free
+                self._overwrite_oldest(rows[free:], replace)
+                rows = rows[:free]
+        if not rows:
+            return
+        if np is not None:
+            a, b = self.n, self.n + len(rows)
+            for col, vals in zip(self._columns(), zip(*rows)):
+                col[a:b] = vals
+            self.n = b
+        else:
+            for col, vals in zip(self._columns(), zip(*rows)):
+                col.extend(vals)
+            self.n += len(rows)
+
+    def _overwrite_oldest(self, rows, count: int):
+        if count <= 0:
+            return
+        if np is not None:
+            seq = self.seq[:self.n]
+            slots = np.argpartition(seq, count - 1)[:count] if count < self.n else np.arange(self.n)
+            for col, vals in zip(self._columns(), zip(*rows)):
+                col[slots] = vals
+        else:
+            slots = sorted(range(self.n), key=self.seq.__getitem__)[:count]
+            for slot, row in zip(slots, rows):
+                for col, val in zip(self._columns(), row):
+                    col[slot] = val
+
+    def update(self, dt: float):
+        n = self.n
+        if not n:
+            return
+        if np is not None:
+            self.x[:n] += self.vx[:n] * dt
+            self.y[:n] += self.vy[:n] * dt
+            self.life[:n] -= dt
+            dead = self.life[:n] <= 0
+            if dead.any():
+                self._swap_remove(dead)
+        else:
+            x, y, vx, vy, life = self.x, self.y, self.vx, self.vy, self.life
+            for i in range(n):
+                x[i] += vx[i] * dt
+                y[i] += vy[i] * dt
+                life[i] -= dt
+            i = 0
+            while i < self.n:
+                if life[i] <= 0:
+                    last = self.n - 1
+                    for col in self._columns():
+                        col[i] = col[last]
+                        col.pop()
+                    self.n = last
+                else:
+                    i += 1
+
+    def _swap_remove(self, dead):
+        # Fill the holes left in the surviving prefix with the live particles
+        # from past it, so only len(holes) rows move instead of compacting all.
+        keep = self.n - int(dead.sum())
+        holes = np.flatnonzero(dead[:keep])
+        movers = np.flatnonzero(~dead[keep:]) + keep
+        if len(holes):
+            for col in self._columns():
+                col[holes] = col[movers]
+        self.n = keep
+
+    def draw(self, surf: pg.Surface) -> Optional[pg.Rect]:
+        """Plot every live particle as one pixel; returns the bounding rect drawn to."""
+        n = self.n
+        if not n:
+            return None
+        w, h = surf.get_size()
+        if np is not None:
+            ix = self.x[:n].astype(np.intp)
+            iy = self.y[:n].astype(np.intp)
+            on = (ix >= 0) & (ix < w) & (iy >= 0) & (iy < h)
+            if not on.any():
+                return None
+            ix, iy = ix[on], iy[on]
+            mapped = np.array([surf.map_rgb(c) for c in self.palette])
+            px = pg.surfarray.pixels2d(surf)
+            px[ix, iy] = mapped[self.color[:n][on]]
+            del px
+            x0, y0 = int(ix.min()), int(iy.min())
+            return pg.Rect(x0, y0, int(ix.max()) - x0 + 1, int(iy.max()) - y0 + 1)
+        xs, ys = [], []
+        for i in range(n):
+            sx, sy = int(self.x[i]), int(self.y[i])
+            if 0 <= sx < w and 0 <= sy < h:
+                surf.set_at((sx, sy), self.palette[self.color[i]])
+                xs.append(sx); ys.append(sy)
+        if not xs:
+            return None
+        return pg.Rect(min(xs), min(ys), max(xs) - min(xs) + 1, max(ys) - min(ys) + 1)
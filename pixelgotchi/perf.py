@@ -0,0 +1,217 @@
+import bisect
+import functools
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Deque, Dict, List, Optional, Sequence
+
+# Lightweight per-frame timing. Code under measurement is wrapped in
+# `with span("name"):` or decorated with @timed("name"); while recording is
+# off span() hands back a shared no-op object and timed functions are called
+# straight through, so the instrumentation costs one call and a flag check.
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("stats", "name", "t0")
+
+    def __init__(self, stats: "FrameStats", name: str):
+        self.stats = stats
+        self.name = name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = time.perf_counter() - self.t0
+        if threading.get_ident() != self.stats.thread:
+            # off the game loop (e.g. the chat worker): not part of any frame
+            self.stats.background.setdefault(self.name, deque(maxlen=100)).append(elapsed)
+            return False
+        cur = self.stats.current
+        cur[self.name] = cur.get(self.name, 0.0) + elapsed
+        return False
+
+
+class FrameStats:
+    """Frame times and per-subsystem times (seconds) for each recorded frame.
+
+    Spans closed on other threads go to `background` (recent durations per
+    name) instead of the current frame.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.frames: Sequence[Dict[str, float]] = []
+        self.current: Dict[str, float] = {}
+        self.background: Dict[str, Deque[float]] = {}
+        self.thread = threading.get_ident()
+        self._t0 = 0.0
+
+    def start(self, history: Optional[int] = None):
+        """Record from now on; keep only the last `history` frames if given."""
+        self.enabled = True
+        self.frames = [] if history is None else deque(maxlen=history)
+        self.thread = threading.get_ident()
+
+    def stop(self) -> List[Dict[str, float]]:
+        self.enabled = False
+        return self.frames
+
+    def span(self, name: str):
+        return _Span(self, name) if self.enabled else _NULL_SPAN
+
+    def begin_frame(self):
+        if self.enabled:
+            self.current = {}
+            self._t0 = time.perf_counter()
+
+    def end_frame(self):
+        if self.enabled:
+            self.current["frame"] = time.perf_counter() - self._t0
+            self.frames.append(self.current)
+
+    def summary(self, skip: int = 0) -> dict:
+        """Frame-time and per-subsystem distributions in milliseconds, ignoring the first `skip` frames."""
+        frames = list(self.frames)[skip:]
+        names = sorted({k for f in frames for k in f} - {"frame"})
+        out = {"frames": len(frames),
+               "frame_ms": distribution([f.get("frame", 0.0) for f in frames]),
+               "subsystems_ms": {}}
+        for name in names:
+            out["subsystems_ms"][name] = distribution([f.get(name, 0.0) for f in frames])
+        return out
+
+
+stats = FrameStats()
+
+
+def span(name: str):
+    return stats.span(name)
+
+
+def timed(name: str) -> Callable:
+    """Decorator: time every call of the function as span `name`."""
+    def deco(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not stats.enabled:
+                return fn(*args, **kwargs)
+            with _Span(stats, name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return deco
+
+
+class FrameProfiler:
+    """Runs cProfile over the next N frames and dumps a .prof file."""
+
+    def __init__(self, out_dir: str = "."):
+        self.out_dir = out_dir
+        self.profile = None
+        self.left = 0
+
+    @property
+    def active(self) -> bool:
+        return self.profile is not None
+
+    def start(self, frames: int):
+        import cProfile
+        if self.profile is not None:
+            return
+        self.profile = cProfile.Profile()
+        self.left = max(1, frames)
+        self.profile.enable()
+
+    def step(self) -> Optional[str]:
+        """Call once per frame; returns the dump path on the frame profiling ends."""
+        if self.profile is None:
+            return None
+        self.left -= 1
+        if self.left > 0:
+            return None
+        self.profile.disable()
+        path = os.path.join(self.out_dir, time.strftime("pixelgotchi-%Y%m%d-%H%M%S.prof"))
+        self.profile.dump_stats(path)
+        self.profile = None
+        return path
+
+
+def percentile(sorted_vals: Sequence[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    k = min(len(sorted_vals) - 1, max(0, int(round(q / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[k]
+
+
+def distribution(vals: Sequence[float]) -> Dict[str, float]:
+    vals = sorted(vals)
+    ms = 1000.0
+    return {
+        "mean": sum(vals) / len(vals) * ms if vals else 0.0,
+        "p50": percentile(vals, 50) * ms,
+        "p95": percentile(vals, 95) * ms,
+        "p99": percentile(vals, 99) * ms,
+        "max": (vals[-1] if vals else 0.0) * ms,
+    }
+
+
+class Histogram:
+    """Fixed log-spaced latency buckets (1 ms .. ~2 min), safe to record from any thread.
+
+    Memory stays constant however many samples arrive; percentiles are
+    bucket upper bounds, so within one bucket width (~19%) of the truth.
+    """
+
+    BOUNDS = tuple(0.001 * 1.2 ** i for i in range(65))  # seconds, upper bucket edges
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS) + 1)  # last bucket: above every bound
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        i = bisect.bisect_left(self.BOUNDS, seconds)
+        with self.lock:
+            self.counts[i] += 1
+            self.count += 1
+            self.total += seconds
+            self.max = max(self.max, seconds)
+
+    def percentile(self, q: float) -> float:
+        if not self.count:
+            return 0.0
+        rank = q / 100.0 * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank and n:
+                return min(self.BOUNDS[i], self.max) if i < len(self.BOUNDS) else self.max
+        return self.max
+
+    def summary(self) -> Dict[str, float]:
+        """Same keys and units (ms) as distribution()."""
+        ms = 1000.0
+        return {
+            "mean": self.total / self.count * ms if self.count else 0.0,
+            "p50": self.percentile(50) * ms,
+            "p95": self.percentile(95) * ms,
+            "p99": self.percentile(99) * ms,
+            "max": self.max * ms,
+        }
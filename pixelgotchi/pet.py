@@ -1,7 +1,65 @@
 import math
 import pygame as pg
-from typing import Optional, List, Tuple
+from collections import OrderedDict
+from typing import Callable, Optional, List, Tuple
 from .config import *
+from .perf import timed
+
+try:
+    import numpy as np
+except Exception:  # optional
+    np = None
+
+DEFAULT_APPEARANCE = {
+    "w": 24, "h": 16,
+    "squash_x": 1.0, "squash_y": 1.0,
+    "roundness": 0.22,
+    "base_color": (120, 200, 140),
+    "belly_color": (200, 230, 210),
+    "spots": [],
+    "eyes": "dot",
+}
+
+# Frames are rendered with a margin so icons above the head, spots past the
+# body edge and the shadow all fit on the same surface.
+SPRITE_PAD = 16
+SPRITE_COLORKEY = (255, 0, 255)  # never produced by random_color/lerp_color
+
+
+def freeze(value):
+    """Turn an appearance dict (lists after a JSON round-trip) into a hashable key."""
+    if isinstance(value, dict):
+        return tuple((k, freeze(v)) for k, v in sorted(value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(v) for v in value)
+    return value
+
+
+class SpriteCache:
+    """LRU of ready-made pet frames, built lazily on first use."""
+
+    def __init__(self, capacity: int = SPRITE_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self.frames: "OrderedDict[tuple, pg.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: tuple, build: Callable[[], pg.Surface]) -> pg.Surface:
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+            self.hits += 1
+            return frame
+        self.misses += 1
+        frame = build()
+        self.frames[key] = frame
+        if len(self.frames) > self.capacity:
+            self.frames.popitem(last=False)
+        return frame
+
+    def clear(self):
+        self.frames.clear()
+
 
 class PetSprite:
     def __init__(self):
@@ -9,6 +67,10 @@ class PetSprite:
         self.reaction = 0.0
         self.face_mode: str = ""
         self.face_timer: float = 0.0
+        self.cache = SpriteCache()
+        self.frame_key: Optional[tuple] = None  # key of the frame drawn last
+        self._app_ref: Optional[dict] = None
+        self._app_key: tuple = ()
 
     def update(self, dt: float):
         self.t += dt
@@ -19,49 +81,41 @@ class PetSprite:
             if self.face_timer == 0:
                 self.face_mode = ""
 
-    def draw(self, surf: pg.Surface, x: int, y: int, mood: float, asleep: bool, app: Optional[dict] = None):
+    @timed("pet")
+    def draw(self, surf: pg.Surface, x: int, y: int, mood: float, asleep: bool, app: Optional[dict] = None,
+             ahead: float = 0.0):
+        # `ahead`: seconds since the last update(); the timers are linear, so
+        # drawing them that far on matches what the next update will give.
         if app is None:
-            app = {
-                "w": 24, "h": 16,
-                "squash_x": 1.0, "squash_y": 1.0,
-                "roundness": 0.22,
-                "base_color": (120, 200, 140),
-                "belly_color": (200, 230, 210),
-                "spots": [],
-                "eyes": "dot",
-            }
+            app = DEFAULT_APPEARANCE
         base_col = lerp_color(app.get("base_color", (80,200,120)), (200, 80, 80), 1 - mood)
-        w = int(app.get("w", 24)); h = int(app.get("h", 16))
-        squash_x = float(app.get("squash_x", 1.0)); squash_y = float(app.get("squash_y", 1.0))
-        roundness = float(app.get("roundness", 0.22))
-        ry = int(self.reaction * 2)
-        px = pg.PixelArray(surf)
-        for yy in range(h):
-            for xx in range(w):
-                rx = xx - w//2
-                ryy = yy - h//2
-                if (rx*rx)/(w*w*roundness*squash_x) + (ryy*ryy)/(h*h*0.3*squash_y) <= 1.0:
-                    px[x+xx, y+yy - ry] = base_col
-        del px
-        belly = app.get("belly_color")
-        if belly:
-            bx0, by0 = x + w//2, y + h//2 - ry
-            for yy in range(-h//3, h//3):
-                for xx in range(-w//4, w//4):
-                    if (xx*xx)/(w*w*0.06) + (yy*yy)/(h*h*0.10) <= 1.0:
-                        sx, sy = bx0+xx, by0+yy
-                        if 0 <= sx < VIRTUAL_W and 0 <= sy < VIRTUAL_H:
-                            surf.set_at((sx, sy), belly)
-        for ox, oy, rr, col in app.get("spots", []):
-            cx, cy = x + w//2 + int(ox), y + h//2 - ry + int(oy)
-            for yy in range(-rr, rr+1):
-                for xx in range(-rr, rr+1):
-                    if xx*xx + yy*yy <= rr*rr:
-                        sx, sy = cx+xx, cy+yy
-                        if 0 <= sx < VIRTUAL_W and 0 <= sy < VIRTUAL_H:
-                            surf.set_at((sx, sy), col)
-        blink = 1 if (int(self.t*2)%6==0) else 0
+        ry = int(max(0.0, self.reaction - ahead * 3) * 2)
+        blink = 1 if (int((self.t + ahead)*2)%6==0) else 0
         eye_open = 0 if blink and not asleep else 1
+        # Everything that changes a pixel of the pet goes into the key; the
+        # mood bucket is the resulting body colour itself.
+        key = (self._appearance_key(app), base_col, self.face_mode, eye_open, asleep, ry)
+        frame = self.cache.get(key, lambda: self._render(app, base_col, eye_open, asleep, ry))
+        self.frame_key = key
+        return surf.blit(frame, (x - SPRITE_PAD, y - SPRITE_PAD))
+
+    def _appearance_key(self, app: dict) -> tuple:
+        if app is not self._app_ref:
+            self._app_ref = app
+            self._app_key = freeze(app)
+        return self._app_key
+
+    def _render(self, app: dict, base_col, eye_open: int, asleep: bool, ry: int) -> pg.Surface:
+        w = int(app.get("w", 24)); h = int(app.get("h", 16))
+        frame = pg.Surface((w + SPRITE_PAD*2, h + SPRITE_PAD*2), 0, 32)
+        frame.fill(SPRITE_COLORKEY)
+        frame.set_colorkey(SPRITE_COLORKEY, pg.RLEACCEL)
+        self._paint(frame, SPRITE_PAD, SPRITE_PAD, app, base_col, eye_open, asleep, ry)
+        return frame
+
+    def _paint(self, surf: pg.Surface, x: int, y: int, app: dict, base_col, eye_open: int, asleep: bool, ry: int):
+        w = int(app.get("w", 24)); h = int(app.get("h", 16))
+        fill_shapes(surf, x, y - ry, app, base_col)
         eye_y = y + h//2 - 4 - ry
         eye_x1 = x + w//2 - 6
         eye_x2 = x + w//2 + 3
@@ -143,6 +197,80 @@ class PetSprite:
         self.face_timer = duration
 
 
+def fill_shapes(surf: pg.Surface, x: int, y: int, app: dict, base_col):
+    """Paint body, belly and spots with the body's top-left at (x, y)."""
+    if np is not None:
+        fill_shapes_numpy(surf, x, y, app, base_col)
+    else:
+        fill_shapes_loops(surf, x, y, app, base_col)
+
+
+def fill_shapes_loops(surf: pg.Surface, x: int, y: int, app: dict, base_col):
+    w = int(app.get("w", 24)); h = int(app.get("h", 16))
+    squash_x = float(app.get("squash_x", 1.0)); squash_y = float(app.get("squash_y", 1.0))
+    roundness = float(app.get("roundness", 0.22))
+    sw, sh = surf.get_size()
+    px = pg.PixelArray(surf)
+    for yy in range(h):
+        for xx in range(w):
+            rx = xx - w//2
+            ryy = yy - h//2
+            if (rx*rx)/(w*w*roundness*squash_x) + (ryy*ryy)/(h*h*0.3*squash_y) <= 1.0:
+                px[x+xx, y+yy] = base_col
+    del px
+    belly = app.get("belly_color")
+    if belly:
+        bx0, by0 = x + w//2, y + h//2
+        for yy in range(-h//3, h//3):
+            for xx in range(-w//4, w//4):
+                if (xx*xx)/(w*w*0.06) + (yy*yy)/(h*h*0.10) <= 1.0:
+                    sx, sy = bx0+xx, by0+yy
+                    if 0 <= sx < sw and 0 <= sy < sh:
+                        surf.set_at((sx, sy), belly)
+    for ox, oy, rr, col in app.get("spots", []):
+        cx, cy = x + w//2 + int(ox), y + h//2 + int(oy)
+        for yy in range(-rr, rr+1):
+            for xx in range(-rr, rr+1):
+                if xx*xx + yy*yy <= rr*rr:
+                    sx, sy = cx+xx, cy+yy
+                    if 0 <= sx < sw and 0 <= sy < sh:
+                        surf.set_at((sx, sy), col)
+
+
+def fill_shapes_numpy(surf: pg.Surface, x: int, y: int, app: dict, base_col):
+    # Same inequalities as fill_shapes_loops, evaluated over a whole grid at
+    # once (same operand order, so the float results match bit for bit).
+    w = int(app.get("w", 24)); h = int(app.get("h", 16))
+    squash_x = float(app.get("squash_x", 1.0)); squash_y = float(app.get("squash_y", 1.0))
+    roundness = float(app.get("roundness", 0.22))
+    px = pg.surfarray.pixels2d(surf)
+    xx, yy = np.meshgrid(np.arange(w) - w//2, np.arange(h) - h//2, indexing="ij")
+    mask = (xx*xx)/(w*w*roundness*squash_x) + (yy*yy)/(h*h*0.3*squash_y) <= 1.0
+    _stamp(px, x, y, mask, surf.map_rgb(base_col))
+    belly = app.get("belly_color")
+    if belly:
+        x0, y0 = -w//4, -h//3  # floor division of the negated size, as in the loop ranges
+        xx, yy = np.meshgrid(np.arange(x0, w//4), np.arange(y0, h//3), indexing="ij")
+        mask = (xx*xx)/(w*w*0.06) + (yy*yy)/(h*h*0.10) <= 1.0
+        _stamp(px, x + w//2 + x0, y + h//2 + y0, mask, surf.map_rgb(belly))
+    for ox, oy, rr, col in app.get("spots", []):
+        xx, yy = np.meshgrid(np.arange(-rr, rr+1), np.arange(-rr, rr+1), indexing="ij")
+        mask = xx*xx + yy*yy <= rr*rr
+        _stamp(px, x + w//2 + int(ox) - rr, y + h//2 + int(oy) - rr, mask, surf.map_rgb(col))
+    del px
+
+
+def _stamp(px, x0: int, y0: int, mask, color: int):
+    # Write `color` wherever `mask` is set, with mask[0, 0] at (x0, y0), clipped to the surface.
+    sw, sh = px.shape
+    mw, mh = mask.shape
+    ax0, ay0 = max(0, x0), max(0, y0)
+    ax1, ay1 = min(sw, x0 + mw), min(sh, y0 + mh)
+    if ax0 >= ax1 or ay0 >= ay1:
+        return
+    px[ax0:ax1, ay0:ay1][mask[ax0-x0:ax1-x0, ay0-y0:ay1-y0]] = color
+
+
 def lerp_color(a, b, t):
     return tuple(int(a[i] + (b[i]-a[i]) * t) for i in range(3))
 
@@ -0,0 +1,103 @@
+import pygame as pg
+from typing import Callable, Hashable, List, Optional, Tuple
+
+# Layered compositing for the low-res canvas.
+#
+# The canvas is recomposed every frame from cheap blits (static background,
+# cached HUD layer, cached pet frames, FX), but only the regions whose content
+# changed are scaled up and pushed to the window. Each visible element is
+# marked with its rect and a key describing its content; an element is dirty
+# when that (rect, key) pair was not on screen last frame.
+
+BG_COLOR = (20, 20, 20)
+GRID_COLOR = (24, 24, 24)
+GRID_STEP = 8
+LAYER_COLORKEY = (255, 0, 255)
+
+# Above this share of the canvas a single full-canvas update is cheaper than many rects.
+FULL_UPDATE_RATIO = 0.6
+
+
+def make_background(w: int, h: int) -> pg.Surface:
+    bg = pg.Surface((w, h))
+    bg.fill(BG_COLOR)
+    for gx in range(0, w, GRID_STEP): pg.draw.line(bg, GRID_COLOR, (gx, 0), (gx, h))
+    for gy in range(0, h, GRID_STEP): pg.draw.line(bg, GRID_COLOR, (0, gy), (w, gy))
+    return bg
+
+
+class CachedLayer:
+    """Colour-keyed overlay that is repainted only when its key changes."""
+
+    _EMPTY = object()
+
+    def __init__(self, size: Tuple[int, int]):
+        self.surface = pg.Surface(size)
+        self.surface.set_colorkey(LAYER_COLORKEY)
+        self.key: Hashable = self._EMPTY
+        self.repaints = 0
+
+    def update(self, key: Hashable, paint: Callable[[pg.Surface], None]) -> bool:
+        if key == self.key:
+            return False
+        self.surface.fill(LAYER_COLORKEY)
+        paint(self.surface)
+        self.key = key
+        self.repaints += 1
+        return True
+
+    def invalidate(self):
+        self.key = self._EMPTY
+
+
+class DirtyTracker:
+    def __init__(self, w: int, h: int):
+        self.bounds = pg.Rect(0, 0, w, h)
+        self.prev: set = set()
+        self.cur: set = set()
+        self.prev_volatile: List[pg.Rect] = []
+        self.volatile: List[pg.Rect] = []
+        self.full = True
+
+    def mark(self, rect, key: Hashable = None):
+        """Record an element drawn this frame; key=None means it changes every frame."""
+        r = pg.Rect(rect)
+        if key is None:
+            self.volatile.append(r)
+        else:
+            self.cur.add((tuple(r), key))
+
+    def invalidate(self):
+        self.full = True
+
+    def collect(self) -> List[pg.Rect]:
+        """Canvas rects that differ from the previous frame; resets for the next frame."""
+        if self.full:
+            rects = [self.bounds.copy()]
+        else:
+            rects = [pg.Rect(r) for r, _ in self.cur ^ self.prev]
+            rects += self.volatile + self.prev_volatile
+            rects = merge_rects([r.clip(self.bounds) for r in rects if r.colliderect(self.bounds)])
+            if sum(r.w * r.h for r in rects) > self.bounds.w * self.bounds.h * FULL_UPDATE_RATIO:
+                rects = [self.bounds.copy()]
+        self.full = False
+        self.prev, self.cur = self.cur, set()
+        self.prev_volatile, self.volatile = self.volatile, []
+        return rects
+
+
+def merge_rects(rects: List[pg.Rect]) -> List[pg.Rect]:
+    # Union overlapping rects so no screen area is scaled and pushed twice.
+    out: List[pg.Rect] = []
+    for r in rects:
+        r = r.copy()
+        merged = True
+        while merged:
+            merged = False
+            for i, o in enumerate(out):
+                if r.colliderect(o):
+                    r.union_ip(out.pop(i))
+                    merged = True
+                    break
+        out.append(r)
+    return out
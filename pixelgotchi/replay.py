@@ -0,0 +1,335 @@
+"""Record a play session to a compact binary log and replay it exactly.
+
+    python -m pixelgotchi.replay record session.pgr      # play normally, logging input
+    python -m pixelgotchi.replay play session.pgr        # watch it again
+    python -m pixelgotchi.replay play session.pgr --headless --profile
+
+A log holds the RNG seed and the starting PetState, then for every frame
+its dt, clock reading, input events and the chat replies that arrived.
+Replaying feeds those back through the same game.main() loop, so the
+session (and its frame-by-frame work) is reproduced without a user or a
+chat server; the replay never touches the save file.
+
+File layout (little-endian):
+    header  b"PGRP", u16 version, u64 seed, u32 n + n bytes of JSON
+    frame   b"F", f64 dt, u32 ticks_ms, u16 events, u16 chat results,
+            then each event and each chat result
+    end     b"E", u32 n + n bytes of JSON (the final state, for checking)
+"""
+import argparse
+import json
+import os
+import random
+import struct
+import sys
+import time
+from dataclasses import asdict
+from typing import BinaryIO, List, Optional, Tuple
+
+import pygame as pg
+
+from .config import FPS, SCALE, DISPLAY_SCALED
+from .state import PetState, load_state
+from .chat import ChatEngine, ChatResult, ChatWorker
+from .loop import LiveDriver
+
+MAGIC = b"PGRP"
+VERSION = 1
+
+# Only events main() reacts to are logged, with just the attributes it reads.
+EVENT_FIELDS = {
+    pg.QUIT: (),
+    pg.VIDEOEXPOSE: (),
+    pg.WINDOWEXPOSED: (),
+    pg.WINDOWRESTORED: (),
+    pg.KEYDOWN: (("key", "i"), ("mod", "H"), ("unicode", "s")),
+    pg.MOUSEMOTION: (("pos", "hh"),),
+    pg.MOUSEBUTTONDOWN: (("button", "B"), ("pos", "hh")),
+    pg.MOUSEWHEEL: (("x", "h"), ("y", "h")),
+}
+
+_FRAME = struct.Struct("<dIHH")
+_CHAT = struct.Struct("<IBdd")
+_U32 = struct.Struct("<I")
+
+
+def _pack_str(text: str) -> bytes:
+    data = text.encode("utf-8")
+    return _U32.pack(len(data)) + data
+
+
+def pack_event(ev: pg.event.Event) -> bytes:
+    out = [struct.pack("<H", ev.type)]
+    for name, fmt in EVENT_FIELDS[ev.type]:
+        val = getattr(ev, name)
+        if fmt == "s":
+            data = val.encode("utf-8")
+            out.append(struct.pack("<B", len(data)) + data)
+        elif len(fmt) > 1:
+            out.append(struct.pack("<" + fmt, *val))
+        else:
+            out.append(struct.pack("<" + fmt, val))
+    return b"".join(out)
+
+
+def pack_chat(res: ChatResult) -> bytes:
+    flags = res.error | res.done << 1 | (res.ttft is not None) << 2
+    return (_CHAT.pack(res.req_id, flags, res.latency, res.ttft or 0.0)
+            + _pack_str(res.user_text) + _pack_str(res.text))
+
+
+class _Reader:
+    def __init__(self, data: bytes):
+        self.data = data
+        self.pos = 0
+
+    def unpack(self, fmt):
+        st = fmt if isinstance(fmt, struct.Struct) else struct.Struct(fmt)
+        vals = st.unpack_from(self.data, self.pos)
+        self.pos += st.size
+        return vals
+
+    def bytes(self, n: int) -> bytes:
+        out = self.data[self.pos:self.pos + n]
+        self.pos += n
+        return out
+
+    def str(self) -> str:
+        return self.bytes(self.unpack(_U32)[0]).decode("utf-8")
+
+    def event(self) -> pg.event.Event:
+        etype, = self.unpack("<H")
+        attrs = {}
+        for name, fmt in EVENT_FIELDS[etype]:
+            if fmt == "s":
+                attrs[name] = self.bytes(self.unpack("<B")[0]).decode("utf-8")
+            elif len(fmt) > 1:
+                attrs[name] = self.unpack("<" + fmt)
+            else:
+                attrs[name] = self.unpack("<" + fmt)[0]
+        return pg.event.Event(etype, attrs)
+
+    def chat(self) -> ChatResult:
+        req_id, flags, latency, ttft = self.unpack(_CHAT)
+        user_text, text = self.str(), self.str()
+        return ChatResult(req_id, user_text, text, error=bool(flags & 1), latency=latency,
+                          done=bool(flags & 2), ttft=ttft if flags & 4 else None)
+
+
+class Recorder:
+    """Wraps a driver (the live one by default) and logs every frame it hands out."""
+
+    def __init__(self, path, seed: int, state: PetState, chat_ready: bool, driver=None):
+        self.driver = driver or LiveDriver()
+        self.file: BinaryIO = open(path, "wb")
+        header = {"state": asdict(state), "chat_ready": chat_ready, "fps": FPS,
+                  "scale": SCALE, "display_scaled": DISPLAY_SCALED}
+        self.file.write(MAGIC + struct.pack("<HQ", VERSION, seed) + _pack_str(json.dumps(header)))
+        self.frame: Optional[list] = None  # [dt, ticks, events, chat results] of the current frame
+        self.ticks = 0
+
+    @property
+    def done(self) -> bool:
+        return self.driver.done
+
+    def tick(self) -> float:
+        self._flush()
+        dt = self.driver.tick()
+        self.ticks = self.driver.ticks_ms()
+        self.frame = [dt, self.ticks, [], []]
+        return dt
+
+    def events(self) -> List[pg.event.Event]:
+        evs = self.driver.events()
+        self.frame[2].extend(ev for ev in evs if ev.type in EVENT_FIELDS)
+        return evs
+
+    def ticks_ms(self) -> int:
+        return self.ticks  # sampled once per frame so the replay sees the same value
+
+    def set_active(self, active: bool):
+        self.driver.set_active(active)
+
+    def load(self) -> Optional[Tuple[float, float]]:
+        return self.driver.load()
+
+    def chat_worker(self, engine: ChatEngine) -> ChatWorker:
+        return RecordingChatWorker(engine, self)
+
+    def _flush(self):
+        if self.frame is None:
+            return
+        dt, ticks, evs, chats = self.frame
+        self.file.write(b"F" + _FRAME.pack(dt, ticks, len(evs), len(chats)))
+        self.file.write(b"".join(map(pack_event, evs)) + b"".join(map(pack_chat, chats)))
+        self.frame = None
+
+    def close(self, final: Optional[PetState] = None):
+        self._flush()
+        if final is not None:
+            self.file.write(b"E" + _pack_str(json.dumps(asdict(final))))
+        self.file.close()
+
+
+class RecordingChatWorker(ChatWorker):
+    def __init__(self, engine: ChatEngine, recorder: Recorder):
+        super().__init__(engine)
+        self.recorder = recorder
+
+    def poll(self) -> List[ChatResult]:
+        out = super().poll()
+        self.recorder.frame[3].extend(out)
+        return out
+
+
+class Replayer:
+    """Driver that plays a recorded log back; with `realtime` it also keeps the recorded pace."""
+
+    def __init__(self, path, realtime: bool = False):
+        with open(path, "rb") as f:
+            r = _Reader(f.read())
+        if r.bytes(4) != MAGIC:
+            raise ValueError(f"{path}: not a Pixelgotchi session log")
+        version, self.seed = r.unpack("<HQ")
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported log version {version}")
+        self.header = json.loads(r.str())
+        self.frames = []
+        self.final: Optional[dict] = None
+        while r.pos < len(r.data):
+            tag = r.bytes(1)
+            if tag == b"E":
+                self.final = json.loads(r.str())
+                break
+            dt, ticks, n_ev, n_chat = r.unpack(_FRAME)
+            evs = [r.event() for _ in range(n_ev)]
+            chats = [r.chat() for _ in range(n_chat)]
+            self.frames.append((dt, ticks, evs, chats))
+        self.index = -1
+        self.realtime = realtime
+        self.clock = pg.time.Clock()
+
+    def initial_state(self) -> PetState:
+        return PetState(**self.header["state"])
+
+    @property
+    def done(self) -> bool:
+        return self.index >= len(self.frames) - 1
+
+    def tick(self) -> float:
+        self.index += 1
+        dt = self.frames[self.index][0]
+        if self.realtime and dt > 0:
+            self.clock.tick(1.0 / dt)
+        return dt
+
+    def events(self) -> List[pg.event.Event]:
+        pg.event.pump()  # keep a real window responsive; its input is ignored
+        return list(self.frames[self.index][2])
+
+    def ticks_ms(self) -> int:
+        return self.frames[self.index][1]
+
+    def set_active(self, active: bool):
+        pass  # the recorded dt already reflects the live frame rate
+
+    def load(self) -> Optional[Tuple[float, float]]:
+        return None
+
+    def chat_worker(self, engine: ChatEngine) -> ChatWorker:
+        return ReplayChatWorker(engine, self)
+
+
+class ReplayChatWorker(ChatWorker):
+    """Hands out the recorded replies on the frames they arrived; never calls the engine."""
+
+    def __init__(self, engine: ChatEngine, replayer: Replayer):
+        super().__init__(engine)
+        self.replayer = replayer
+
+    def submit(self, user_text: str, needs=None) -> int:
+        self._next_id += 1
+        self.pending[self._next_id] = (user_text, 0.0)
+        return self._next_id
+
+    def poll(self) -> List[ChatResult]:
+        out = list(self.replayer.frames[self.replayer.index][3])
+        for res in out:
+            if res.done:
+                self.pending.pop(res.req_id, None)
+                self.last_latency = res.latency
+                if res.ttft is not None:
+                    self.last_ttft = res.ttft
+                    self.ttfts.append(res.ttft)
+        return out
+
+
+def record(path, seed: Optional[int] = None) -> PetState:
+    from .game import main
+    seed = int(time.time_ns() & 0xFFFFFFFF) if seed is None else seed
+    random.seed(seed)
+    state = load_state()
+    chat = ChatEngine()
+    rec = Recorder(path, seed, state, chat.is_ready())
+    final = None
+    try:
+        final = main(rec, state=state, chat=chat)
+    finally:
+        rec.close(final)
+    return final
+
+
+def replay(path, realtime: bool = True) -> PetState:
+    from .game import main
+    rep = Replayer(path, realtime)
+    random.seed(rep.seed)
+    chat = ChatEngine(enabled=False)
+    chat.enabled = rep.header["chat_ready"]  # replies come from the log, the engine is never called
+    return main(rep, state=rep.initial_state(), chat=chat, persist=False)
+
+
+def matches(final: PetState, expected: Optional[dict]) -> Optional[bool]:
+    # last_timestamp is excluded: the recorded run saved (and so re-stamped) its state
+    if expected is None:
+        return None
+    got = asdict(final)
+    return all(json.dumps(got[k]) == json.dumps(v) for k, v in expected.items() if k != "last_timestamp")
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pixelgotchi.replay")
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("record", help="play normally and log the session")
+    p.add_argument("path")
+    p.add_argument("--seed", type=int)
+    p = sub.add_parser("play", help="replay a logged session")
+    p.add_argument("path")
+    p.add_argument("--headless", action="store_true", help="no window or sound, as fast as possible")
+    p.add_argument("--profile", metavar="OUT", nargs="?", const="replay.prof",
+                   help="run under cProfile and write the stats to OUT")
+    args = ap.parse_args(argv)
+
+    if args.cmd == "record":
+        record(args.path, args.seed)
+        print(f"session written to {args.path}")
+        return 0
+    if args.headless:
+        os.environ["SDL_VIDEODRIVER"] = "dummy"
+        os.environ["SDL_AUDIODRIVER"] = "dummy"
+    expected = Replayer(args.path).final
+    if args.profile:
+        import cProfile
+        prof = cProfile.Profile()
+        final = prof.runcall(replay, args.path, not args.headless)
+        prof.dump_stats(args.profile)
+        print(f"profile written to {args.profile}")
+    else:
+        final = replay(args.path, not args.headless)
+    ok = matches(final, expected)
+    if ok is not None:
+        print("replay matches the recorded session" if ok else "replay DIVERGED from the recorded session")
+    return 0 if ok is not False else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
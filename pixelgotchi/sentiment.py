@@ -1,4 +1,10 @@
-from typing import Tuple
+import math
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Mapping, Optional, Sequence, Tuple
+
+from .config import SENTIMENT_LEXICON
 
 # Simple, fast sentiment approximation without external libs.
 # Returns sentiment in [-1, 1] and a label.
@@ -12,13 +18,129 @@ NEG_WORDS = {
     "ew","eww","yuck","hungry","starving","lonely","cry","upset","ugh","grr"
 }
 
+# term -> weight; terms are whole words or short phrases. The default counts each word once.
+LEXICON: Dict[str, float] = {**{w: 1.0 for w in POS_WORDS}, **{w: -1.0 for w in NEG_WORDS}}
+
+# Opt-in (SENTIMENT_LEXICON=weighted): graded weights and inflected forms
+WEIGHTED_LEXICON: Dict[str, float] = {
+    # positive
+    "love": 1.0, "loved": 1.0, "loves": 1.0, "lovely": 0.8, "like": 0.5, "likes": 0.5, "liked": 0.5,
+    "yay": 0.8, "good": 0.6, "great": 0.8, "happy": 0.8, "fun": 0.7, "nice": 0.6, "awesome": 1.0,
+    "cool": 0.6, "enjoy": 0.8, "enjoyed": 0.8, "cute": 0.7, "sweet": 0.6, "bravo": 0.8, "wow": 0.5,
+    "woo": 0.5, "thanks": 0.6, "thank you": 0.7, "yummy": 0.7, "delicious": 0.8, "delish": 0.7,
+    # negative
+    "sad": -0.8, "angry": -0.8, "mad": -0.7, "hate": -1.0, "hated": -1.0, "hates": -1.0, "bad": -0.7,
+    "terrible": -1.0, "awful": -1.0, "boring": -0.7, "bored": -0.6, "tired": -0.5, "exhausted": -0.7,
+    "dirty": -0.5, "ew": -0.5, "eww": -0.6, "yuck": -0.6, "hungry": -0.4, "starving": -0.7,
+    "lonely": -0.8, "cry": -0.7, "crying": -0.7, "upset": -0.8, "ugh": -0.5, "grr": -0.6,
+}
+
+
+def _trie_regex(terms) -> str:
+    """One alternation shaped like a trie, so the regex engine never retries a shared prefix."""
+    trie: dict = {}
+    for term in terms:
+        node = trie
+        for ch in term:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node) -> str:
+        alts = [(r"\s+" if ch == " " else re.escape(ch)) + build(node[ch]) for ch in sorted(node) if ch]
+        if not alts:
+            return ""
+        body = alts[0] if len(alts) == 1 else "(?:" + "|".join(alts) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+    return build(trie)
+
+
+class Lexicon:
+    """Weighted terms matched as whole words by a single compiled regex.
+
+    score() is (positive - negative weight) / max(1, total weight) over the
+    distinct terms found, as the old word-set scan did: "love love hate"
+    scores 0 with either lexicon, and with WEIGHTED_LEXICON a lone "like"
+    scores 0.5.
+    """
+
+    def __init__(self, weights: Mapping[str, float]):
+        self.weights = {" ".join(t.lower().split()): float(w) for t, w in weights.items() if t.strip()}
+        self.pattern = re.compile(r"(?<![\w'])" + _trie_regex(self.weights) + r"(?![\w'])") if self.weights else None
+
+    @classmethod
+    def load(cls, path) -> "Lexicon":
+        """Read `term weight` lines (terms may be phrases; # starts a comment)."""
+        weights = {}
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                line = line.split("#", 1)[0].strip()
+                if line:
+                    term, weight = line.rsplit(None, 1)
+                    weights[term] = float(weight)
+        return cls(weights)
+
+    def __getstate__(self):
+        return self.weights  # workers rebuild the regex
+
+    def __setstate__(self, weights):
+        self.__init__(weights)
+
+    def score(self, text: str) -> Tuple[float, str]:
+        pos = neg = 0.0
+        if self.pattern is not None:
+            weights = self.weights
+            found = set(self.pattern.findall(text.lower()))
+            for term in {t if t in weights else " ".join(t.split()) for t in found}:  # phrase with unusual spacing
+                w = weights[term]
+                if w > 0:
+                    pos += w
+                else:
+                    neg -= w
+        if pos == 0 and neg == 0:
+            return 0.0, "neutral"
+        score = (pos - neg) / max(1.0, pos + neg)
+        label = "positive" if score > 0 else ("negative" if score < 0 else "neutral")
+        return max(-1.0, min(1.0, score)), label
+
+
+def default_lexicon(spec: Optional[str] = SENTIMENT_LEXICON) -> Lexicon:
+    """LEXICON, WEIGHTED_LEXICON for "weighted", else the `term weight` file at `spec`."""
+    if not spec:
+        return Lexicon(LEXICON)
+    if spec == "weighted":
+        return Lexicon(WEIGHTED_LEXICON)
+    return Lexicon.load(spec)
+
+
+lexicon = default_lexicon()
+
 
 def sentiment_score(text: str) -> Tuple[float, str]:
-    t = text.lower()
-    pos = sum(1 for w in POS_WORDS if w in t)
-    neg = sum(1 for w in NEG_WORDS if w in t)
-    if pos == 0 and neg == 0:
-        return 0.0, "neutral"
-    score = (pos - neg) / max(1, pos + neg)
-    label = "positive" if score > 0 else ("negative" if score < 0 else "neutral")
-    return max(-1.0, min(1.0, score)), label
+    return lexicon.score(text)
+
+
+def _score_chunk(args) -> List[Tuple[float, str]]:
+    lex, texts = args
+    return [lex.score(t) for t in texts]
+
+
+def score_many(texts: Sequence[str], lex: Optional[Lexicon] = None, workers: Optional[int] = None,
+               min_parallel: int = 5000) -> List[Tuple[float, str]]:
+    """Scores for a corpus, in order; spread over a process pool once it has `min_parallel` texts."""
+    lex = lex or lexicon
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(texts) < min_parallel:
+        return [lex.score(t) for t in texts]
+    size = math.ceil(len(texts) / (workers * 4))
+    chunks = [(lex, texts[i:i + size]) for i in range(0, len(texts), size)]
+    out: List[Tuple[float, str]] = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for part in pool.map(_score_chunk, chunks):
+            out.extend(part)
+    return out
+
+
+def sentiment_deltas(score: float, gains: Mapping[str, float]) -> Tuple[float, float, float]:
+    """(fun, energy, hygiene) change for a chat scoring `score`, given CHAT_SENTIMENT_GAINS-style gains."""
+    side = "gain" if score > 0 else "loss"
+    return (score * gains["fun_" + side], score * gains["energy_" + side], score * gains["hygiene_" + side])
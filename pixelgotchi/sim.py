@@ -0,0 +1,93 @@
+import math
+from typing import NamedTuple
+
+from .config import SIM_HZ, SIM_MAX_CATCHUP
+from .state import PetState, clamp
+
+
+class FixedStep:
+    """Fixed-timestep accumulator.
+
+    advance(dt) banks real time and returns how many steps of `step`
+    seconds to simulate now. Time is kept in integer nanoseconds so the
+    number of steps depends only on the total time, not on how it was cut
+    into frames. After a stall at most `max_catchup` seconds are simulated;
+    the rest is skipped and counted in `skipped`. `alpha` is how far the
+    render time sits into the next step (0..1).
+    """
+
+    def __init__(self, hz: float = SIM_HZ, max_catchup: float = SIM_MAX_CATCHUP):
+        self.step_ns = max(1, round(1e9 / hz))
+        self.step = self.step_ns / 1e9
+        self.max_steps = max(1, math.ceil(max_catchup / self.step))
+        self.acc_ns = 0
+        self.steps = 0
+        self.skipped = 0.0
+
+    def advance(self, dt: float) -> int:
+        n, self.acc_ns = divmod(self.acc_ns + max(0, round(dt * 1e9)), self.step_ns)
+        if n > self.max_steps:
+            self.skipped += (n - self.max_steps) * self.step
+            n = self.max_steps
+        self.steps += n
+        return n
+
+    @property
+    def alpha(self) -> float:
+        return self.acc_ns / self.step_ns
+
+    @property
+    def ahead(self) -> float:
+        """Seconds the render time is past the last simulated step."""
+        return self.acc_ns / 1e9
+
+
+class Needs(NamedTuple):
+    """The parts of PetState the HUD and mood show, for interpolation."""
+    hunger: float
+    energy: float
+    fun: float
+    hygiene: float
+    asleep: bool
+
+    @classmethod
+    def of(cls, state: PetState) -> "Needs":
+        return cls(state.hunger, state.energy, state.fun, state.hygiene, state.asleep)
+
+    @classmethod
+    def at(cls, state: PetState, now: float) -> "Needs":
+        """Needs of `state` drifted on to `now` at its current rates, without touching it.
+
+        Matches apply_offline(now) as long as no death boundary lies in between.
+        """
+        dt = max(0.0, now - state.last_timestamp) if state.alive else 0.0
+        r = state.rates()
+        return cls(clamp(state.hunger + dt * r["hunger"]), clamp(state.energy + dt * r["energy"]),
+                   clamp(state.fun + dt * r["fun"]), clamp(state.hygiene + dt * r["hygiene"]), state.asleep)
+
+    def lerp(self, other: "Needs", t: float) -> "Needs":
+        return Needs(*(a + (b - a) * t for a, b in zip(self[:4], other[:4])), other.asleep)
+
+
+class NeedsInterpolator:
+    """Needs to draw at a point between the last two sim steps.
+
+    Both ends are Needs values (Needs.at the step time). Changes made
+    between steps (actions, chat effects, a respawn) are folded into both
+    ends with begin(), so they show at once instead of easing in over a step.
+    """
+
+    def __init__(self, state: PetState):
+        self.prev = self.cur = Needs.of(state)
+
+    def begin(self, now: Needs):
+        if now != self.cur:
+            self.prev = Needs(*(clamp(p + n - c) for p, n, c in zip(self.prev[:4], now[:4], self.cur[:4])),
+                              now.asleep)
+            self.cur = now
+
+    def stepped(self, now: Needs):
+        self.prev, self.cur = self.cur, now
+
+    def view(self, alpha: float) -> Needs:
+        return self.prev.lerp(self.cur, alpha)
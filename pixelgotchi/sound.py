@@ -0,0 +1,87 @@
+import math
+import pygame as pg
+from typing import Dict, Tuple
+
+try:
+    import numpy as np
+except Exception:  # optional
+    np = None
+
+# Feed, Play, Sleep, Clean, angry wake-up, default beep
+TONE_FREQS = (520, 760, 400, 640, 300, 880)
+TONE_MS = 60
+TONE_VOLUME = 0.2
+
+
+class ToneBank:
+    """Beep tones synthesised once and kept as ready-to-play Sounds.
+
+    The mixer is initialised once in init(); every tone in TONE_FREQS is
+    built up front and gets a reserved channel of its own, so pressing an
+    action only restarts that channel. Other tones are built on first use
+    and memoized.
+    """
+
+    def __init__(self, freqs=TONE_FREQS, dur_ms: int = TONE_MS):
+        self.freqs = tuple(freqs)
+        self.dur_ms = dur_ms
+        self.ready = False
+        self.sounds: Dict[Tuple[int, int], pg.mixer.Sound] = {}
+        self.channels: Dict[int, pg.mixer.Channel] = {}
+
+    def init(self) -> bool:
+        if self.ready and pg.mixer.get_init() is not None:
+            return True
+        self.ready = False  # the mixer was shut down (pg.quit); start over
+        self.sounds.clear()
+        self.channels.clear()
+        try:
+            if pg.mixer.get_init() is None:
+                pg.mixer.init()
+            pg.mixer.set_num_channels(max(8, len(self.freqs) + 4))
+            pg.mixer.set_reserved(len(self.freqs))
+            for i, freq in enumerate(self.freqs):
+                self.channels[freq] = pg.mixer.Channel(i)
+                self.sound(freq, self.dur_ms)
+        except pg.error:
+            return False
+        self.ready = True
+        return True
+
+    def sound(self, freq: int, dur_ms: int) -> pg.mixer.Sound:
+        key = (freq, dur_ms)
+        snd = self.sounds.get(key)
+        if snd is None:
+            rate, _, channels = pg.mixer.get_init()
+            snd = self.sounds[key] = pg.mixer.Sound(buffer=synth_tone(freq, dur_ms, rate, channels))
+        return snd
+
+    def play(self, freq: int = 880, dur_ms: int = TONE_MS):
+        if not self.ready:
+            return
+        snd = self.sound(freq, dur_ms)
+        ch = self.channels.get(freq)
+        if ch is not None:
+            ch.play(snd)
+        else:
+            snd.play()
+
+
+def synth_tone(freq: float, dur_ms: int, rate: int, channels: int = 1) -> bytes:
+    """Signed 16-bit sine samples at the mixer's rate, interleaved for `channels`."""
+    n = int(rate * (dur_ms/1000.0))
+    amp = 32767 * TONE_VOLUME
+    if np is not None:
+        t = np.arange(n) / rate
+        samples = (amp * np.sin(2*math.pi*freq*t)).astype("<i2")
+        if channels > 1:
+            samples = np.repeat(samples, channels)
+        return samples.tobytes()
+    buf = bytearray()
+    for i in range(n):
+        s = int(amp * math.sin(2*math.pi*freq*i/rate)).to_bytes(2, byteorder='little', signed=True)
+        buf += s * channels
+    return bytes(buf)
+
+
+tones = ToneBank()
@@ -1,8 +1,44 @@
+import copy
+import math
 import time
-import json
-from dataclasses import dataclass, asdict, field
-from typing import Dict
-from .config import SAVE_PATH
+from dataclasses import dataclass, asdict, field, fields
+from pathlib import Path
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional, Tuple
+from .config import SAVE_PATH, DECAY_RATES
+from .journal import SaveJournal, SaveWriter, recover
+
+
+def make_rates(decay: Mapping[str, float]) -> Tuple[Mapping[str, float], Mapping[str, float]]:
+    """Per-second change of each need, awake and asleep (read-only), from DECAY_RATES-style data."""
+    awake = MappingProxyType({"hunger": decay["hunger_up"], "energy": -decay["energy_down_awake"],
+                              "fun": -decay["fun_down"], "hygiene": -decay["hygiene_down"]})
+    asleep = MappingProxyType({"hunger": decay["hunger_up"]*decay["hunger_sleep_factor"],
+                               "energy": decay["energy_up_sleep"],
+                               "fun": -(decay["fun_down"]*decay["fun_sleep_factor"]),
+                               "hygiene": -decay["hygiene_down"]})
+    return awake, asleep
+
+
+RATES_AWAKE, RATES_ASLEEP = make_rates(DECAY_RATES)
+_decay = dict(DECAY_RATES)
+
+
+def rates_for(asleep: bool) -> Mapping[str, float]:
+    return RATES_ASLEEP if asleep else RATES_AWAKE
+
+
+def use_decay_rates(decay: Mapping[str, float]):
+    """Switch all pets to other decay rates (tune.py sweeps them); returns the ones replaced."""
+    global RATES_AWAKE, RATES_ASLEEP, _decay
+    prev = _decay
+    RATES_AWAKE, RATES_ASLEEP = make_rates(decay)
+    _decay = dict(decay)
+    return prev
+
+# Death boundaries
+STARVED_AT = 0.999   # hunger
+EXHAUSTED_AT = 0.001  # energy
 
 
 def clamp(x: float, a: float = 0.0, b: float = 1.0) -> float:
@@ -25,33 +61,45 @@ class PetState:
     # Meta
     last_timestamp: float = field(default_factory=time.time)
     appearance: Dict = field(default_factory=dict)
+    died_at: Optional[float] = None  # exact time of death, on the last_timestamp clock
 
     # --- Simulation ---
+    def rates(self) -> Mapping[str, float]:
+        """Change per second of each need; constant until the sleep flag flips."""
+        return rates_for(self.asleep)
+
+    def death_in(self) -> Tuple[float, str]:
+        """Seconds until the first death boundary is reached at the current rates (inf if never), and why."""
+        r = self.rates()
+        starve = max(0.0, (STARVED_AT - self.hunger) / r["hunger"]) if r["hunger"] > 0 else math.inf
+        exhaust = max(0.0, (self.energy - EXHAUSTED_AT) / -r["energy"]) if r["energy"] < 0 else math.inf
+        return (starve, "Starved") if starve <= exhaust else (exhaust, "Exhausted")
+
     def apply_offline(self, now: float):
         dt = max(0.0, now - self.last_timestamp)
         if not self.alive:
             self.last_timestamp = now
             return
-        # Decay rates per second
-        hunger_up = 1/600.0
-        energy_down_awake = 1/1200.0
-        energy_up_sleep = 1/600.0
-        fun_down = 1/900.0
-        hygiene_down = 1/1800.0
-
-        if self.asleep:
-            self.energy = clamp(self.energy + dt * energy_up_sleep)
-            self.hunger = clamp(self.hunger + dt * (hunger_up*0.6))
-            self.fun = clamp(self.fun - dt * (fun_down*0.4))
+        # Linear until a death boundary, so a long gap stops exactly there.
+        t_death, reason = self.death_in()
+        if t_death <= dt:
+            self._drift(t_death)
+            self.alive = False
+            self.asleep = False
+            self.death_reason = reason
+            self.died_at = self.last_timestamp + t_death
         else:
-            self.energy = clamp(self.energy - dt * energy_down_awake)
-            self.hunger = clamp(self.hunger + dt * hunger_up)
-            self.fun = clamp(self.fun - dt * fun_down)
-        self.hygiene = clamp(self.hygiene - dt * hygiene_down)
-
-        self.check_death()
+            self._drift(dt)
+            self.check_death()
         self.last_timestamp = now
 
+    def _drift(self, dt: float):
+        r = self.rates()
+        self.energy = clamp(self.energy + dt * r["energy"])
+        self.hunger = clamp(self.hunger + dt * r["hunger"])
+        self.fun = clamp(self.fun + dt * r["fun"])
+        self.hygiene = clamp(self.hygiene + dt * r["hygiene"])
+
     def tick(self, dt: float):
         self.apply_offline(self.last_timestamp + dt)
 
@@ -75,32 +123,57 @@ class PetState:
     def check_death(self):
         if not self.alive:
             return
-        if self.hunger >= 0.999:
+        if self.hunger >= STARVED_AT:
             self.alive = False
             self.asleep = False
             self.death_reason = "Starved"
-        elif self.energy <= 0.001:
+        elif self.energy <= EXHAUSTED_AT:
             self.alive = False
             self.asleep = False
             self.death_reason = "Exhausted"
+        if not self.alive and self.died_at is None:
+            self.died_at = self.last_timestamp
 
 
 # --- Persistence ---
 
-def load_state() -> PetState:
-    if SAVE_PATH.exists():
+def load_state(path: Path = SAVE_PATH) -> PetState:
+    """Last saved pet (snapshot plus journal, see journal.py) brought up to now, or a new one."""
+    data = recover(path).data
+    st = None
+    if data is not None:
         try:
-            data = json.loads(SAVE_PATH.read_text())
-            st = PetState(**{k: data.get(k, getattr(PetState, k)) for k in PetState.__annotations__.keys()})
-            st.apply_offline(time.time())
-            return st
-        except Exception:
-            pass
-    st = PetState()
+            st = PetState(**{f.name: data[f.name] for f in fields(PetState) if f.name in data})
+        except TypeError:
+            st = None
+    st = st or PetState()
     st.apply_offline(time.time())
     return st
 
 
-def save_state(state: PetState):
+_appearance_copy: Tuple[Optional[Dict], Optional[Dict]] = (None, None)  # (live dict, private copy)
+
+
+def save_record(state: PetState) -> Mapping:
+    """Read-only copy of every field, stamped with the wall clock; cheap enough for every frame.
+
+    The appearance is deep-copied only when it changed; records share that
+    private copy, which nothing mutates.
+    """
+    global _appearance_copy
+    live, frozen = _appearance_copy
+    if live is not state.appearance or frozen != state.appearance:
+        frozen = copy.deepcopy(state.appearance)
+        _appearance_copy = (state.appearance, frozen)
+    return MappingProxyType(dict(vars(state), appearance=frozen, last_timestamp=time.time()))
+
+
+def save_state(state: PetState, path: Path = SAVE_PATH, writer: Optional[SaveWriter] = None):
+    """Stamp the state and write it as a fresh snapshot; with `writer`, also flushes and stops it."""
     state.last_timestamp = time.time()
-    SAVE_PATH.write_text(json.dumps(asdict(state)))
+    if writer is not None:
+        writer.close(MappingProxyType(asdict(state)))
+        return
+    journal = SaveJournal(path)
+    journal.save(asdict(state))
+    journal.close()
@@ -0,0 +1,171 @@
+"""HTTP side of the chat: pooled client, deadlines, retries and a circuit breaker.
+
+ChatTransport owns the OpenAI client. Its HTTP client keeps up to
+CHAT_POOL_SIZE keep-alive connections open for CHAT_KEEPALIVE seconds, so
+replies after the first skip the TCP/TLS handshake. Every request has a
+deadline of CHAT_REQUEST_TIMEOUT seconds for all of its attempts together;
+transient failures (connection errors, timeouts, 408/409/429 and 5xx) are
+retried up to CHAT_RETRIES times after a full-jitter backoff. After
+CHAT_BREAKER_FAILURES failed requests in a row the breaker opens and
+requests fail at once with CircuitOpen for CHAT_BREAKER_COOLDOWN seconds;
+then one trial request decides whether it closes again. ChatEngine answers
+with an offline reply while it cannot reach the server.
+"""
+import random
+import threading
+import time
+from typing import Callable, Optional
+
+try:
+    import openai
+    from openai import OpenAI
+except Exception:  # optional
+    openai = OpenAI = None
+try:
+    import httpx  # installed with openai
+except Exception:  # optional; newer openai SDKs ship it as httpx2
+    try:
+        import httpx2 as httpx
+    except Exception:
+        httpx = None
+
+from .config import (OPENAI_BASE_URL, CHAT_REQUEST_TIMEOUT, CHAT_CONNECT_TIMEOUT, CHAT_RETRIES, CHAT_RETRY_BACKOFF,
+                     CHAT_POOL_SIZE, CHAT_KEEPALIVE, CHAT_BREAKER_FAILURES, CHAT_BREAKER_COOLDOWN)
+from .perf import Histogram
+
+RETRY_STATUS = {408, 409, 429}  # plus every 5xx
+BACKOFF_CAP = 4.0  # seconds
+
+OFFLINE_REPLIES = [
+    "*yawns* My head's all fuzzy... try me again in a bit?",
+    "*tilts head* I can't hear you right now, but I'm still here!",
+    "*wiggles* Words are hard at the moment. Pet me instead?",
+    "*blinks slowly* Give me a minute, my thoughts are far away.",
+]
+
+_rng = random.Random()  # never the global stream: replays reseed that one and must not see chat draws
+
+
+def offline_reply(rng: Optional[random.Random] = None) -> str:
+    return (rng or _rng).choice(OFFLINE_REPLIES)
+
+
+class CircuitOpen(Exception):
+    """The server failed repeatedly; requests are refused until the cooldown ends."""
+
+
+def transient(exc: BaseException) -> bool:
+    """Worth retrying: the same request may well succeed a moment later."""
+    if openai is None:
+        return False
+    if isinstance(exc, openai.APIStatusError):
+        return exc.status_code in RETRY_STATUS or exc.status_code >= 500
+    return isinstance(exc, openai.APIConnectionError)  # includes APITimeoutError
+
+
+class CircuitBreaker:
+    """closed -> (failures in a row) -> open -> (cooldown) -> half_open -> one trial -> closed/open."""
+
+    def __init__(self, failures: int = CHAT_BREAKER_FAILURES, cooldown: float = CHAT_BREAKER_COOLDOWN,
+                 clock: Callable[[], float] = time.monotonic):
+        self.failures = failures
+        self.cooldown = cooldown
+        self.clock = clock
+        self.state = "closed"
+        self.streak = 0
+        self.opened_at = 0.0
+        self.trips = 0
+        self.lock = threading.Lock()
+
+    def allow(self) -> bool:
+        with self.lock:
+            if self.state == "open" and self.clock() - self.opened_at >= self.cooldown:
+                self.state = "half_open"
+                return True  # this caller is the trial
+            return self.state == "closed"
+
+    def success(self):
+        with self.lock:
+            self.state = "closed"
+            self.streak = 0
+
+    def failure(self):
+        with self.lock:
+            self.streak += 1
+            if self.state == "half_open" or (self.failures and self.streak >= self.failures):
+                if self.state != "open":
+                    self.trips += 1
+                self.state = "open"
+                self.opened_at = self.clock()
+
+
+class ChatTransport:
+    """Chat completions with pooled connections, a deadline, retries and a breaker."""
+
+    def __init__(self, api_key: str, base_url: Optional[str] = OPENAI_BASE_URL,
+                 deadline: float = CHAT_REQUEST_TIMEOUT, retries: int = CHAT_RETRIES,
+                 backoff: float = CHAT_RETRY_BACKOFF, breaker: Optional[CircuitBreaker] = None):
+        self.deadline = deadline
+        self.retries = retries
+        self.backoff = backoff
+        self.breaker = breaker or CircuitBreaker()
+        self.rng = random.Random()  # backoff jitter, off the global stream
+        limits = httpx.Limits(
+            max_connections=CHAT_POOL_SIZE, max_keepalive_connections=CHAT_POOL_SIZE, keepalive_expiry=CHAT_KEEPALIVE)
+        timeout = openai.Timeout(deadline, connect=min(CHAT_CONNECT_TIMEOUT, deadline))
+        kwargs = {"api_key": api_key, "max_retries": 0, "timeout": timeout,
+                  "http_client": openai.DefaultHttpxClient(limits=limits, timeout=timeout)}
+        if base_url:
+            kwargs["base_url"] = base_url
+        self.client = OpenAI(**kwargs)
+        self.latency = Histogram()   # whole requests that succeeded, retries included
+        self.attempts = Histogram()  # every attempt, failed ones too
+        self.requests = self.failures = self.retried = self.refused = 0
+
+    def create(self, **kwargs):
+        """client.chat.completions.create(**kwargs) within the deadline.
+
+        Raises CircuitOpen while the breaker is open, the last error once
+        retries or the deadline run out, and non-transient errors at once.
+        """
+        if not self.breaker.allow():
+            self.refused += 1
+            raise CircuitOpen()
+        self.requests += 1
+        t0 = time.monotonic()
+        end = t0 + self.deadline
+        attempt = 0
+        while True:
+            a0 = time.monotonic()
+            try:
+                left = max(0.001, end - a0)
+                resp = self.client.chat.completions.create(
+                    timeout=openai.Timeout(left, connect=min(CHAT_CONNECT_TIMEOUT, left)), **kwargs)
+            except Exception as e:
+                now = time.monotonic()
+                self.attempts.record(now - a0)
+                pause = self.rng.uniform(0, min(BACKOFF_CAP, self.backoff * 2 ** attempt))
+                if not transient(e) or attempt >= self.retries or now + pause >= end:
+                    self.failures += 1
+                    if transient(e):
+                        self.breaker.failure()
+                    else:
+                        self.breaker.success()  # the server answered; the request was wrong
+                    raise
+                attempt += 1
+                self.retried += 1
+                time.sleep(pause)
+                continue
+            now = time.monotonic()
+            self.attempts.record(now - a0)
+            self.latency.record(now - t0)
+            self.breaker.success()
+            return resp
+
+    def stream_failed(self):
+        """A stream that opened fine broke off midway."""
+        self.failures += 1
+        self.breaker.failure()
+
+    def close(self):
+        self.client.close()
@@ -0,0 +1,264 @@
+"""Sweep emotion thresholds and decay rates over simulated players.
+
+    python -m pixelgotchi.tune --param hunger_high=0.75,0.85,0.9 --param fun_low=0.2,0.3
+    python -m pixelgotchi.tune --samples 64 --param fun_down=0.0008:0.0016 --param surprise_prob_play=0:0.5
+
+Every candidate parameter set plays the same seeded population of pets
+without a window: a simulated player drops in at random intervals, chats
+now and then and looks after the most pressing need, while NeedsScheduler
+raises threshold crossings exactly as the game does. The result is how
+often each emotion trigger fires per pet-hour (and how many pets die).
+Candidates run on a process pool and each result is cached on disk under
+TUNE_CACHE_DIR, keyed on the parameters, the player model and the seed.
+
+Values given as a,b,c are swept as a grid; lo:hi ranges (or --samples)
+switch to a seeded random search. `priority` takes orders such as
+hunger_high/energy_low/fun_low/hygiene_low.
+"""
+import argparse
+import hashlib
+import itertools
+import json
+import os
+import random
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Dict, List, Optional
+
+from .config import (EMOTION_THRESHOLDS, EMOTION_PRIORITY, SURPRISE_PROB_PLAY, WAKE_ANGRY,
+                     CHAT_SENTIMENT_GAINS, DECAY_RATES, TUNE_CACHE_DIR)
+from .needs import NeedsScheduler, stat_emotion
+from .sentiment import sentiment_score, sentiment_deltas
+from .state import PetState, clamp, use_decay_rates
+
+MODEL = 2  # bump when the simulated player or scoring changes, to invalidate cached results
+
+# Emotion triggers shown in the table (all of them end up in --json)
+TRIGGERS = list(EMOTION_THRESHOLDS) + ["surprised", "angry", "rested", "chat_love", "chat_sad"]
+ACTION_EMOTIONS = {"Feed": "love", "Play": "excited", "Sleep": "sleepy", "Clean": "yuck"}
+CHAT_LINES = ["I love you!", "you're so cute", "good job, buddy", "hello there", "what are you up to?",
+              "ugh, I'm so tired", "this is boring", "I hate mondays", "thanks, that was fun", "you look hungry"]
+
+
+def defaults() -> Dict[str, object]:
+    p: Dict[str, object] = dict(EMOTION_THRESHOLDS)
+    p["priority"] = "/".join(EMOTION_PRIORITY)
+    p["surprise_prob_play"] = SURPRISE_PROB_PLAY
+    p.update(CHAT_SENTIMENT_GAINS)
+    p.update(DECAY_RATES)
+    return p
+
+
+def player_action(st: PetState) -> Optional[str]:
+    """What the simulated player does on a visit: tend to the most pressing need."""
+    if st.hunger > 0.5:
+        return "Feed"
+    if st.asleep:
+        return "Sleep" if st.energy > 0.9 else None
+    if st.energy < 0.3:
+        return "Sleep"
+    if st.hygiene < 0.4:
+        return "Clean"
+    if st.fun < 0.5:
+        return "Play"
+    return None
+
+
+def _visit(st: PetState, p: dict, rng: random.Random, counts: Counter, model: dict):
+    thresholds = {k: p[k] for k in EMOTION_THRESHOLDS}
+    if rng.random() < model["chat_prob"]:
+        s, _ = sentiment_score(rng.choice(CHAT_LINES))
+        dfun, denergy, dhyg = sentiment_deltas(s, p)
+        if s:
+            counts["chat_love" if s > 0 else "chat_sad"] += 1
+        st.fun = clamp(st.fun + dfun)
+        st.energy = clamp(st.energy + denergy)
+        st.hygiene = clamp(st.hygiene + dhyg)
+    if rng.random() >= model["attention"]:
+        return
+    action = player_action(st)
+    if action is None:
+        return
+    was_asleep = st.asleep
+    {"Feed": st.feed, "Play": st.play, "Sleep": st.toggle_sleep, "Clean": st.clean}[action]()
+    counts[ACTION_EMOTIONS[action]] += 1
+    if action == "Play" and rng.random() < p["surprise_prob_play"]:
+        counts["surprised"] += 1
+    key = stat_emotion(st, thresholds, p["priority"].split("/"))
+    if key is not None:
+        counts[key] += 1
+    if WAKE_ANGRY and action == "Sleep" and was_asleep and not st.asleep:
+        counts["angry"] += 1
+
+
+def simulate_pet(p: dict, model: dict, rng: random.Random):
+    """One pet over model["hours"]; returns (trigger counts, seconds alive)."""
+    horizon = model["hours"] * 3600
+    st = PetState(last_timestamp=0.0)
+    sched = NeedsScheduler(st, {k: p[k] for k in EMOTION_THRESHOLDS})
+    counts: Counter = Counter()
+    t = 0.0
+    while True:
+        t_next = t + rng.expovariate(1.0 / model["visit_every"])
+        for ev in sched.advance(st, min(t_next, horizon)):
+            if ev.key:
+                counts[ev.key] += 1
+            elif ev.kind in ("rested", "died"):
+                counts[ev.kind] += 1
+        if not st.alive or t_next >= horizon:
+            break
+        t = t_next
+        _visit(st, p, rng, counts, model)
+    return counts, (st.died_at if not st.alive else horizon)
+
+
+def run_candidate(job) -> dict:
+    p, model, seed = job
+    prev = use_decay_rates({k: p[k] for k in DECAY_RATES})
+    try:
+        total: Counter = Counter()
+        alive_s = 0.0
+        for i in range(model["pets"]):
+            counts, lived = simulate_pet(p, model, random.Random(seed * 1000003 + i))
+            total += counts
+            alive_s += lived
+    finally:
+        use_decay_rates(prev)
+    hours = alive_s / 3600
+    return {"params": p, "pets": model["pets"], "pet_hours": hours, "deaths": total["died"],
+            "fires": dict(total), "per_hour": {k: v / hours for k, v in total.items()}}
+
+
+# --- Search space ---
+
+def parse_param(text: str):
+    """name=a,b,c (grid values) or name=lo:hi (random range) -> (name, values or (lo, hi))."""
+    name, _, spec = text.partition("=")
+    if name not in defaults():
+        raise ValueError(f"unknown parameter {name!r}")
+    if name == "priority":
+        return name, spec.split(",")
+    if ":" in spec:
+        lo, hi = spec.split(":")
+        return name, (float(lo), float(hi))
+    return name, [float(v) for v in spec.split(",")]
+
+
+def candidates(space: Dict[str, object], samples: int = 0, seed: int = 0) -> List[dict]:
+    base = defaults()
+    if not samples and all(isinstance(v, list) for v in space.values()):
+        names = list(space)
+        return [dict(base, **dict(zip(names, combo))) for combo in itertools.product(*space.values())]
+    rng = random.Random(seed)
+    out = []
+    for _ in range(samples or 32):
+        p = dict(base)
+        for name, v in space.items():
+            p[name] = rng.choice(v) if isinstance(v, list) else rng.uniform(*v)
+        out.append(p)
+    return out
+
+
+# --- Cache ---
+
+def cache_key(p: dict, model: dict, seed: int) -> str:
+    return hashlib.sha1(json.dumps([MODEL, p, model, seed], sort_keys=True).encode()).hexdigest()
+
+
+def _cache_load(cache_dir, key: str) -> Optional[dict]:
+    try:
+        with open(os.path.join(cache_dir, key + ".json")) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _cache_store(cache_dir, key: str, res: dict):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, key + ".json")
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(res, f)
+    os.replace(tmp, path)
+
+
+def sweep(cands: List[dict], model: dict, seed: int = 0, workers: Optional[int] = None,
+          cache_dir=TUNE_CACHE_DIR) -> List[dict]:
+    """Results for every candidate, in order; cached ones are not recomputed."""
+    results: List[Optional[dict]] = [None] * len(cands)
+    todo = []
+    for i, p in enumerate(cands):
+        key = cache_key(p, model, seed)
+        results[i] = _cache_load(cache_dir, key) if cache_dir else None
+        if results[i] is None:
+            todo.append((i, key))
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or len(todo) <= 1:
+        done = ((i, key, run_candidate((cands[i], model, seed))) for i, key in todo)
+        for i, key, res in done:
+            results[i] = res
+            if cache_dir:
+                _cache_store(cache_dir, key, res)
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(todo))) as pool:
+            futs = {pool.submit(run_candidate, (cands[i], model, seed)): (i, key) for i, key in todo}
+            for fut in as_completed(futs):
+                i, key = futs[fut]
+                results[i] = fut.result()
+                if cache_dir:
+                    _cache_store(cache_dir, key, results[i])
+    print(f"{len(cands)} candidates, {len(cands) - len(todo)} from cache", file=sys.stderr)
+    return results
+
+
+def _fmt(v) -> str:
+    return f"{v:.4g}" if isinstance(v, float) else str(v)
+
+
+def main(argv=None):
+    ap = argparse.ArgumentParser(prog="python -m pixelgotchi.tune")
+    ap.add_argument("--param", action="append", default=[], metavar="NAME=SPEC",
+                    help="a,b,c to sweep values or lo:hi for a random range; names: " + ", ".join(defaults()))
+    ap.add_argument("--samples", type=int, default=0, help="random search with this many candidates")
+    ap.add_argument("--pets", type=int, default=200, help="simulated pets per candidate")
+    ap.add_argument("--hours", type=float, default=4.0, help="play time simulated per pet")
+    ap.add_argument("--visit-every", type=float, default=60.0, help="mean seconds between player visits")
+    ap.add_argument("--attention", type=float, default=0.8, help="chance the player acts on a visit")
+    ap.add_argument("--chat-prob", type=float, default=0.3, help="chance the player chats on a visit")
+    ap.add_argument("--seed", type=int, default=0)
+    ap.add_argument("--workers", type=int, default=0, help="processes (0 = all cores)")
+    ap.add_argument("--no-cache", action="store_true")
+    ap.add_argument("--sort", help="order by this trigger's rate (or 'deaths')")
+    ap.add_argument("--json", help="write every result to this file")
+    args = ap.parse_args(argv)
+
+    try:
+        space = dict(parse_param(t) for t in args.param)
+    except ValueError as e:
+        ap.error(str(e))
+    model = {"pets": args.pets, "hours": args.hours, "visit_every": args.visit_every,
+             "attention": args.attention, "chat_prob": args.chat_prob}
+    cands = candidates(space, args.samples, args.seed)
+    results = sweep(cands, model, args.seed, args.workers or None, None if args.no_cache else TUNE_CACHE_DIR)
+    if args.sort:
+        key = (lambda r: r["deaths"]) if args.sort == "deaths" else (lambda r: r["per_hour"].get(args.sort, 0.0))
+        results.sort(key=key)
+
+    names = list(space)
+    cols = names + ["deaths%"] + TRIGGERS
+    width = [max(9, len(c)) for c in cols]
+    print("fires per pet-hour")
+    print("  ".join(c.rjust(w) for c, w in zip(cols, width)))
+    for r in results:
+        row = [_fmt(r["params"][n]) for n in names] + [f"{100 * r['deaths'] / r['pets']:.1f}"]
+        row += [f"{r['per_hour'].get(t, 0.0):.3f}" for t in TRIGGERS]
+        print("  ".join(c.rjust(w) for c, w in zip(row, width)))
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"model": model, "seed": args.seed, "results": results}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
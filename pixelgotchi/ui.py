@@ -1,6 +1,47 @@
 import pygame as pg
-from typing import Optional
-from .config import VIRTUAL_W, VIRTUAL_H, WHITE
+from collections import OrderedDict
+from typing import List, Optional, Sequence
+from .config import VIRTUAL_W, VIRTUAL_H, WHITE, GREEN, RED, TEXT_CACHE_SIZE, CHAT_SCROLLBACK
+from .perf import timed
+
+
+class TextCache:
+    """Bounded LRU of rendered text, keyed on (font, text, antialias, colour)."""
+
+    def __init__(self, capacity: int = TEXT_CACHE_SIZE):
+        self.capacity = max(1, capacity)
+        self.surfaces: "OrderedDict[tuple, pg.Surface]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def render(self, font: pg.font.Font, text: str, antialias: bool, color) -> pg.Surface:
+        key = (font, text, antialias, tuple(color))
+        surf = self.surfaces.get(key)
+        if surf is not None:
+            self.surfaces.move_to_end(key)
+            self.hits += 1
+            return surf
+        self.misses += 1
+        surf = font.render(text, antialias, color)
+        self.surfaces[key] = surf
+        if len(self.surfaces) > self.capacity:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def clear(self):
+        self.surfaces.clear()
+
+
+# Shared by every renderer; cached surfaces must be treated as read-only.
+text_cache = TextCache()
+
+
+def render_text(font: pg.font.Font, text: str, antialias: bool = False, color=WHITE) -> pg.Surface:
+    return text_cache.render(font, text, antialias, color)
 
 
 def draw_bar(surf: pg.Surface, x, y, w, h, val, fg, bg=(40,40,40)):
@@ -12,7 +53,7 @@ def draw_bar(surf: pg.Surface, x, y, w, h, val, fg, bg=(40,40,40)):
 
 
 def draw_help(surf: pg.Surface, font):
-    w, h = 110, 70
+    w, h = 110, 79
     x, y = (VIRTUAL_W - w)//2, (VIRTUAL_H - h)//2
     pg.draw.rect(surf, (0,0,0), (x, y, w, h))
     pg.draw.rect(surf, WHITE, (x, y, w, h), 1)
@@ -24,10 +65,12 @@ def draw_help(surf: pg.Surface, font):
         "T: chat input",
         "H: toggle help",
         "M: mute",
+        "F3: perf  F4: profile",
         "Esc/Q: quit",
     ]
     for i, line in enumerate(lines):
-        surf.blit(font.render(line, False, WHITE), (x+4, y+4 + i*9))
+        surf.blit(render_text(font, line, False, WHITE), (x+4, y+4 + i*9))
+    return (x, y, w, h)
 
 
 # -------- Chat dialog UI --------
@@ -49,7 +92,102 @@ def wrap_text(font: pg.font.Font, text: str, max_width: int):
     return lines
 
 
-def draw_chat_dialog(surf: pg.Surface, font: pg.font.Font, messages, input_text: str, cursor_on: bool):
+class ChatLog:
+    """Wrapped chat lines, kept up to date incrementally.
+
+    Messages are only ever appended, except that a reply still streaming in
+    is rewritten in place; so each frame only the last REWRAP_WINDOW
+    messages are compared (by identity) and only new or changed ones are
+    re-wrapped. Wrapping is redone from scratch when the font or width
+    changes. At most `scrollback` lines are kept; `scroll` is how many
+    lines the view sits above the bottom.
+    """
+
+    REWRAP_WINDOW = 8
+
+    def __init__(self, scrollback: int = CHAT_SCROLLBACK):
+        self.scrollback = max(1, scrollback)
+        self.scroll = 0
+        self.lines: List[str] = []
+        self._layout = None            # (font, width) the lines were wrapped for
+        self._msgs: List[tuple] = []   # message objects wrapped, from messages[_base:]
+        self._starts: List[int] = []   # offset in `lines` of each wrapped message
+        self._base = 0                 # index in `messages` of _msgs[0]
+        self._source = None            # the messages list being mirrored
+
+    def sync(self, font: pg.font.Font, width: int, messages) -> List[str]:
+        if (font, width) != self._layout or messages is not self._source or len(messages) < self._base + len(self._msgs):
+            self._layout, self._source = (font, width), messages
+            self._msgs, self._starts, self.lines, self._base = [], [], [], 0
+        n_old = len(self._msgs)
+        n_new = len(messages) - self._base
+        first = n_old
+        for i in range(max(0, n_old - self.REWRAP_WINDOW), n_old):
+            if messages[self._base + i] is not self._msgs[i]:
+                first = i
+                break
+        if first == n_old == n_new:
+            return self.lines
+        before = len(self.lines)
+        if first < n_old:
+            del self.lines[self._starts[first]:]
+            del self._msgs[first:], self._starts[first:]
+        for i in range(first, n_new):
+            msg = messages[self._base + i]
+            role, text = msg
+            tag = "You:" if role == "user" else "Pet:"
+            self._msgs.append(msg)
+            self._starts.append(len(self.lines))
+            self.lines.extend(wrap_text(font, f"{tag} {text}", width))
+        if self.scroll:
+            # keep the view on the same lines while new ones arrive below
+            self.scroll += max(0, len(self.lines) - before)
+        if len(self.lines) > self.scrollback * 3 // 2:
+            self._trim()
+        return self.lines
+
+    def _trim(self):
+        # Drop whole messages from the front until within the scrollback limit.
+        drop = 0
+        while drop < len(self._msgs) - 1 and len(self.lines) - self._starts[drop + 1] >= self.scrollback:
+            drop += 1
+        if not drop:
+            return
+        cut = self._starts[drop]
+        del self.lines[:cut]
+        del self._msgs[:drop]
+        self._starts = [st - cut for st in self._starts[drop:]]
+        self._base += drop
+
+    def scroll_by(self, n: int):
+        self.scroll = max(0, min(len(self.lines), self.scroll + n))
+
+    def visible(self, max_lines: int, tail: List[str] = ()) -> List[str]:
+        lines = self.lines + list(tail) if tail else self.lines
+        self.scroll = max(0, min(self.scroll, len(lines) - max_lines))
+        end = len(lines) - self.scroll
+        return lines[max(0, end - max_lines):end]
+
+
+# Shared by the game's chat dialog.
+chat_log = ChatLog()
+
+
+def fit_tail(font: pg.font.Font, prefix: str, text: str, suffix: str, max_width: int) -> str:
+    """Drop characters from the front of `text` until prefix+text+suffix fits (binary search)."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if font.size(prefix + text[mid:] + suffix)[0] <= max_width:
+            hi = mid
+        else:
+            lo = mid + 1
+    return prefix + text[lo:] + suffix
+
+
+@timed("chat")
+def draw_chat_dialog(surf: pg.Surface, font: pg.font.Font, messages, input_text: str, cursor_on: bool,
+                     thinking: bool = False, log: Optional[ChatLog] = None):
     # Centered dialog
     w, h = int(VIRTUAL_W*0.85), int(VIRTUAL_H*0.75)
     x, y = (VIRTUAL_W - w)//2, (VIRTUAL_H - h)//2
@@ -57,7 +195,7 @@ def draw_chat_dialog(surf: pg.Surface, font: pg.font.Font, messages, input_text:
     pg.draw.rect(surf, (15,15,18), (x, y, w, h))
     pg.draw.rect(surf, (0,0,0), (x, y, w, h), 1)
     # title
-    surf.blit(font.render("Chat", True, WHITE), (x+6, y+4))
+    surf.blit(render_text(font, "Chat", True, WHITE), (x+6, y+4))
     # content area
     pad = 6
     content_x = x + pad
@@ -67,29 +205,56 @@ def draw_chat_dialog(surf: pg.Surface, font: pg.font.Font, messages, input_text:
     # draw a box for messages
     pg.draw.rect(surf, (22,22,26), (content_x, content_y, content_w, content_h))
     pg.draw.rect(surf, (0,0,0), (content_x, content_y, content_w, content_h), 1)
-    # render messages (wrap and show from bottom up)
-    wrapped_lines = []
-    for role, text in messages[-50:]:  # last N
-        tag = "You:" if role == "user" else "Pet:"
-        for ln in wrap_text(font, f"{tag} {text}", content_w-4):
-            wrapped_lines.append(ln)
+    # render messages (wrapped once per message, shown from the bottom up)
+    log = log or chat_log
+    log.sync(font, content_w-4, messages)
+    # reply still on its way; dots blink with the cursor
+    tail = [("Pet: ..." if cursor_on else "Pet: .")] if thinking else []
     # keep only lines that fit
     line_h = font.get_height()+1
     max_lines = content_h // line_h
-    shown = wrapped_lines[-max_lines:]
+    shown = log.visible(max_lines, tail)
     # draw from top
     ty = content_y + 2
     for ln in shown:
-        surf.blit(font.render(ln, True, WHITE), (content_x+2, ty))
+        surf.blit(render_text(font, ln, True, WHITE), (content_x+2, ty))
         ty += line_h
     # input area
     input_y = y + h - 12
     pg.draw.rect(surf, (22,22,26), (x+pad, input_y, w - pad*2, 10))
     pg.draw.rect(surf, (0,0,0), (x+pad, input_y, w - pad*2, 10), 1)
-    prompt = "> " + input_text + ("_" if cursor_on else "")
-    # trim input if too long
-    while font.size(prompt)[0] > w - pad*2 - 6 and len(input_text) > 0:
-        input_text = input_text[1:]
-        prompt = "> " + input_text + ("_" if cursor_on else "")
-    surf.blit(font.render(prompt, True, WHITE), (x+pad+2, input_y+1))
+    # trim input from the front if too long
+    prompt = fit_tail(font, "> ", input_text, "_" if cursor_on else "", w - pad*2 - 6)
+    surf.blit(render_text(font, prompt, True, WHITE), (x+pad+2, input_y+1))
     return (x, y, w, h)
+
+
+# -------- Perf overlay --------
+
+_perf_panel: Optional[pg.Surface] = None
+
+
+def draw_perf_overlay(surf: pg.Surface, font: pg.font.Font, lines: List[str], frame_ms: Sequence[float],
+                      budget_ms: float):
+    """Debug panel: text lines over a frame-time sparkline (1px per frame, red when over budget)."""
+    global _perf_panel
+    line_h, spark_h = font.get_height(), 10
+    w, h = 72, 4 + len(lines) * line_h + spark_h + 2
+    x, y = 2, 2
+    if _perf_panel is None or _perf_panel.get_size() != (w, h):
+        _perf_panel = pg.Surface((w, h), pg.SRCALPHA)
+        _perf_panel.fill((0, 0, 0, 235))
+    surf.blit(_perf_panel, (x, y))
+    ty = y + 2
+    for ln in lines:
+        # not through text_cache: these strings change every frame and would evict everything else
+        surf.blit(font.render(ln, False, WHITE), (x+2, ty))
+        ty += line_h
+    samples = list(frame_ms)[-(w - 4):]
+    if samples:
+        base = ty + spark_h
+        top = max(max(samples), 1.0)
+        for i, ms in enumerate(samples):
+            bar = max(1, min(spark_h, int(ms / top * spark_h + 0.5)))
+            pg.draw.line(surf, GREEN if ms <= budget_ms else RED, (x+2+i, base), (x+2+i, base-bar+1))
+    return pg.Rect(x, y, w, h)
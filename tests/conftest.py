@@ -0,0 +1,24 @@
+import os
+import threading
+
+import pytest
+
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+
+@pytest.fixture
+def server():
+    """Starts devserver instances (kwargs as for devserver.serve); `srv.url` is the base URL."""
+    from pixelgotchi.devserver import serve
+
+    def start(**kwargs):
+        srv = serve(port=0, **kwargs)
+        srv.url = f"http://127.0.0.1:{srv.server_port}/v1"
+        threading.Thread(target=srv.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(srv)
+        return srv
+    servers = []
+    yield start
+    for srv in servers:
+        srv.shutdown()
@@ -0,0 +1,114 @@
+import time
+
+import pytest
+
+pytest.importorskip("openai")
+
+from pixelgotchi import chat
+
+
+@pytest.fixture(autouse=True)
+def no_filler(monkeypatch):
+    monkeypatch.setattr(chat, "CHAT_LOCAL_FILL", False)
+
+
+def make_worker(srv, **kwargs) -> chat.ChatWorker:
+    engine = chat.ChatEngine(enabled=True, backends=[chat.RemoteBackend("dummy", srv.url)])
+    return chat.ChatWorker(engine, **kwargs)
+
+
+def collect(worker, until, limit=10.0):
+    """poll() until `until(results)` holds; returns every result seen."""
+    out = []
+    end = time.monotonic() + limit
+    while not until(out):
+        assert time.monotonic() < end, "no reply in time"
+        out += worker.poll()
+        time.sleep(0.005)
+    return out
+
+
+def settle(worker):
+    """Let the worker handle everything queued (including retractions)."""
+    end = time.monotonic() + 5
+    while not worker.requests.empty() and time.monotonic() < end:
+        time.sleep(0.01)
+    time.sleep(0.05)
+
+
+def test_stream_yields_growing_chunks_then_full_reply(server):
+    worker = make_worker(server(token_delay=0.01), stream=True)
+    req = worker.submit("hello there")
+    results = collect(worker, lambda rs: any(r.done for r in rs))
+    partial = [r.text for r in results if not r.done]
+    final = results[-1]
+    assert final.req_id == req and final.done and not final.error
+    assert final.text == "*wiggles* You said: hello there"
+    assert len(partial) >= 4
+    assert all(b.startswith(a) for a, b in zip(partial, partial[1:]))
+    assert partial[-1] == final.text
+    assert final.ttft is not None and 0 < final.ttft <= final.latency
+    assert worker.last_ttft == final.ttft and list(worker.ttfts) == [final.ttft]
+    assert worker.engine.history.turns == [("user", "hello there"), ("assistant", final.text)]
+    worker.close()
+
+
+def test_cancel_mid_stream_leaves_history_clean(server):
+    worker = make_worker(server(token_delay=0.05), stream=True)
+    first = worker.submit("this will be cancelled")
+    collect(worker, lambda rs: any(not r.done for r in rs))
+    assert worker.cancel() == [first]
+    assert not worker.busy()
+    time.sleep(0.3)
+    late = worker.poll()
+    assert not late  # nothing from the cancelled request reaches the game
+    second = worker.submit("again")
+    results = collect(worker, lambda rs: any(r.done for r in rs))
+    assert {r.req_id for r in results} == {second}
+    assert worker.engine.history.turns == [("user", "again"), ("assistant", "*wiggles* You said: again")]
+    worker.close()
+
+
+def test_timed_out_reply_is_not_remembered(server):
+    worker = make_worker(server(delay=0.3), stream=False, timeout=0.05)
+    worker.submit("too slow")
+    timed_out = collect(worker, lambda rs: any(r.done for r in rs))[-1]
+    assert timed_out.error and "timed out" in timed_out.text
+    time.sleep(0.4)
+    assert worker.poll() == []
+    settle(worker)
+    assert worker.engine.history.turns == []
+    worker.close()
+
+
+class BrokenOnce:
+    """Backend whose first reply fails with an error that is not about reachability."""
+
+    name = "broken"
+
+    def __init__(self):
+        self.seen = []
+
+    def reply(self, history, needs=None):
+        self.seen.append(list(history.turns))
+        if len(self.seen) == 1:
+            raise ValueError("bad request")
+        return "ok"
+
+    def reply_stream(self, history, needs=None):
+        yield self.reply(history, needs)
+
+
+def test_failed_reply_rolls_back_the_user_turn():
+    backend = BrokenOnce()
+    worker = chat.ChatWorker(chat.ChatEngine(enabled=True, backends=[backend]), stream=False)
+    worker.submit("first")
+    failed = collect(worker, lambda rs: any(r.done for r in rs))[-1]
+    assert failed.error and "ValueError" in failed.text
+    settle(worker)
+    assert worker.engine.history.turns == []
+    worker.submit("second")
+    collect(worker, lambda rs: any(r.done for r in rs))
+    assert backend.seen[-1] == [("user", "second")]  # no dangling "first" before it
+    assert worker.engine.history.turns == [("user", "second"), ("assistant", "ok")]
+    worker.close()
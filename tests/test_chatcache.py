@@ -0,0 +1,53 @@
+import time
+
+from pixelgotchi.chatcache import ResponseCache, cache_key
+
+
+def test_expired_entries_miss():
+    cache = ResponseCache(capacity=8, ttl=0.05, path=None)
+    cache.put("k", "hello")
+    assert cache.get("k") == "hello"
+    time.sleep(0.1)
+    assert cache.get("k") is None
+    assert "k" not in cache.entries
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(capacity=2, ttl=60, path=None)
+    cache.put("a", "A")
+    cache.put("b", "B")
+    assert cache.get("a") == "A"  # b is now the oldest
+    cache.put("c", "C")
+    assert cache.get("b") is None
+    assert cache.get("a") == "A" and cache.get("c") == "C"
+
+
+def test_sqlite_entries_survive_a_restart(tmp_path):
+    path = str(tmp_path / "chat.db")
+    cache = ResponseCache(capacity=8, ttl=60, path=path)
+    cache.put("k", "persisted")
+    cache.close()
+    again = ResponseCache(capacity=8, ttl=60, path=path)
+    assert again.get("k") == "persisted"
+    assert "k" in again.entries
+    again.close()
+
+
+def test_zero_capacity_serves_sqlite_hits(tmp_path):
+    cache = ResponseCache(capacity=0, path=str(tmp_path / "chat.db"))
+    cache.put("k", "from disk")
+    assert not cache.entries
+    assert cache.get("k") == "from disk"
+    assert not cache.entries
+    cache.close()
+
+
+def test_key_covers_only_the_window():
+    a = [("user", "feed me"), ("assistant", "Yum!"), ("user", "Hi!")]
+    b = [("user", "let's play"), ("assistant", "Yay!"), ("user", "  hi ")]
+    assert cache_key("m", None, a, 1) == cache_key("m", None, b, 1)  # case, punctuation and spaces ignored
+    assert cache_key("m", None, a, 2) != cache_key("m", None, b, 2)
+    assert cache_key("m", None, a, 1) != cache_key("other", None, a, 1)
+    assert cache_key("m", None, a, 1) != cache_key("m", "http://elsewhere/v1", a, 1)
+    assert cache_key("m", None, [("system", "x")] + a, 1) == cache_key("m", None, a, 1)
@@ -0,0 +1,141 @@
+import json
+import time
+from dataclasses import asdict
+
+from pixelgotchi.journal import SEQ_KEY, SaveJournal, SaveWriter, _line, journal_path, recover
+from pixelgotchi.state import PetState, load_state
+
+
+def journal(path, **kwargs) -> SaveJournal:
+    return SaveJournal(path, **dict({"fsync_interval": 0.0, "compact_every": 0}, **kwargs))
+
+
+def test_torn_tail_is_dropped_and_truncated(tmp_path):
+    path = tmp_path / "save.json"
+    j = journal(path)
+    j.save({"hunger": 0.1, "fun": 0.5})
+    j.save({"hunger": 0.2, "fun": 0.5})
+    j.close(compact=False)
+    good = journal_path(path).stat().st_size
+    with open(journal_path(path), "ab") as f:
+        f.write(_line(3, {"hunger": "0.3"})[:-7])  # torn mid-line by a crash
+    rec = recover(path)
+    assert rec.data == {"hunger": 0.2, "fun": 0.5} and rec.seq == 2 and rec.good == good
+
+    j = journal(path)
+    assert journal_path(path).stat().st_size == good
+    j.save({"hunger": 0.4, "fun": 0.5})
+    j.close(compact=False)
+    assert recover(path).data == {"hunger": 0.4, "fun": 0.5}  # the new line is reachable
+
+
+def test_corrupt_final_line_is_dropped(tmp_path):
+    path = tmp_path / "save.json"
+    j = journal(path)
+    j.save({"hunger": 0.1})
+    j.close(compact=False)
+    bad = bytearray(_line(2, {"hunger": "0.9"}))
+    bad[-3:-2] = b"8"  # payload no longer matches its CRC
+    with open(journal_path(path), "ab") as f:
+        f.write(bytes(bad))
+    assert recover(path).data == {"hunger": 0.1}
+    j = journal(path)
+    j.save({"hunger": 0.3})
+    j.close(compact=False)
+    rec = recover(path)
+    assert rec.data == {"hunger": 0.3} and rec.entries == 2
+
+
+def test_entries_in_the_snapshot_are_not_reapplied(tmp_path):
+    # a crash between write_atomic and truncate(0) leaves the folded lines behind
+    path = tmp_path / "save.json"
+    j = journal(path)
+    j.save({"hunger": 0.1})
+    j.save({"hunger": 0.2})
+    lines = journal_path(path).read_bytes()
+    j.compact()
+    j.close(compact=False)
+    journal_path(path).write_bytes(lines)
+    path.write_text(json.dumps({"hunger": 0.9, SEQ_KEY: 2}))  # newer than the stale lines
+    rec = recover(path)
+    assert rec.data == {"hunger": 0.9} and rec.seq == 2
+
+    j = journal(path)
+    j.save({"hunger": 0.9, "fun": 0.5})
+    j.close(compact=False)
+    rec = recover(path)
+    assert rec.data == {"hunger": 0.9, "fun": 0.5} and rec.seq == 3
+
+
+def test_baseline_save_without_seq_loads(tmp_path):
+    path = tmp_path / "save.json"
+    old = PetState(hunger=0.25, hygiene=0.4, appearance={"w": 24, "spots": [[1, 2]]}, last_timestamp=time.time())
+    path.write_text(json.dumps(asdict(old)))  # what save_state wrote before the journal
+    st = load_state(path)
+    assert st.appearance == old.appearance and st.alive
+    assert abs(st.hunger - 0.25) < 0.01
+    rec = recover(path)
+    assert rec.seq == 0 and SEQ_KEY not in rec.data
+
+
+def test_compact_matches_replaying_the_journal(tmp_path):
+    path = tmp_path / "save.json"
+    j = journal(path)
+    for i in range(10):
+        j.save({"hunger": i / 10, "fun": 0.5, "death_reason": "" if i < 5 else "Starved", "spots": [[i, i]]})
+    replayed = recover(path)
+    j.compact()
+    assert journal_path(path).stat().st_size == 0
+    compacted = recover(path)
+    assert compacted.data == replayed.data and compacted.seq == replayed.seq == 10
+    assert json.loads(path.read_text())[SEQ_KEY] == 10
+    j.close()
+
+
+def wait_for(cond, limit=2.0):
+    end = time.monotonic() + limit
+    while not cond():
+        assert time.monotonic() < end, "timed out"
+        time.sleep(0.005)
+
+
+def test_writer_coalesces_a_burst_into_one_write(tmp_path):
+    path = tmp_path / "save.json"
+    w = SaveWriter(journal(path), coalesce=0.1, deadline=5.0)
+    for i in range(10):
+        w.submit({"hunger": i / 10})
+    wait_for(lambda: w.writes)
+    time.sleep(0.15)
+    assert (w.writes, w.coalesced, w.depth) == (1, 9, 0)
+    assert recover(path).data == {"hunger": 0.9}
+    w.close()
+
+
+def test_writer_deadline_forces_a_write_during_steady_spam(tmp_path):
+    path = tmp_path / "save.json"
+    w = SaveWriter(journal(path), coalesce=0.1, deadline=0.25)
+    t0 = time.monotonic()
+    i = 0
+    while not w.writes:
+        assert time.monotonic() - t0 < 1.0, "deadline never forced a write"
+        i += 1
+        w.submit({"hunger": i / 1000})
+        time.sleep(0.02)  # always within `coalesce` of the previous submit
+    assert 0.2 < time.monotonic() - t0 < 0.6
+    w.close()
+
+
+def test_writer_close_always_writes_the_final_record(tmp_path):
+    path = tmp_path / "save.json"
+    w = SaveWriter(journal(path), coalesce=10.0, deadline=10.0)
+    w.submit({"hunger": 0.1})
+    w.close({"hunger": 0.2, "fun": 0.3})
+    assert w.closed and w.writes == 1
+    assert recover(path).data == {"hunger": 0.2, "fun": 0.3}
+    assert json.loads(path.read_text()) == {"hunger": 0.2, "fun": 0.3, SEQ_KEY: 1}  # compacted
+
+    w = SaveWriter(journal(path), coalesce=10.0, deadline=10.0)
+    w.close({"hunger": 0.5, "fun": 0.3})  # nothing pending before it
+    assert recover(path).data == {"hunger": 0.5, "fun": 0.3}
+    w.close({"hunger": 0.9})  # a second close is a no-op
+    assert recover(path).data == {"hunger": 0.5, "fun": 0.3}
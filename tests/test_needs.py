@@ -0,0 +1,69 @@
+import copy
+import math
+
+import pytest
+
+from pixelgotchi import game
+from pixelgotchi.chat import ChatEngine
+from pixelgotchi.config import DECAY_RATES
+from pixelgotchi.loop import ScriptedDriver
+from pixelgotchi.needs import NeedsScheduler
+from pixelgotchi.sim import Needs
+from pixelgotchi.state import PetState, use_decay_rates
+
+
+@pytest.fixture
+def decay():
+    def switch(**changes):
+        use_decay_rates(dict(DECAY_RATES, **changes))
+    prev = use_decay_rates(DECAY_RATES)
+    yield switch
+    use_decay_rates(prev)
+
+
+def test_zero_hunger_rate_never_starves(decay):
+    decay(hunger_up=0.0)
+    st = PetState(hunger=0.5, energy=0.9, last_timestamp=0.0)
+    assert st.death_in()[1] == "Exhausted"  # awake, energy still runs out
+    st.asleep = True  # energy only rises: no death ahead at all
+    assert st.death_in()[0] == math.inf
+    sched = NeedsScheduler(st)
+    assert all(ev.kind != "hungry" for _, _, ev in sched.queue)
+    sched.advance(st, 3600.0)
+    assert st.alive and st.hunger == 0.5
+
+
+def test_zero_sleep_recovery_never_rested(decay):
+    decay(energy_up_sleep=0.0)
+    st = PetState(energy=0.5, asleep=True, last_timestamp=0.0)
+    sched = NeedsScheduler(st)
+    assert all(ev.kind != "rested" for _, _, ev in sched.queue)
+    events = sched.advance(st, 3600.0)
+    assert "rested" not in [ev.kind for ev in events]
+    assert st.energy == 0.5
+
+
+@pytest.mark.parametrize("asleep", [False, True])
+def test_needs_at_matches_apply_offline(asleep):
+    st = PetState(hunger=0.3, energy=0.6, fun=0.02, hygiene=0.5, asleep=asleep, last_timestamp=10.0)
+    ahead = Needs.at(st, 70.0)
+    moved = copy.deepcopy(st)
+    moved.apply_offline(70.0)
+    assert ahead == Needs.of(moved)
+    assert Needs.of(st) == Needs.at(st, 10.0)  # st itself is untouched
+
+
+def test_game_advances_the_state_only_at_events(monkeypatch):
+    calls = []
+    advance = NeedsScheduler.advance
+    monkeypatch.setattr(NeedsScheduler, "advance", lambda self, st, now: calls.append(now) or advance(self, st, now))
+    start = PetState(hunger=0.2, energy=0.9, fun=0.9, hygiene=0.9, last_timestamp=0.0, appearance={})
+    expected = copy.deepcopy(start)
+    driver = ScriptedDriver([(120, {"type": "KEYDOWN", "key": "f"})], frames=600)
+    final = game.main(driver, state=start, chat=ChatEngine(enabled=False), persist=False)
+    assert len(calls) <= 4  # the feed, the change it made, and the end of the run; no crossings
+    expected.apply_offline(1.9)  # frame 120 handles input after 19 steps of 0.1 s
+    expected.feed()
+    expected.apply_offline(final.last_timestamp)
+    assert final.last_timestamp == pytest.approx(10.0)
+    assert list(Needs.of(final))[:4] == pytest.approx(list(Needs.of(expected))[:4])
@@ -0,0 +1,33 @@
+import random
+
+import pygame as pg
+import pytest
+
+from pixelgotchi.game import PixelCanvas
+
+
+def _canvas(scale: int) -> PixelCanvas:
+    canvas = PixelCanvas(128, 96, scale)
+    rng = random.Random(scale)
+    for y in range(96):
+        for x in range(128):
+            canvas.surface.set_at((x, y), (rng.randrange(256), rng.randrange(256), rng.randrange(256)))
+    return canvas
+
+
+@pytest.mark.parametrize("scale", [1, 3, 5])
+@pytest.mark.parametrize("depth", [None, 16])  # None: the canvas format, scaled straight onto the screen
+def test_partial_present_matches_full(scale, depth):
+    canvas = _canvas(scale)
+    size = (128 * scale, 96 * scale)
+    make = (lambda: pg.Surface(size, 0, canvas.surface)) if depth is None else (lambda: pg.Surface(size, 0, depth))
+    full, partial = make(), make()
+    canvas.end_blit(full)
+    partial.fill((0, 0, 0))
+    rects = [pg.Rect(0, 0, 48, 42), pg.Rect(40, 30, 30, 25), pg.Rect(120, 90, 20, 20), pg.Rect(200, 0, 5, 5)]
+    out = canvas.end_blit(partial, rects)
+    assert out == [pg.Rect(0, 0, 48 * scale, 42 * scale), pg.Rect(40 * scale, 30 * scale, 30 * scale, 25 * scale),
+                   pg.Rect(120 * scale, 90 * scale, 8 * scale, 6 * scale)]  # clipped to the canvas, empty dropped
+    for o in out:
+        assert pg.image.tobytes(partial.subsurface(o), "RGB") == pg.image.tobytes(full.subsurface(o), "RGB")
+    assert partial.get_at((100 * scale, 10 * scale)) == (0, 0, 0, 255)  # outside the rects: untouched
@@ -0,0 +1,24 @@
+import random
+
+import pygame as pg
+import pytest
+
+from pixelgotchi import pet
+from pixelgotchi.appearance import random_appearance
+
+pytestmark = pytest.mark.skipif(pet.np is None, reason="needs NumPy")
+
+
+def _paint(fill, app):
+    size = (app["w"] + pet.SPRITE_PAD * 2, app["h"] + pet.SPRITE_PAD * 2)
+    surf = pg.Surface(size, 0, 32)
+    surf.fill(pet.SPRITE_COLORKEY)
+    fill(surf, pet.SPRITE_PAD, pet.SPRITE_PAD, app, tuple(app["base_color"]))
+    return pg.image.tobytes(surf, "RGB")
+
+
+@pytest.mark.parametrize("seed", range(50))
+def test_numpy_fill_matches_loops(seed):
+    random.seed(seed)
+    app = random_appearance()
+    assert _paint(pet.fill_shapes_numpy, app) == _paint(pet.fill_shapes_loops, app)
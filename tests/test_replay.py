@@ -0,0 +1,24 @@
+import random
+import time
+from dataclasses import asdict
+
+from pixelgotchi import game, replay
+from pixelgotchi.chat import ChatEngine
+from pixelgotchi.loop import ScriptedDriver
+from pixelgotchi.state import PetState
+
+
+def test_respawn_replays_identically(tmp_path):
+    path = tmp_path / "respawn.pgr"
+    start = PetState(alive=False, death_reason="Starved", last_timestamp=0.0)
+    trace = [(5, {"type": "KEYDOWN", "key": "r"}), (20, {"type": "KEYDOWN", "key": "p"})]
+    random.seed(7)
+    rec = replay.Recorder(path, 7, start, False, ScriptedDriver(trace, 60))
+    final = game.main(rec, state=start, chat=ChatEngine(enabled=False), persist=False)
+    rec.close(final)
+    assert final.alive
+
+    time.sleep(0.05)  # the wall clock moves on between recording and replay
+    again = replay.replay(path, realtime=False)
+    assert asdict(again) == asdict(final)
+    assert replay.matches(again, replay.Replayer(path).final)
@@ -0,0 +1,38 @@
+import pytest
+
+from pixelgotchi import sentiment
+from pixelgotchi.sentiment import LEXICON, WEIGHTED_LEXICON, Lexicon
+
+
+def _baseline(text):
+    # the word-set scan sentiment_score used before the compiled lexicon
+    t = text.lower()
+    pos = sum(1 for w in sentiment.POS_WORDS if w in t)
+    neg = sum(1 for w in sentiment.NEG_WORDS if w in t)
+    if pos == 0 and neg == 0:
+        return 0.0, "neutral"
+    score = (pos - neg) / max(1, pos + neg)
+    return score, "positive" if score > 0 else ("negative" if score < 0 else "neutral")
+
+
+def test_default_lexicon_has_unit_weights():
+    assert set(LEXICON.values()) == {1.0, -1.0}
+    assert set(LEXICON) == sentiment.POS_WORDS | sentiment.NEG_WORDS
+    assert sentiment.default_lexicon(None).weights == LEXICON
+    assert Lexicon(LEXICON).score("I like you") == (1.0, "positive")
+    assert Lexicon(LEXICON).score("so cute but so tired") == (0.0, "neutral")
+
+
+@pytest.mark.parametrize("text", ["love love hate", "hungry hungry, but good", "yay yay yay",
+                                  "thank you, thank  you so much", "Bad. BAD. bad!", "cute cute sad sad good"])
+def test_repeated_words_count_once_like_the_baseline(text):
+    assert Lexicon(LEXICON).score(text) == _baseline(text)
+
+
+def test_weighted_lexicon_is_opt_in(tmp_path):
+    assert sentiment.default_lexicon("weighted").score("I like you") == (0.5, "positive")
+    path = tmp_path / "lexicon.txt"
+    path.write_text("# mine\nmeh -0.3\nthank you 0.7\n", encoding="utf-8")
+    lex = sentiment.default_lexicon(str(path))
+    assert lex.weights == {"meh": -0.3, "thank you": 0.7}
+    assert WEIGHTED_LEXICON["like"] == 0.5
@@ -0,0 +1,96 @@
+import random
+import time
+
+import pytest
+
+openai = pytest.importorskip("openai")
+
+from pixelgotchi import chat
+from pixelgotchi.transport import ChatTransport, CircuitBreaker, OFFLINE_REPLIES, offline_reply
+
+HELLO = [{"role": "user", "content": "hi"}]
+
+
+def make_engine(srv, **kwargs) -> chat.ChatEngine:
+    transport = ChatTransport("dummy", srv.url, **kwargs)
+    return chat.ChatEngine(enabled=True, backends=[chat.RemoteBackend("dummy", srv.url, None, transport)])
+
+
+def test_transient_errors_are_retried(server):
+    transport = ChatTransport("dummy", server(fail_rate=0.5, seed=3).url, deadline=5.0, retries=10, backoff=0.001,
+                              breaker=CircuitBreaker(failures=0))
+    for _ in range(20):
+        resp = transport.create(model="m", messages=HELLO)
+        assert resp.choices[0].message.content == "*wiggles* You said: hi"
+    assert transport.retried > 0 and transport.failures == 0
+    assert transport.attempts.count == 20 + transport.retried
+    transport.close()
+
+
+def test_deadline_covers_every_attempt(server):
+    transport = ChatTransport("dummy", server(stall_rate=1.0, stall=2.0).url, deadline=0.3, retries=5,
+                              backoff=0.001, breaker=CircuitBreaker(failures=0))
+    t0 = time.monotonic()
+    with pytest.raises(openai.APITimeoutError):
+        transport.create(model="m", messages=HELLO)
+    assert time.monotonic() - t0 < 0.6
+    assert transport.failures == 1
+    transport.close()
+
+
+def test_no_retry_when_the_backoff_would_pass_the_deadline(server):
+    transport = ChatTransport("dummy", server(fail_rate=1.0).url, deadline=0.2, retries=5, backoff=100.0,
+                              breaker=CircuitBreaker(failures=0))
+    transport.rng.seed(0)  # the first pause is well past the deadline
+    t0 = time.monotonic()
+    with pytest.raises(openai.InternalServerError):
+        transport.create(model="m", messages=HELLO)
+    assert time.monotonic() - t0 < 0.2
+    assert transport.retried == 0
+    transport.close()
+
+
+def test_breaker_opens_answers_offline_and_closes_again(server):
+    srv = server(fail_rate=1.0)
+    eng = make_engine(srv, retries=0, breaker=CircuitBreaker(failures=2, cooldown=0.2))
+    transport = eng.transport
+
+    def reply(text):
+        eng.push_user(text)
+        return eng.reply()
+
+    assert reply("one") in OFFLINE_REPLIES
+    assert transport.breaker.state == "closed"
+    assert reply("two") in OFFLINE_REPLIES
+    assert transport.breaker.state == "open" and transport.breaker.trips == 1
+    assert reply("three") in OFFLINE_REPLIES
+    assert transport.refused == 1 and transport.requests == 2  # refused without a request
+
+    time.sleep(0.25)
+    assert reply("trial") in OFFLINE_REPLIES  # half_open trial fails: open again
+    assert transport.breaker.state == "open" and transport.breaker.trips == 2 and transport.requests == 3
+
+    srv.RequestHandlerClass.fail_rate = 0.0
+    time.sleep(0.25)
+    assert reply("back") == "*wiggles* You said: back"
+    assert transport.breaker.state == "closed" and transport.breaker.streak == 0
+    transport.close()
+
+
+def test_offline_reply_leaves_global_random_alone():
+    random.seed(7)
+    state = random.getstate()
+    assert offline_reply() in OFFLINE_REPLIES
+    assert random.getstate() == state
+
+
+def test_backoff_jitter_leaves_global_random_alone(server):
+    transport = ChatTransport("dummy", server(fail_rate=1.0).url, deadline=2.0, retries=2, backoff=0.001,
+                              breaker=CircuitBreaker(failures=0))
+    random.seed(7)
+    state = random.getstate()
+    with pytest.raises(openai.InternalServerError):
+        transport.create(model="m", messages=HELLO)
+    assert transport.retried == 2
+    assert random.getstate() == state
+    transport.close()